@@ -0,0 +1,311 @@
+"""
+courseware.py 的性能基准测试
+
+在临时目录里生成合成的 coursedetail.* 课程文件夹，分阶段测量构建耗时。
+用法：
+    python bench_courseware.py stages --lessons 10000 --vip-ratio 0.5 --stub-ratio 0.2 \\
+        --size 256:4096 --report report.json [--compare old.json]
+    python bench_courseware.py generate 目标目录 --lessons 100000
+    python bench_courseware.py scaling [课件数量 ...]
+    python bench_courseware.py entry [记录条数 ...]
+"""
+
+import os
+import sys
+import time
+import copy
+import json
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import contextlib
+
+import courseware
+
+
+BENCH_FOLDER = 'coursedetail.C9999.bench' # 合成课程的文件夹名
+REPORT_VERSION = 1
+
+
+def parse_size(text):
+    """文件大小参数：'256' 表示固定大小，'256:4096' 表示在这个范围内随机"""
+    low, _, high = text.partition(':')
+    return int(low), int(high or low)
+
+
+def lesson_body(num, size):
+    """第num课的正文，总长度约为size字节（至少包含标题行）"""
+    title = f"# 第{num}课 合成课件\n".encode('utf-8')
+    padding = max(size - len(title), 0)
+    line = b'x' * 63 + b'\n'
+    return title + line * (padding // 64) + b'x' * (padding % 64)
+
+
+def generate_course_tree(root, lessons, vip_ratio=0.0, stub_ratio=0.0, size=(32, 32),
+                         md5_id=courseware.md5_id, seed=0):
+    """
+    在root下生成合成课程文件夹
+
+    :param vip_ratio: 最后这一比例的课件是VIP课程
+    :param stub_ratio: VIP课件中已经加密过（原文件为'encrypt'存根并且有备份）的比例
+    :param size: (最小, 最大) 课件字节数
+    :return: (文件夹名, vip_index)
+    """
+    rng = random.Random(seed)
+    directory = os.path.join(root, BENCH_FOLDER)
+    os.makedirs(directory)
+    vip_count = int(lessons * vip_ratio)
+    vip_index = lessons - vip_count + 1
+    stub_count = int(vip_count * stub_ratio)
+    for num in range(1, lessons + 1):
+        filename = f"{num:07d}.lesson.md"
+        body = lesson_body(num, rng.randint(*size))
+        if num >= vip_index and num - vip_index < stub_count:
+            with open(os.path.join(directory, courseware.backup_file_name(filename, md5_id)), 'wb') as f:
+                f.write(body)
+            body = b'encrypt'
+        with open(os.path.join(directory, filename), 'wb') as f:
+            f.write(body)
+    return BENCH_FOLDER, vip_index
+
+
+@contextlib.contextmanager
+def quiet():
+    """屏蔽courseware打印的文件名"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+@contextlib.contextmanager
+def bench_tree(**kwargs):
+    """生成临时课程并切换到它所在的目录，结束后删除"""
+    root = tempfile.mkdtemp(prefix='courseware-bench-')
+    cwd = os.getcwd()
+    try:
+        folder, vip_index = generate_course_tree(root, **kwargs)
+        os.chdir(root)
+        yield folder, vip_index
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(root)
+
+
+def timed(stages, name, count, func, *args, **kwargs):
+    """运行一个阶段并记录耗时，返回func的结果"""
+    start = time.perf_counter()
+    with quiet():
+        result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    stages[name] = {
+        'seconds': elapsed,
+        'count': count,
+        'us_per_item': elapsed / count * 1e6 if count else 0.0,
+        'items_per_second': count / elapsed if elapsed else 0.0,
+    }
+    return result
+
+
+def bench_stages(lessons, vip_ratio, stub_ratio, size, seed=0):
+    """
+    按阶段测量一次完整构建：
+    scan              一次os.scandir建立目录索引
+    print_first_lines 读取所有课件的第一行（存根读取备份）
+    encrypt           备份加密所有还没加密的VIP课件
+    list_files_sorted 全量构建目录（加密已完成，不含加密耗时）
+    incremental       没有任何变化时的增量构建
+    save_json_data    一次性json.dump整个目录
+    stream_pretty / stream_compact  CatalogWriter流式写出
+    """
+    generated_start = time.perf_counter()
+    with bench_tree(lessons=lessons, vip_ratio=vip_ratio, stub_ratio=stub_ratio,
+                    size=size, seed=seed) as (folder, vip_index):
+        generate_seconds = time.perf_counter() - generated_start
+        directory = './%s' %folder
+        md5_id = courseware.md5_id
+        stages = {}
+
+        index = timed(stages, 'scan', lessons, courseware.DirIndex, directory)
+        names = [name for _, name in index.sorted_files() if courseware.is_lesson_file(name)]
+
+        def read_first_lines():
+            for name in names:
+                courseware.print_first_lines(index.path(name), md5_id, index)
+        timed(stages, 'print_first_lines', len(names), read_first_lines)
+
+        pending = [name for name in names
+                   if courseware.extract_leading_number(name) >= vip_index
+                   and courseware.backup_file_name(name, md5_id) not in index]
+        timed(stages, 'encrypt', len(pending), courseware.encrypt_and_backup_files,
+              directory, pending, md5_id, index)
+
+        manifest = courseware.new_manifest(md5_id)
+        entries = timed(stages, 'list_files_sorted', len(names), courseware.list_files_sorted,
+                        folder, md5_id, courseware.data, vip_index, manifest)
+        timed(stages, 'incremental', len(names), courseware.list_files_sorted,
+              folder, md5_id, courseware.data, vip_index, manifest)
+
+        json_datas = dict(courseware.json_datas, catalogue_list=entries)
+        timed(stages, 'save_json_data', len(entries), courseware.write_json_atomic,
+              'bench.json', json_datas)
+
+        def stream(compact):
+            with courseware.CatalogWriter('bench.json', courseware.json_datas, compact) as writer:
+                for entry in entries:
+                    writer.write(entry)
+        timed(stages, 'stream_pretty', len(entries), stream, False)
+        timed(stages, 'stream_compact', len(entries), stream, True)
+
+    return {
+        'version': REPORT_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {'lessons': lessons, 'vip_ratio': vip_ratio, 'stub_ratio': stub_ratio,
+                   'size': list(size), 'seed': seed},
+        'generate_seconds': generate_seconds,
+        'stages': stages,
+    }
+
+
+def print_stages(report, baseline=None):
+    """打印阶段耗时表，有基线报告时附上与基线的比值（>1表示变慢）"""
+    header = f"{'阶段':<20} {'数量':>9} {'耗时(s)':>9} {'每项(us)':>10}"
+    print(header + (f" {'对比基线':>8}" if baseline else ''))
+    for name, stage in report['stages'].items():
+        line = f"{name:<20} {stage['count']:>9} {stage['seconds']:>9.3f} {stage['us_per_item']:>10.1f}"
+        if baseline:
+            old = baseline['stages'].get(name)
+            line += f" {stage['seconds'] / old['seconds']:>7.2f}x" if old and old['seconds'] else f" {'-':>8}"
+        print(line)
+
+
+def time_build(lessons, vip_index):
+    """全量构建一次（不带清单），返回耗时（秒）"""
+    with bench_tree(lessons=lessons) as (folder, _):
+        start = time.perf_counter()
+        with quiet():
+            courseware.list_files_sorted(folder, courseware.md5_id, courseware.data, vip_index)
+        return time.perf_counter() - start
+
+
+def bench_build_scaling(sizes):
+    """
+    构建耗时随课件数量的增长：每节课耗时基本不变说明是线性的，
+    之前每个VIP课件都重新listdir一次时，每节课耗时会随数量成比例上涨
+    """
+    print(f"{'课件数':>8} {'总耗时(s)':>10} {'每节课(us)':>11}")
+    for lessons in sizes:
+        # 一半课程是VIP，覆盖备份路径
+        elapsed = time_build(lessons, vip_index=lessons // 2)
+        print(f"{lessons:>8} {elapsed:>10.3f} {elapsed / lessons * 1e6:>11.1f}")
+
+
+def build_with_deepcopy(count):
+    """旧的做法：每条记录deepcopy一份data模板再改字段"""
+    entries = []
+    for num in range(count):
+        copy_data = copy.deepcopy(courseware.data)
+        copy_data['course_name'] = '%s.%s' %(num, '标题')
+        copy_data['tutorial'] = 'https://doc.itprojects.cn/api/v1.1/course/x/%s' %num
+        copy_data['is_vip'] = num % 2 == 0
+        entries.append(copy_data)
+    return entries
+
+
+def build_with_entry(count):
+    """CourseEntry：直接构造记录"""
+    return [
+        courseware.CourseEntry.from_template(
+            courseware.data, '%s.%s' %(num, '标题'),
+            num % 2 == 0, 'https://doc.itprojects.cn/api/v1.1/course/x/%s' %num)
+        for num in range(count)
+    ]
+
+
+def bench_entry_model(sizes):
+    """对比deepcopy模板和CourseEntry的构造、序列化耗时"""
+    print(f"{'条数':>8} {'deepcopy(s)':>12} {'CourseEntry(s)':>15} {'加速':>6} {'JSON(dict)':>11} {'JSON(entry)':>12}")
+    for count in sizes:
+        start = time.perf_counter()
+        dicts = build_with_deepcopy(count)
+        t_copy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        entries = build_with_entry(count)
+        t_entry = time.perf_counter() - start
+
+        start = time.perf_counter()
+        dict_json = json.dumps(dicts, ensure_ascii=False)
+        t_dump_dict = time.perf_counter() - start
+
+        start = time.perf_counter()
+        entry_json = json.dumps(entries, ensure_ascii=False, default=courseware.json_default)
+        t_dump_entry = time.perf_counter() - start
+
+        assert dict_json == entry_json, "CourseEntry序列化结果与data模板不一致"
+        print(f"{count:>8} {t_copy:>12.3f} {t_entry:>15.3f} {t_copy / t_entry:>5.1f}x"
+              f" {t_dump_dict:>11.3f} {t_dump_entry:>12.3f}")
+
+
+def add_tree_arguments(parser):
+    parser.add_argument('--lessons', type=int, default=10_000, help='课件数量（100 到 1000000）')
+    parser.add_argument('--vip-ratio', type=float, default=0.5, help='VIP课件比例')
+    parser.add_argument('--stub-ratio', type=float, default=0.2,
+                        help='VIP课件中已经是"encrypt"存根的比例')
+    parser.add_argument('--size', type=parse_size, default=(256, 4096),
+                        help="课件字节数，如 '1024' 或范围 '256:4096'")
+    parser.add_argument('--seed', type=int, default=0, help='随机种子，保证每次生成相同的课程')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='courseware.py 性能基准测试')
+    sub = parser.add_subparsers(dest='bench')
+
+    stages = sub.add_parser('stages', help='分阶段测量一次完整构建')
+    add_tree_arguments(stages)
+    stages.add_argument('--report', help='把机器可读的JSON报告写到这个文件（- 表示标准输出）')
+    stages.add_argument('--compare', help='与之前保存的报告对比')
+
+    generate = sub.add_parser('generate', help='只生成合成课程，不测量')
+    generate.add_argument('root', help='生成到这个目录下')
+    add_tree_arguments(generate)
+
+    scaling = sub.add_parser('scaling', help='构建耗时随课件数量的增长')
+    scaling.add_argument('sizes', nargs='*', type=int)
+    entry = sub.add_parser('entry', help='deepcopy模板与CourseEntry的对比')
+    entry.add_argument('sizes', nargs='*', type=int)
+    args = parser.parse_args(argv)
+
+    if args.bench == 'generate':
+        folder, vip_index = generate_course_tree(args.root, args.lessons, args.vip_ratio,
+                                                 args.stub_ratio, args.size, seed=args.seed)
+        print(f"已生成 {os.path.join(args.root, folder)}，vip_index = {vip_index}")
+    elif args.bench == 'stages':
+        report = bench_stages(args.lessons, args.vip_ratio, args.stub_ratio, args.size, args.seed)
+        baseline = None
+        if args.compare:
+            with open(args.compare, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        if args.report == '-':
+            json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+            print()
+        else:
+            print_stages(report, baseline)
+            if args.report:
+                with open(args.report, 'w', encoding='utf-8') as f:
+                    json.dump(report, f, ensure_ascii=False, indent=2)
+    elif args.bench == 'scaling':
+        bench_build_scaling(args.sizes or [1000, 2000, 4000, 8000])
+    elif args.bench == 'entry':
+        bench_entry_model(args.sizes or [10_000, 100_000])
+    else:
+        bench_build_scaling([1000, 2000, 4000, 8000])
+        bench_entry_model([10_000, 100_000])
+        print()
+        print_stages(bench_stages(10_000, 0.5, 0.2, (256, 4096)))
+
+
+if __name__ == "__main__":
+    main()
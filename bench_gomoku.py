@@ -0,0 +1,309 @@
+"""
+五子棋（test.py）的性能基准测试
+
+使用SDL的dummy视频驱动，不需要显示器。
+用法：
+    python bench_gomoku.py render [--frames 2000]   每帧重画整个棋盘 与 静态背景+脏矩形 的对比
+    python bench_gomoku.py idle [--seconds 2]       没有输入时主循环占用的CPU时间
+    python bench_gomoku.py engine [--games 200]     棋盘引擎落子、悔棋和五连判断的速度
+    python bench_gomoku.py ai [--positions 10] [--eval tuple|pattern]   AI每步的搜索深度和每秒节点数
+    python bench_gomoku.py eval [--positions 200]   NumPy棋型评估与纯Python实现的对比
+    python bench_gomoku.py cache [--slots 1048576]  mmap搜索缓存的打开耗时和读写延迟
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame
+
+import test as gomoku # 脚本所在目录在sys.path最前面，这里是本仓库的test.py而不是标准库的test包
+import gomoku_ai
+import gomoku_engine
+
+
+def init_screen():
+    pygame.init()
+    return pygame.display.set_mode(gomoku.WINDOW_SIZE)
+
+
+def measure(func, frames):
+    """运行func frames次，返回 (每秒帧数, 每帧CPU时间毫秒)"""
+    wall, cpu = time.perf_counter(), time.process_time()
+    for i in range(frames):
+        func(i)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return frames / wall, cpu / frames * 1e3
+
+
+def bench_render(frames, seed=0):
+    """每帧都落一颗子：旧做法整屏重画并flip，新做法只更新棋子所在的脏矩形"""
+    screen = init_screen()
+    rng = random.Random(seed)
+    cells = [(row, col) for row in range(gomoku.BOARD_LEN) for col in range(gomoku.BOARD_LEN)]
+
+    def legacy(i):
+        screen.fill(gomoku.BG_COLOR)
+        gomoku.draw_board(screen)
+        pygame.event.get()
+        pygame.display.flip()
+
+    view = gomoku.BoardView(screen)
+    view.flush()
+    order = []
+
+    def dirty(i):
+        if not order:
+            # 棋盘下满后清空，重新打乱落子顺序
+            for cell in list(view.stones):
+                view.remove_stone(*cell)
+            order.extend(rng.sample(cells, len(cells)))
+        view.place_stone(*order.pop(), gomoku.BLACK if i % 2 else gomoku.WHITE)
+        pygame.event.get()
+        view.flush()
+
+    print(f"{'方式':<16} {'帧数':>8} {'FPS':>10} {'CPU(ms/帧)':>11}")
+    for name, func in (('整屏重画', legacy), ('静态背景+脏矩形', dirty)):
+        fps, cpu = measure(func, frames)
+        print(f"{name:<16} {frames:>8} {fps:>10.0f} {cpu:>11.3f}")
+    pygame.quit()
+
+
+def bench_idle(seconds):
+    """没有任何输入时，旧的忙循环和新的事件等待在seconds秒内各用了多少CPU时间"""
+    screen = init_screen()
+    done = pygame.USEREVENT + 1
+
+    def busy_loop():
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            pygame.event.get()
+            screen.fill(gomoku.BG_COLOR)
+            gomoku.draw_board(screen)
+            pygame.display.flip()
+
+    def event_loop():
+        view = gomoku.BoardView(screen)
+        clock = pygame.time.Clock()
+        pygame.time.set_timer(done, int(seconds * 1000), loops=1)
+        while True:
+            if any(event.type == done for event in gomoku.wait_events()):
+                break
+            view.flush()
+            clock.tick(gomoku.FPS)
+
+    print(f"{'方式':<10} {'墙钟(s)':>8} {'CPU(s)':>8} {'CPU占用':>8}")
+    for name, loop in (('忙循环', busy_loop), ('事件等待', event_loop)):
+        wall, cpu = time.perf_counter(), time.process_time()
+        loop()
+        wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+        print(f"{name:<10} {wall:>8.2f} {cpu:>8.3f} {cpu / wall:>8.1%}")
+    pygame.quit()
+
+
+def bench_engine(games, seed=0):
+    """随机对局：落子到分出胜负或下满，再全部悔棋；对比逐格扫描整个棋盘的五连判断"""
+    rng = random.Random(seed)
+    cells = [(row, col) for row in range(gomoku_engine.BOARD_LEN) for col in range(gomoku_engine.BOARD_LEN)]
+    orders = [rng.sample(cells, len(cells)) for _ in range(games)]
+
+    def scan_five(board, color):
+        """不用增量判断时的做法：每一手后扫描整个棋盘"""
+        for row, col in cells:
+            for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                if all(gomoku_engine.on_board(row + k * dr, col + k * dc)
+                       and board[(row + k * dr, col + k * dc)] == color for k in range(5)):
+                    return True
+        return False
+
+    moves = 0
+    start = time.perf_counter()
+    for order in orders:
+        board = gomoku_engine.GomokuBoard()
+        for cell in order:
+            if board.play(*cell):
+                break
+        moves += len(board.moves)
+        while board.moves:
+            board.undo()
+    elapsed = time.perf_counter() - start
+
+    scanned = 0
+    scan_start = time.perf_counter()
+    for order in orders[:max(games // 20, 1)]:
+        board = gomoku_engine.GomokuBoard()
+        for cell in order:
+            color = board.player
+            board.play(*cell)
+            scanned += 1
+            if scan_five(board, color):
+                break
+    scan_elapsed = time.perf_counter() - scan_start
+
+    print(f"{'方式':<20} {'手数':>8} {'每手(us)':>10}")
+    print(f"{'落子+增量判断+悔棋':<20} {moves:>8} {elapsed / moves * 1e6:>10.2f}")
+    print(f"{'落子+全盘扫描':<20} {scanned:>8} {scan_elapsed / scanned * 1e6:>10.2f}")
+
+
+def random_opening(rng, stones):
+    """在棋盘中央7x7范围内随机摆stones颗子（不含已分胜负的局面）"""
+    center = gomoku_engine.BOARD_LEN // 2
+    while True:
+        board = gomoku_engine.GomokuBoard()
+        cells = [(center + dr, center + dc) for dr in range(-3, 4) for dc in range(-3, 4)]
+        for cell in rng.sample(cells, stones):
+            board.play(*cell)
+        if not board.winner:
+            return board
+
+
+def bench_ai(positions, time_budget, evaluator='tuple', seed=0):
+    """随机开局局面上，每步在时间预算内能搜索到的深度和速度"""
+    rng = random.Random(seed)
+    searcher = gomoku_ai.Searcher(evaluator=evaluator)
+    print(f"{'局面':>4} {'棋子数':>6} {'着法':>10} {'深度':>4} {'节点数':>8} {'耗时(s)':>8} {'节点/秒':>8}")
+    total_nodes = total_seconds = 0
+    for i in range(positions):
+        board = random_opening(rng, rng.randrange(4, 16))
+        move, info = searcher.best_move(board, time_budget)
+        total_nodes += info['nodes']
+        total_seconds += info['seconds']
+        print(f"{i:>4} {len(board.moves):>6} {str(move):>10} {info['depth']:>4} {info['nodes']:>8} "
+              f"{info['seconds']:>8.2f} {info['nodes'] / info['seconds']:>8.0f}")
+    print(f"平均 {total_nodes / total_seconds:.0f} 节点/秒")
+
+
+def random_position(rng, stones):
+    """随机落stones颗子（不含已分胜负的局面）"""
+    board = gomoku_engine.GomokuBoard()
+    cells = [(row, col) for row in range(gomoku_engine.BOARD_LEN) for col in range(gomoku_engine.BOARD_LEN)]
+    for cell in rng.sample(cells, stones):
+        if board.play(*cell):
+            board.undo()
+            break
+    return board
+
+
+def bench_eval(positions, seed=0):
+    """
+    随机局面的整盘评估：纯Python逐格实现 与 NumPy批量计算；
+    以及落子后只重算经过该格的线（增量）与每次整盘重算的对比
+    """
+    import gomoku_eval # 依赖NumPy，只有这个基准测试需要
+
+    rng = random.Random(seed)
+    boards = [random_position(rng, rng.randrange(10, 120)) for _ in range(positions)]
+
+    start = time.perf_counter()
+    references = [gomoku_eval.reference_line_scores(board) for board in boards]
+    python_seconds = time.perf_counter() - start
+
+    evaluators = [gomoku_eval.PatternEvaluator(board) for board in boards]
+    start = time.perf_counter()
+    for evaluator in evaluators:
+        evaluator.rescore_all()
+    numpy_seconds = time.perf_counter() - start
+    for reference, evaluator in zip(references, evaluators):
+        for color in (gomoku_engine.BLACK, gomoku_engine.WHITE):
+            assert list(evaluator.line_scores()[color - 1]) == reference[color], '两种实现的结果不一致'
+
+    # 每个局面再随机落子、悔棋各20次
+    updates = 0
+    full_seconds = incremental_seconds = 0.0
+    for board, evaluator in zip(boards, evaluators):
+        empty = [index for index in gomoku_engine.iter_bits(gomoku_engine.BOARD_MASK & ~board.occupied)]
+        for index in rng.sample(empty, 20):
+            start = time.perf_counter()
+            evaluator.push(index, board.player)
+            evaluator.pop(index, board.player)
+            incremental_seconds += time.perf_counter() - start
+            start = time.perf_counter()
+            evaluator.cells[index] = board.player
+            evaluator.rescore_all()
+            evaluator.cells[index] = gomoku_engine.EMPTY
+            evaluator.rescore_all()
+            full_seconds += time.perf_counter() - start
+            updates += 2
+
+    print(f"{'方式':<22} {'次数':>8} {'每次(us)':>10}")
+    print(f"{'整盘评估(纯Python)':<22} {positions:>8} {python_seconds / positions * 1e6:>10.1f}")
+    print(f"{'整盘评估(NumPy)':<22} {positions:>8} {numpy_seconds / positions * 1e6:>10.1f}")
+    print(f"{'落子后整盘重算(NumPy)':<22} {updates:>8} {full_seconds / updates * 1e6:>10.1f}")
+    print(f"{'落子后增量更新(NumPy)':<22} {updates:>8} {incremental_seconds / updates * 1e6:>10.1f}")
+    print(f"NumPy整盘评估比纯Python快 {python_seconds / numpy_seconds:.0f} 倍")
+
+
+def bench_cache(slots, lookups=200_000, seed=0):
+    """新建一个slots槽位的缓存文件，测量打开（mmap）耗时、写入和查询的延迟"""
+    import tempfile
+    import gomoku_book
+
+    rng = random.Random(seed)
+    keys = [rng.getrandbits(64) | 1 for _ in range(lookups)]
+    with tempfile.TemporaryDirectory(prefix='gomoku-cache-') as root:
+        path = os.path.join(root, 'cache.bin')
+        gomoku_book.PersistentCache(path, slots, writable=True).close()
+
+        start = time.perf_counter()
+        cache = gomoku_book.PersistentCache(path, writable=True)
+        open_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        for key in keys:
+            cache.store(key, key % 8, 0, 0, 0)
+        store_seconds = time.perf_counter() - start
+        cache.close()
+
+        cache = gomoku_book.PersistentCache(path)
+        start = time.perf_counter()
+        hits = sum(cache.get(key) is not None for key in keys)
+        get_seconds = time.perf_counter() - start
+        size = os.path.getsize(path)
+        cache.close()
+
+    print(f"缓存文件 {size / 2**20:.1f} MiB（{slots} 个槽位），打开耗时 {open_seconds * 1e3:.3f} ms")
+    print(f"写入 {store_seconds / lookups * 1e6:.2f} us/次，查询 {get_seconds / lookups * 1e6:.2f} us/次，"
+          f"命中 {hits}/{lookups}（槽位冲突时按深度和代数替换）")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='五子棋性能基准测试')
+    sub = parser.add_subparsers(dest='bench')
+    render = sub.add_parser('render', help='整屏重画与脏矩形刷新的帧率和CPU时间')
+    render.add_argument('--frames', type=int, default=2000)
+    idle = sub.add_parser('idle', help='空闲时主循环的CPU占用')
+    idle.add_argument('--seconds', type=float, default=2.0)
+    engine = sub.add_parser('engine', help='棋盘引擎的落子和悔棋速度')
+    engine.add_argument('--games', type=int, default=200)
+    ai = sub.add_parser('ai', help='AI搜索深度和速度')
+    ai.add_argument('--positions', type=int, default=10)
+    ai.add_argument('--time', type=float, default=gomoku_ai.TIME_BUDGET, help='每步思考时间（秒）')
+    ai.add_argument('--eval', default='tuple', choices=('tuple', 'pattern'), help='评估函数')
+    evaluation = sub.add_parser('eval', help='NumPy棋型评估与纯Python实现的对比')
+    evaluation.add_argument('--positions', type=int, default=200)
+    cache = sub.add_parser('cache', help='mmap搜索缓存的打开耗时和读写延迟')
+    cache.add_argument('--slots', type=int, default=1 << 20)
+    args = parser.parse_args(argv)
+
+    if args.bench in (None, 'render'):
+        bench_render(getattr(args, 'frames', 2000))
+    if args.bench in (None, 'idle'):
+        bench_idle(getattr(args, 'seconds', 2.0))
+    if args.bench in (None, 'engine'):
+        bench_engine(getattr(args, 'games', 200))
+    if args.bench in (None, 'ai'):
+        bench_ai(getattr(args, 'positions', 10), getattr(args, 'time', gomoku_ai.TIME_BUDGET),
+                 getattr(args, 'eval', 'tuple'))
+    if args.bench in (None, 'eval'):
+        bench_eval(getattr(args, 'positions', 200))
+    if args.bench in (None, 'cache'):
+        bench_cache(getattr(args, 'slots', 1 << 20))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""
+课件包（上传用的 .zip）打包
+
+每个课件先在进程池里单独流式压缩成raw deflate数据块，按内容哈希缓存在
+.<课程文件夹>.bundle/ 下；内容没变的课件直接复用上次的压缩结果，
+最后把这些数据块按固定大小分块拷贝进zip，内存占用与课件大小无关。
+
+用法：python course_bundle.py coursedetail.C0002.wuziqi [--workers N]
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import hashlib
+import argparse
+import posixpath
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from courseware import COURSE_SETTINGS_NAME, DirIndex, file_content_hash, scan_course_tree
+
+
+CHUNK_SIZE = 1 << 20 # 读写课件时每块的大小
+BUNDLE_INDEX_VERSION = 1
+
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP_DEFLATED = 8
+ZIP_UTF8_FLAG = 0x0800
+
+
+def bundle_cache_dir(folder_name):
+    """压缩数据块缓存目录"""
+    return f".{folder_name}.bundle"
+
+
+def load_bundle_index(cache_dir):
+    """读取上次打包记录的 {文件名: 压缩信息}，不存在或格式不对时返回空"""
+    try:
+        with open(os.path.join(cache_dir, 'index.json'), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if index.get('version') != BUNDLE_INDEX_VERSION:
+        return {}
+    return index['files']
+
+
+def save_bundle_index(cache_dir, records):
+    path = os.path.join(cache_dir, 'index.json')
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+        json.dump({'version': BUNDLE_INDEX_VERSION, 'files': records}, f, ensure_ascii=False)
+    os.replace(f"{path}.tmp", path)
+
+
+def compress_file(src_path, cache_dir, chunk_size=CHUNK_SIZE, level=6):
+    """
+    分块把一个课件压缩成raw deflate数据块，存到缓存目录
+    :return: dict，包含内容哈希、crc32、原始大小和压缩后大小
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    digest = hashlib.md5()
+    crc = 0
+    size = 0
+    tmp_path = os.path.join(cache_dir, f"{os.getpid()}.{os.path.basename(src_path)}.tmp")
+    with open(src_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        for chunk in iter(lambda: src.read(chunk_size), b''):
+            digest.update(chunk)
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            dst.write(compressor.compress(chunk))
+        dst.write(compressor.flush())
+        compressed_size = dst.tell()
+    content_hash = digest.hexdigest()
+    os.replace(tmp_path, blob_path(cache_dir, content_hash))
+    return {'hash': content_hash, 'crc': crc, 'size': size, 'compressed_size': compressed_size}
+
+
+def blob_path(cache_dir, content_hash):
+    return os.path.join(cache_dir, f"{content_hash}.deflate")
+
+
+def dos_datetime(mtime):
+    """zip头里使用的DOS日期和时间，早于1980年的按1980年算"""
+    t = time.localtime(mtime)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1
+    return ((t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+            ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday)
+
+
+class ZipStreamWriter:
+    """
+    把已经压缩好的deflate数据块顺序写成zip文件
+
+    标准库zipfile只能边压缩边写，不能直接写入现成的压缩数据，
+    这里只实现打包需要的部分：deflate、UTF-8文件名和大文件需要的ZIP64。
+    """
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.members = [] # (文件名, 本地头偏移, 压缩信息, dos时间)
+
+    def add_compressed(self, arcname, info, mtime, data_path, chunk_size=CHUNK_SIZE):
+        name = arcname.encode('utf-8')
+        offset = self.fp.tell()
+        dos_time, dos_date = dos_datetime(mtime)
+        zip64 = info['size'] >= ZIP64_LIMIT or info['compressed_size'] >= ZIP64_LIMIT
+        extra = struct.pack('<HHQQ', 1, 16, info['size'], info['compressed_size']) if zip64 else b''
+        self.fp.write(struct.pack(
+            '<IHHHHHIIIHH', 0x04034b50, 45 if zip64 else 20, ZIP_UTF8_FLAG, ZIP_DEFLATED,
+            dos_time, dos_date, info['crc'],
+            ZIP64_LIMIT if zip64 else info['compressed_size'],
+            ZIP64_LIMIT if zip64 else info['size'],
+            len(name), len(extra)))
+        self.fp.write(name)
+        self.fp.write(extra)
+        with open(data_path, 'rb') as src:
+            for chunk in iter(lambda: src.read(chunk_size), b''):
+                self.fp.write(chunk)
+        self.members.append((name, offset, info, dos_time, dos_date))
+
+    def close(self):
+        """写中央目录和结束记录"""
+        cd_offset = self.fp.tell()
+        for name, offset, info, dos_time, dos_date in self.members:
+            fields = []
+            size, compressed_size = info['size'], info['compressed_size']
+            if size >= ZIP64_LIMIT:
+                fields.append(size)
+                size = ZIP64_LIMIT
+            if compressed_size >= ZIP64_LIMIT:
+                fields.append(compressed_size)
+                compressed_size = ZIP64_LIMIT
+            if offset >= ZIP64_LIMIT:
+                fields.append(offset)
+                offset = ZIP64_LIMIT
+            extra = struct.pack('<HH%dQ' %len(fields), 1, 8 * len(fields), *fields) if fields else b''
+            version = 45 if fields else 20
+            self.fp.write(struct.pack(
+                '<IHHHHHHIIIHHHHHII', 0x02014b50, (3 << 8) | version, version, ZIP_UTF8_FLAG,
+                ZIP_DEFLATED, dos_time, dos_date, info['crc'], compressed_size, size,
+                len(name), len(extra), 0, 0, 0, 0o100644 << 16, offset))
+            self.fp.write(name)
+            self.fp.write(extra)
+        cd_end = self.fp.tell()
+        cd_size = cd_end - cd_offset
+        count = len(self.members)
+
+        if count >= 0xFFFF or cd_size >= ZIP64_LIMIT or cd_offset >= ZIP64_LIMIT:
+            self.fp.write(struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, 45, 45, 0, 0,
+                                      count, count, cd_size, cd_offset))
+            self.fp.write(struct.pack('<IIQI', 0x07064b50, 0, cd_end, 1))
+            count = min(count, 0xFFFF)
+            cd_size = min(cd_size, ZIP64_LIMIT)
+            cd_offset = min(cd_offset, ZIP64_LIMIT)
+        self.fp.write(struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, count, count,
+                                  cd_size, cd_offset, 0))
+
+
+def lesson_path(lessons, name):
+    index, filename = lessons[name]
+    return index.path(filename)
+
+
+def package_course(folder_name, output_filename=None, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    打包课程文件夹为 <folder_name>.zip
+    :param workers: 压缩进程数，默认CPU核数；为1时在当前进程里压缩
+    :return: dict，包含zip路径、课件数和重新压缩的课件数
+    """
+    output_filename = output_filename or f"{folder_name}.zip"
+    cache_dir = bundle_cache_dir(folder_name)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # 课件名是相对课程文件夹的路径，章节子目录里的课件也一起打包
+    with ThreadPoolExecutor() as pool:
+        indexes = scan_course_tree(DirIndex(folder_name), pool)
+    lessons = {posixpath.join(rel_dir, name): (index, name)
+               for rel_dir, index in indexes.items() for name in index.files if not name.startswith('.')}
+    lessons.pop(COURSE_SETTINGS_NAME, None) # 构建参数不上传
+    names = sorted(lessons)
+    old_records = load_bundle_index(cache_dir)
+    records = {}
+    pending = []
+
+    # 先按 mtime/大小，再按内容哈希判断哪些课件需要重新压缩
+    for name in names:
+        record = old_records.get(name)
+        index, filename = lessons[name]
+        current = index.stat_key(filename)
+        if record is not None and os.path.exists(blob_path(cache_dir, record['hash'])):
+            if record['stat'] == current:
+                records[name] = record
+                continue
+            if record['stat'][1] == current[1] \
+                    and file_content_hash(index.path(filename)) == record['hash']:
+                records[name] = dict(record, stat=current)
+                continue
+        pending.append(name)
+
+    if workers == 1 or len(pending) <= 1:
+        results = [compress_file(lesson_path(lessons, name), cache_dir, chunk_size) for name in pending]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(compress_file, [lesson_path(lessons, name) for name in pending],
+                                        [cache_dir] * len(pending), [chunk_size] * len(pending)))
+    for name, info in zip(pending, results):
+        index, filename = lessons[name]
+        records[name] = dict(info, stat=index.stat_key(filename))
+
+    tmp_filename = f"{output_filename}.tmp"
+    with open(tmp_filename, 'wb') as f:
+        writer = ZipStreamWriter(f)
+        for name in names:
+            record = records[name]
+            writer.add_compressed(f"{folder_name}/{name}", record, record['stat'][0] / 1e9,
+                                  blob_path(cache_dir, record['hash']), chunk_size)
+        writer.close()
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_filename, output_filename)
+
+    # 删除已经没有课件引用的压缩数据块
+    live = {f"{record['hash']}.deflate" for record in records.values()}
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith('.deflate') and entry.name not in live:
+            os.remove(entry.path)
+    save_bundle_index(cache_dir, records)
+
+    print(f"课件包已保存到文件: {output_filename}（{len(names)} 个课件，重新压缩 {len(pending)} 个）")
+    return {'bundle': output_filename, 'files': len(names), 'compressed': len(pending)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='打包上传用的课件zip')
+    parser.add_argument('folder_name', help='课程文件夹，如 coursedetail.C0002.wuziqi')
+    parser.add_argument('-o', '--output', help='输出的zip文件名，默认 <课程文件夹>.zip')
+    parser.add_argument('--workers', type=int, default=None, help='压缩进程数，默认等于CPU核数')
+    args = parser.parse_args(argv)
+    package_course(args.folder_name, args.output, args.workers)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+courseware.py 各阶段的计时和性能分析
+
+enable() 把courseware模块里的几个关键函数替换成带计时的包装，
+记录调用次数、处理字节数、总耗时和耗时分位数；disable() 恢复原函数。
+没有调用enable()时courseware里完全没有计时代码，不产生任何开销。
+
+用法：python courseware.py --timings   打印阶段耗时表
+      python courseware.py --profile   另外用cProfile生成 <课程文件夹>.prof
+"""
+
+import io
+import os
+import time
+import pstats
+import cProfile
+import functools
+
+import courseware
+
+
+class StageStats:
+    """一个阶段的统计：次数、字节数、总耗时和每次调用的耗时样本"""
+    __slots__ = ('count', 'bytes', 'seconds', 'samples')
+
+    def __init__(self):
+        self.count = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.samples = []
+
+    def add(self, seconds, nbytes=0):
+        self.count += 1
+        self.bytes += nbytes
+        self.seconds += seconds
+        self.samples.append(seconds)
+
+    def percentile(self, p):
+        """最近秩法求分位数（秒）"""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        rank = max(int(round(p / 100 * len(ordered) + 0.5)) - 1, 0)
+        return ordered[min(rank, len(ordered) - 1)]
+
+    def as_dict(self):
+        return {'count': self.count, 'bytes': self.bytes, 'seconds': self.seconds,
+                'samples': list(self.samples)}
+
+    @classmethod
+    def from_dict(cls, d):
+        stats = cls()
+        stats.count, stats.bytes, stats.seconds = d['count'], d['bytes'], d['seconds']
+        stats.samples = list(d['samples'])
+        return stats
+
+
+stages = {} # 阶段名 -> StageStats
+_originals = {} # 被替换的 (对象, 属性名) -> 原函数
+
+
+def record(stage, seconds, nbytes=0):
+    stats = stages.get(stage)
+    if stats is None:
+        stats = stages[stage] = StageStats()
+    stats.add(seconds, nbytes)
+
+
+def timed_function(stage, func, measure=None):
+    """包装普通函数；measure(结果, 参数...) 返回处理的字节数"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        record(stage, elapsed, measure(result, *args, **kwargs) if measure else 0)
+        return result
+    return wrapper
+
+
+def timed_generator(stage, func):
+    """包装生成器：只累计生成器自身的耗时，不包括调用方处理每一项的时间"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        elapsed = 0.0
+        iterator = func(*args, **kwargs)
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield item
+        finally:
+            record(stage, elapsed)
+    return wrapper
+
+
+def _first_line_bytes(result, *args, **kwargs):
+    return len(result.encode('utf-8'))
+
+
+def _encrypted_bytes(result, dirname, filenames, md5_id, *args, **kwargs):
+    return sum(os.path.getsize(os.path.join(dirname, courseware.backup_file_name(name, md5_id)))
+               for name in result)
+
+
+def _json_bytes(result, json_datas, course_folder=None):
+    return os.path.getsize(f"{course_folder or courseware.folder_name}.json")
+
+
+def _writer_bytes(result, writer, *exc_info):
+    return os.path.getsize(writer.output_filename) if exc_info[0] is None else 0
+
+
+def _patch(owner, name, wrapper):
+    _originals[(owner, name)] = getattr(owner, name)
+    setattr(owner, name, wrapper)
+
+
+def enable():
+    """给courseware的各个阶段装上计时包装（重复调用无影响）"""
+    if _originals:
+        return
+    _patch(courseware, 'list_files_sorted',
+           timed_function('list_files_sorted', courseware.list_files_sorted))
+    _patch(courseware, 'iter_course_entries',
+           timed_generator('iter_course_entries', courseware.iter_course_entries))
+    _patch(courseware.DirIndex, '__init__',
+           timed_function('DirIndex(scandir)', courseware.DirIndex.__init__))
+    _patch(courseware, 'print_first_lines',
+           timed_function('print_first_lines', courseware.print_first_lines, _first_line_bytes))
+    _patch(courseware, 'encrypt_and_backup_files',
+           timed_function('encrypt_and_backup_file', courseware.encrypt_and_backup_files,
+                          _encrypted_bytes))
+    _patch(courseware, 'save_json_data',
+           timed_function('save_json_data', courseware.save_json_data, _json_bytes))
+    _patch(courseware.CatalogWriter, 'write',
+           timed_function('CatalogWriter.write', courseware.CatalogWriter.write))
+    _patch(courseware.CatalogWriter, '__exit__',
+           timed_function('CatalogWriter.close', courseware.CatalogWriter.__exit__, _writer_bytes))
+
+
+def disable():
+    """恢复原函数"""
+    for (owner, name), original in _originals.items():
+        setattr(owner, name, original)
+    _originals.clear()
+
+
+def reset():
+    stages.clear()
+
+
+def snapshot():
+    """当前统计的可序列化副本（用于从批量构建的子进程传回）"""
+    return {name: stats.as_dict() for name, stats in stages.items()}
+
+
+def merge(snap):
+    for name, d in snap.items():
+        incoming = StageStats.from_dict(d)
+        stats = stages.get(name)
+        if stats is None:
+            stages[name] = incoming
+        else:
+            stats.count += incoming.count
+            stats.bytes += incoming.bytes
+            stats.seconds += incoming.seconds
+            stats.samples.extend(incoming.samples)
+
+
+def summary_table():
+    """阶段耗时汇总表"""
+    lines = [f"{'阶段':<24} {'次数':>8} {'字节':>12} {'总耗时(s)':>10} "
+             f"{'p50(ms)':>9} {'p90(ms)':>9} {'p99(ms)':>9} {'最大(ms)':>9}"]
+    for name, stats in sorted(stages.items(), key=lambda item: -item[1].seconds):
+        lines.append(
+            f"{name:<24} {stats.count:>8} {stats.bytes:>12} {stats.seconds:>10.3f} "
+            f"{stats.percentile(50) * 1e3:>9.3f} {stats.percentile(90) * 1e3:>9.3f} "
+            f"{stats.percentile(99) * 1e3:>9.3f} {max(stats.samples) * 1e3:>9.3f}")
+    return '\n'.join(lines)
+
+
+def run_profiled(prof_path, func, *args, **kwargs):
+    """在cProfile下运行func，结果写入prof_path，返回 (func的返回值, 耗时最多的函数列表文本)"""
+    profiler = cProfile.Profile()
+    result = profiler.runcall(func, *args, **kwargs)
+    profiler.dump_stats(prof_path)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(20)
+    return result, out.getvalue()
@@ -0,0 +1,265 @@
+"""
+本地课程API服务，代替 doc.itprojects.cn 用于离线调试和压测
+
+和线上使用相同的URL：
+    /api/v1.1/course/<课程文件夹>            课程目录JSON（<课程文件夹>.json）
+    /api/v1.1/course/<课程文件夹>.json       同上
+    /api/v1.1/course/<课程文件夹>/<课件>     课件内容
+
+支持 ETag / If-None-Match、单段Range请求和keep-alive；
+小课件放在LRU内存缓存里，大课件用 sendfile 零拷贝发送。
+
+用法：python course_server.py [--port 8000] [--root .]
+"""
+
+import os
+import sys
+import asyncio
+import argparse
+import mimetypes
+import collections
+from email.utils import formatdate
+from urllib.parse import unquote, urlsplit
+
+
+API_PREFIX = '/api/v1.1/course/'
+CACHE_BYTES = 64 << 20 # LRU缓存总大小
+CACHE_ITEM_LIMIT = 1 << 20 # 超过这个大小的课件不进缓存，直接sendfile
+MAX_HEADER_LINES = 100
+MAX_DISCARD_BYTES = 1 << 20 # 请求体不超过这个大小时读掉后保持连接，否则回应后关闭
+
+REASONS = {
+    200: 'OK', 206: 'Partial Content', 304: 'Not Modified', 400: 'Bad Request',
+    403: 'Forbidden', 404: 'Not Found', 405: 'Method Not Allowed', 416: 'Range Not Satisfiable',
+}
+CONTENT_TYPES = {
+    '.md': 'text/markdown; charset=utf-8',
+    '.json': 'application/json; charset=utf-8',
+}
+
+
+class LRUCache:
+    """按字节数限制大小的LRU缓存，值为 (etag, bytes)"""
+
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = collections.OrderedDict()
+
+    def get(self, key, etag):
+        item = self._items.get(key)
+        if item is None or item[0] != etag:
+            self.misses += 1
+            return None
+        self._items.move_to_end(key)
+        self.hits += 1
+        return item[1]
+
+    def put(self, key, etag, body):
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.size -= len(old[1])
+        self._items[key] = (etag, body)
+        self.size += len(body)
+        while self.size > self.max_bytes and self._items:
+            _, (_, evicted) = self._items.popitem(last=False)
+            self.size -= len(evicted)
+
+
+def make_etag(st):
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def etag_matches(header, etag):
+    """If-None-Match 可以是 * 或逗号分隔的多个ETag（忽略弱校验前缀）"""
+    if header.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in header.split(','))
+
+
+def parse_range(header, size):
+    """
+    解析单段 Range: bytes=start-end / bytes=start- / bytes=-suffix
+    :return: (start, end) 闭区间；格式不支持时返回None（按整个文件处理）；无法满足时返回 ()
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip() != 'bytes' or ',' in spec:
+        return None
+    first, _, last = spec.strip().partition('-')
+    try:
+        if first == '':
+            length = int(last)
+            if length <= 0:
+                return ()
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return ()
+    return start, min(end, size - 1)
+
+
+class CourseServer:
+
+    def __init__(self, root='.', cache_bytes=CACHE_BYTES, cache_item_limit=CACHE_ITEM_LIMIT):
+        self.root = os.path.abspath(root)
+        self.cache = LRUCache(cache_bytes)
+        self.cache_item_limit = cache_item_limit
+
+    def resolve(self, target):
+        """把请求路径映射成本地文件，不在root下或不存在时返回None"""
+        path = unquote(urlsplit(target).path)
+        if not path.startswith(API_PREFIX):
+            return None
+        rel = path[len(API_PREFIX):].strip('/')
+        parts = rel.split('/')
+        if not rel or any(part in ('', '.', '..') or part.startswith('.') for part in parts):
+            return None
+        if len(parts) == 1 and not rel.endswith('.json'):
+            rel += '.json' # /course/<课程文件夹> 返回目录JSON
+        filepath = os.path.join(self.root, *rel.split('/'))
+        return filepath if os.path.isfile(filepath) else None
+
+    async def handle(self, reader, writer):
+        """处理一个连接上的所有请求（HTTP/1.1 keep-alive）"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self.send_error(writer, 400, keep_alive=False)
+                    break
+
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                # 不处理请求体，但要把它读掉，否则会被当成下一个请求的请求行
+                if 'transfer-encoding' in headers:
+                    keep_alive = False # 不解析分块编码，回应后关闭连接
+                elif 'content-length' in headers:
+                    length = headers['content-length']
+                    if not length.isdigit():
+                        await self.send_error(writer, 400, keep_alive=False)
+                        break
+                    if int(length) > MAX_DISCARD_BYTES:
+                        keep_alive = False
+                    else:
+                        await reader.readexactly(int(length))
+                await self.respond(writer, method, target, headers, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def send_head(self, writer, status, headers, keep_alive):
+        lines = [f"HTTP/1.1 {status} {REASONS[status]}"]
+        headers.setdefault('Content-Length', '0')
+        headers['Date'] = formatdate(usegmt=True)
+        headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+
+    async def send_error(self, writer, status, keep_alive=True, headers=None):
+        await self.send_head(writer, status, dict(headers or {}), keep_alive)
+        await writer.drain()
+
+    async def respond(self, writer, method, target, headers, keep_alive):
+        if method not in ('GET', 'HEAD'):
+            return await self.send_error(writer, 405, keep_alive, {'Allow': 'GET, HEAD'})
+        filepath = self.resolve(target)
+        if filepath is None:
+            return await self.send_error(writer, 404, keep_alive)
+        # 检查之后课件可能正被重建删除或改了权限；之后只用这个打开的文件，替换成新文件也不受影响
+        try:
+            f = open(filepath, 'rb')
+        except OSError as e:
+            return await self.send_error(writer, 403 if isinstance(e, PermissionError) else 404, keep_alive)
+        with f:
+            await self.send_file(writer, method, f, filepath, headers, keep_alive)
+
+    async def send_file(self, writer, method, f, filepath, headers, keep_alive):
+        st = os.fstat(f.fileno())
+        etag = make_etag(st)
+        common = {
+            'ETag': etag,
+            'Last-Modified': formatdate(st.st_mtime, usegmt=True),
+            'Accept-Ranges': 'bytes',
+        }
+        if 'if-none-match' in headers and etag_matches(headers['if-none-match'], etag):
+            return await self.send_error(writer, 304, keep_alive, common)
+
+        size = st.st_size
+        start, end, status = 0, size - 1, 200
+        if 'range' in headers and headers.get('if-range', etag) == etag:
+            byte_range = parse_range(headers['range'], size)
+            if byte_range == ():
+                return await self.send_error(writer, 416, keep_alive,
+                                             dict(common, **{'Content-Range': f"bytes */{size}"}))
+            if byte_range is not None:
+                start, end = byte_range
+                status = 206
+                common['Content-Range'] = f"bytes {start}-{end}/{size}"
+
+        ext = os.path.splitext(filepath)[1]
+        common['Content-Type'] = CONTENT_TYPES.get(ext) or mimetypes.guess_type(filepath)[0] \
+            or 'application/octet-stream'
+        common['Content-Length'] = str(end - start + 1)
+        await self.send_head(writer, status, common, keep_alive)
+        if method == 'HEAD' or size == 0:
+            return await writer.drain()
+
+        if size <= self.cache_item_limit:
+            body = self.cache.get(filepath, etag)
+            if body is None:
+                body = await asyncio.get_running_loop().run_in_executor(None, f.read)
+                self.cache.put(filepath, etag, body)
+            writer.write(body[start:end + 1])
+            await writer.drain()
+        else:
+            # 大课件：零拷贝发送，不支持sendfile的传输会自动退回普通读写
+            await writer.drain()
+            await asyncio.get_running_loop().sendfile(writer.transport, f, start, end - start + 1)
+
+
+async def serve(host, port, root, cache_bytes):
+    course_server = CourseServer(root, cache_bytes)
+    server = await asyncio.start_server(course_server.handle, host, port)
+    addresses = ', '.join(str(sock.getsockname()) for sock in server.sockets)
+    print(f"课程API服务已启动: {addresses}，根目录 {course_server.root}")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='本地课程API服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--root', default='.', help='课程文件夹和目录JSON所在的目录')
+    parser.add_argument('--cache-mb', type=int, default=CACHE_BYTES >> 20,
+                        help='热点课件LRU缓存大小（MB）')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.root, args.cache_mb << 20))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,295 @@
+"""
+VIP课件的备份和加密
+
+每个VIP课件先完整复制成 <名称>.<md5_id>.md 备份，再把原文件改写成以
+'encrypt' 开头的加密存根。整个过程记在课程文件夹的 .vip-journal 里：
+
+    begin  -> 开始复制备份（只写临时文件，原文件不动）
+    backup -> 备份已落盘并重命名到位
+    done   -> 原文件已替换为加密存根
+
+程序中途崩溃后，下次运行时根据日志把没有完成的课件接着做完，
+不会再出现“备份已存在”但原文件仍是明文的情况。
+fsync 按批进行：一批课件的临时文件都写完后统一fsync文件，再统一同步目录和日志。
+"""
+
+import os
+import json
+import base64
+import shutil
+import filecmp
+import hashlib
+
+
+CHUNK_SIZE = 1 << 20 # 复制和加密时每块的大小
+FSYNC_BATCH = 64 # 每批处理的课件数，一批只同步一次目录和日志
+STUB_MARKER = 'encrypt' # 加密存根的第一行，print_first_lines 依此找备份
+STUB_VERSION = 'v1'
+JOURNAL_NAME = '.vip-journal'
+
+
+class VipCipher:
+    """
+    流式加密：以md5_id派生的密钥做 keyed BLAKE2b，按计数器模式生成密钥流后异或，
+    加密和解密是同一个操作，可以分块调用
+    """
+
+    def __init__(self, md5_id, nonce):
+        self._key = hashlib.sha256(md5_id.encode('utf-8')).digest()
+        self._nonce = nonce
+        self._counter = 0
+        self._leftover = b''
+
+    def _keystream(self, size):
+        blocks = [self._leftover]
+        available = len(self._leftover)
+        while available < size:
+            block = hashlib.blake2b(self._nonce + self._counter.to_bytes(8, 'little'),
+                                    key=self._key, digest_size=64).digest()
+            blocks.append(block)
+            available += len(block)
+            self._counter += 1
+        stream = b''.join(blocks)
+        self._leftover = stream[size:]
+        return stream[:size]
+
+    def process(self, data):
+        stream = self._keystream(len(data))
+        return (int.from_bytes(data, 'little') ^ int.from_bytes(stream, 'little')).to_bytes(len(data), 'little')
+
+
+def write_encrypted_stub(src_path, dst_file, md5_id, chunk_size=CHUNK_SIZE):
+    """
+    把src_path的内容加密写成存根：第一行'encrypt'，第二行版本和随机数，
+    之后每块密文一行base64
+    """
+    nonce = os.urandom(16)
+    cipher = VipCipher(md5_id, nonce)
+    dst_file.write(f"{STUB_MARKER}\n{STUB_VERSION} {nonce.hex()}\n".encode('ascii'))
+    with open(src_path, 'rb') as src:
+        for chunk in iter(lambda: src.read(chunk_size), b''):
+            dst_file.write(base64.b64encode(cipher.process(chunk)))
+            dst_file.write(b'\n')
+
+
+def decrypt_stub(stub_path, md5_id, dst_file):
+    """
+    解密write_encrypted_stub写出的存根，明文写入dst_file
+    :return: False 表示是旧版只有'encrypt'一行的存根，没有可解密的内容
+    """
+    with open(stub_path, 'rb') as src:
+        if src.readline().strip() != STUB_MARKER.encode('ascii'):
+            raise ValueError(f"不是加密存根: {stub_path}")
+        header = src.readline().split()
+        if not header:
+            return False
+        if header[0].decode('ascii') != STUB_VERSION:
+            raise ValueError(f"不支持的存根版本 {header[0]!r}: {stub_path}")
+        cipher = VipCipher(md5_id, bytes.fromhex(header[1].decode('ascii')))
+        for line in src:
+            dst_file.write(cipher.process(base64.b64decode(line)))
+    return True
+
+
+def is_stub(path):
+    """原文件是否已经是加密存根"""
+    with open(path, 'rb') as f:
+        return f.readline().strip() == STUB_MARKER.encode('ascii')
+
+
+def fast_copy(src_path, dst_path, chunk_size=CHUNK_SIZE):
+    """
+    分块复制文件，优先使用内核内复制（copy_file_range / sendfile），
+    不支持时退回普通的分块读写；保留mtime等元数据（同shutil.copy2）
+    """
+    with open(src_path, 'rb') as fsrc, open(dst_path, 'wb') as fdst:
+        infd, outfd = fsrc.fileno(), fdst.fileno()
+        copied = 0
+        try:
+            if hasattr(os, 'copy_file_range'):
+                while True:
+                    sent = os.copy_file_range(infd, outfd, chunk_size)
+                    if sent == 0:
+                        break
+                    copied += sent
+            elif hasattr(os, 'sendfile') and os.name == 'posix':
+                while True:
+                    sent = os.sendfile(outfd, infd, copied, chunk_size)
+                    if sent == 0:
+                        break
+                    copied += sent
+            else:
+                shutil.copyfileobj(fsrc, fdst, chunk_size)
+        except OSError:
+            # 跨文件系统等情况内核复制会失败，从已复制的位置接着普通复制
+            fsrc.seek(copied)
+            fdst.seek(copied)
+            fdst.truncate()
+            shutil.copyfileobj(fsrc, fdst, chunk_size)
+    shutil.copystat(src_path, dst_path)
+
+
+def fsync_paths(paths):
+    """对一批写完的文件统一fsync（以读写方式打开：Windows上fsync只读的描述符会报EBADF）"""
+    for path in paths:
+        fd = os.open(path, os.O_RDWR)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def fsync_dir(dirname):
+    """同步目录项，使重命名落盘（Windows不支持打开目录，跳过）"""
+    if os.name != 'posix':
+        return
+    fd = os.open(dirname, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class VipJournal:
+    """课程文件夹里的加密日志，每行一条JSON记录"""
+
+    def __init__(self, dirname):
+        self.path = os.path.join(dirname, JOURNAL_NAME)
+        self._file = None
+
+    def pending(self):
+        """返回 {原文件名: 最后状态}，只包含没有完成的课件"""
+        states = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break # 崩溃时写了一半的最后一行
+                    states[record['file']] = record['op']
+        except FileNotFoundError:
+            return {}
+        return {name: op for name, op in states.items() if op != 'done'}
+
+    def append(self, op, filename):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps({'op': op, 'file': filename}, ensure_ascii=False) + '\n')
+
+    def sync(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def clear(self):
+        """全部完成后删除日志"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def backup_name(filename, md5_id):
+    base, ext = os.path.splitext(filename)
+    return f"{base}.{md5_id}{ext}"
+
+
+def tmp_name(filename):
+    return f".{filename}.tmp"
+
+
+def encrypt_and_backup_files(dirname, filenames, md5_id, index=None, restub=(),
+                             chunk_size=CHUNK_SIZE, fsync_batch=FSYNC_BATCH):
+    """
+    备份并加密同一目录下的一批VIP课件，先恢复日志里上次没完成的课件
+    原文件是明文但和已有备份不同时（加密后又改写了原文件），当作新内容重新备份并加密
+    :param index: 目录索引（需要支持 in 和 mark_changed），不传时扫描一次目录
+    :param restub: 备份被修改过的课件，原文件已是存根也要从备份重新生成
+    :return: 本次新加密的文件名列表
+    """
+    if index is None:
+        index = set(os.listdir(dirname))
+    journal = VipJournal(dirname)
+
+    def path(name):
+        return os.path.join(dirname, name)
+
+    def mark_changed(name):
+        if hasattr(index, 'mark_changed'):
+            index.mark_changed(name)
+        else:
+            index.add(name)
+
+    # 上次中断的课件：begin 阶段只留下备份临时文件，重新开始；backup 阶段只差改写原文件
+    recovered = journal.pending()
+    to_backup, to_stub = [], []
+    for name, op in recovered.items():
+        for leftover in (tmp_name(backup_name(name, md5_id)), tmp_name(name)):
+            if os.path.exists(path(leftover)):
+                os.remove(path(leftover))
+        if not os.path.exists(path(name)):
+            continue # 课件在中断后被删除
+        if op == 'begin':
+            to_backup.append(name)
+        else:
+            to_stub.append(name)
+        print('#### 恢复上次未完成的加密', name)
+
+    for name in filenames:
+        if name in recovered:
+            continue
+        backup = backup_name(name, md5_id)
+        if backup not in index:
+            to_backup.append(name)
+        elif not is_stub(path(name)):
+            # 旧版本在复制之后、改写之前崩溃留下的状态：备份和原文件内容相同就补做改写
+            if filecmp.cmp(path(name), path(backup), shallow=False):
+                to_stub.append(name)
+            else:
+                print('#### 原文件已修改，重新备份并加密', path(name), backup)
+                to_backup.append(name)
+        elif name in restub:
+            print('#### 备份已修改，重新生成加密存根', path(backup), backup)
+            to_stub.append(name)
+        else:
+            print('#### 备份已存在', path(backup), backup)
+
+    encrypted = []
+    for start in range(0, max(len(to_backup), len(to_stub)), fsync_batch):
+        backup_batch = to_backup[start:start + fsync_batch]
+        stub_batch = to_stub[start:start + fsync_batch]
+
+        # 1. 复制备份到临时文件，统一fsync后重命名，再记日志
+        for name in backup_batch:
+            journal.append('begin', name)
+        journal.sync()
+        for name in backup_batch:
+            fast_copy(path(name), path(tmp_name(backup_name(name, md5_id))), chunk_size)
+        fsync_paths([path(tmp_name(backup_name(name, md5_id))) for name in backup_batch])
+        for name in backup_batch:
+            os.replace(path(tmp_name(backup_name(name, md5_id))), path(backup_name(name, md5_id)))
+            mark_changed(backup_name(name, md5_id))
+            journal.append('backup', name)
+        fsync_dir(dirname)
+        journal.sync()
+
+        # 2. 从备份生成加密存根，替换原文件
+        stub_batch = stub_batch + backup_batch
+        for name in stub_batch:
+            with open(path(tmp_name(name)), 'wb') as f:
+                write_encrypted_stub(path(backup_name(name, md5_id)), f, md5_id, chunk_size)
+        fsync_paths([path(tmp_name(name)) for name in stub_batch])
+        for name in stub_batch:
+            os.replace(path(tmp_name(name)), path(name))
+            mark_changed(name)
+            journal.append('done', name)
+            encrypted.append(name)
+            print (name, backup_name(name, md5_id))
+        fsync_dir(dirname)
+        journal.sync()
+
+    journal.clear()
+    return encrypted
+
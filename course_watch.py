@@ -0,0 +1,292 @@
+"""
+监视模式：课件被修改后自动更新课程目录JSON
+
+Linux上用inotify（通过ctypes调用libc）接收文件变化，其他系统定时轮询目录。
+一批连续的变化先合并（防抖），再只刷新变化过的文件：各章节的目录索引和增量清单都留在内存里，
+变化按相对课程文件夹的路径报告，只刷新这些路径所在目录的索引项，新增的目录才扫描；
+没变的课件不重新stat、不重新读取，VIP备份也只处理新变化的课件；
+目录内容确实变了才重写JSON。
+
+用法：python courseware.py --watch [--batch | --config FILE] [--poll]
+"""
+
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+import courseware
+
+
+DEBOUNCE = 0.2 # 最后一次变化后等待多久再重建（秒）
+MAX_DELAY = 0.8 # 持续有变化时，最晚多久也要重建一次（秒）
+POLL_INTERVAL = 0.3 # 轮询模式下扫描目录的间隔（秒）
+
+# inotify 事件掩码，见 <sys/inotify.h>
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM
+              | IN_MOVED_TO | IN_CREATE | IN_DELETE)
+EVENT_HEADER = struct.Struct('iIII')
+
+RESCAN = None # 事件队列溢出等情况，表示需要重新扫描整个目录
+
+
+def iter_subdirs(folder):
+    """递归列出folder下的章节子目录（相对路径，不含隐藏目录）"""
+    for dirpath, dirnames, _ in os.walk(folder):
+        dirnames[:] = sorted(name for name in dirnames if not name.startswith('.'))
+        for name in dirnames:
+            yield os.path.relpath(os.path.join(dirpath, name), folder).replace(os.sep, '/')
+
+
+class InotifyWatcher:
+    """
+    用inotify监视若干目录及其章节子目录，wait()返回 {目录: 变化的相对路径集合 或 RESCAN}；
+    新建的子目录自动加入监视
+    """
+
+    def __init__(self, folders):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 失败')
+        self.folders = {} # wd -> (课程文件夹, 相对路径)
+        for folder in folders:
+            self.add_watch(folder, '')
+            for rel_dir in iter_subdirs(folder):
+                self.add_watch(folder, rel_dir)
+
+    def add_watch(self, folder, rel_dir):
+        path = os.path.join(folder, *rel_dir.split('/')) if rel_dir else folder
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch 失败: {path}')
+        self.folders[wd] = (folder, rel_dir)
+
+    def watch_new_dir(self, folder, rel_dir):
+        """新建或移入的章节目录：连同其中已有的子目录一起监视"""
+        path = os.path.join(folder, *rel_dir.split('/'))
+        try:
+            self.add_watch(folder, rel_dir)
+            for sub in iter_subdirs(path):
+                self.add_watch(folder, f"{rel_dir}/{sub}")
+        except OSError:
+            pass # 目录刚建好又被删除
+
+    def wait(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return {}
+        try:
+            buf = os.read(self.fd, 1 << 16)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return {}
+            raise
+
+        changes = {}
+        offset = 0
+        while offset < len(buf):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(buf, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(buf[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                return {folder: RESCAN for folder, _ in self.folders.values()}
+            if mask & IN_IGNORED:
+                self.folders.pop(wd, None) # 被监视的目录已删除
+                continue
+            watched = self.folders.get(wd)
+            if watched is None or not name:
+                continue
+            folder, rel_dir = watched
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and not name.startswith('.'):
+                self.watch_new_dir(folder, f"{rel_dir}/{name}" if rel_dir else name)
+            if changes.get(folder, set()) is not RESCAN:
+                changes.setdefault(folder, set()).add(f"{rel_dir}/{name}" if rel_dir else name)
+        return changes
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollWatcher:
+    """没有inotify时定时扫描目录（含章节子目录），对比mtime和大小找出变化的文件"""
+
+    def __init__(self, folders, interval=POLL_INTERVAL):
+        self.interval = interval
+        self.snapshots = {folder: self._snapshot(folder) for folder in folders}
+
+    @staticmethod
+    def _snapshot(folder, rel_dir=''):
+        """{相对路径: (mtime, 大小)}，章节目录本身也记录，以便发现空目录的增删"""
+        snapshot = {}
+        with os.scandir(os.path.join(folder, *rel_dir.split('/')) if rel_dir else folder) as it:
+            for entry in it:
+                rel_name = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if entry.is_file():
+                    st = entry.stat()
+                    snapshot[rel_name] = (st.st_mtime_ns, st.st_size)
+                elif entry.is_dir() and not entry.name.startswith('.'):
+                    snapshot[rel_name] = None
+                    snapshot.update(PollWatcher._snapshot(folder, rel_name))
+        return snapshot
+
+    def wait(self, timeout):
+        time.sleep(self.interval if timeout is None else min(self.interval, timeout))
+        changes = {}
+        for folder, old in self.snapshots.items():
+            new = self._snapshot(folder)
+            changed = {key for key in old.keys() | new.keys() if old.get(key, 0) != new.get(key, 0)}
+            if changed:
+                changes[folder] = changed
+            self.snapshots[folder] = new
+        return changes
+
+    def close(self):
+        pass
+
+
+def make_watcher(folders, poll=False):
+    """优先使用inotify，不可用（非Linux等）时退回轮询"""
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(folders)
+        except (OSError, AttributeError):
+            pass
+    return PollWatcher(folders)
+
+
+def is_relevant(rel_name):
+    """日志、临时文件等隐藏文件（以及隐藏目录里的文件）的变化不需要重建"""
+    return not any(part.startswith('.') for part in rel_name.split('/'))
+
+
+class CourseWatchState:
+    """一个被监视课程在内存里的状态：各章节的目录索引、增量清单和上次写出的目录"""
+
+    def __init__(self, course, compact=False, gzip_copy=False):
+        self.course = course
+        self.compact = compact
+        self.gzip_copy = gzip_copy
+        self.folder_name = course['folder_name']
+        self.directory = './%s' %self.folder_name
+        self.manifest = courseware.load_manifest(self.folder_name, course['md5_id'])
+        self.indexes = None # {相对路径: DirIndex}，见courseware.scan_course_tree
+        self.catalogue = None
+
+    def scan(self, rel_dir=''):
+        """扫描rel_dir及其下所有子目录，返回 {相对课程文件夹的路径: DirIndex}"""
+        directory = os.path.join(self.directory, *rel_dir.split('/')) if rel_dir else self.directory
+        with ThreadPoolExecutor() as pool:
+            indexes = courseware.scan_course_tree(courseware.DirIndex(directory), pool)
+        return {posixpath.join(rel_dir, rel) if rel else rel_dir: index for rel, index in indexes.items()}
+
+    def refresh(self, changed):
+        """只刷新变化过的路径：更新所在目录的索引项；目录本身有变化时丢掉它的旧索引，还存在就重新扫描"""
+        # 先处理上层路径：目录被删除后其中的路径直接跳过，刚扫描过的目录里的路径也不用再刷新
+        scanned = set()
+        for rel_name in sorted(changed, key=lambda rel: rel.count('/')):
+            parent, name = posixpath.split(rel_name)
+            if parent not in self.indexes or parent in scanned:
+                continue
+            self.indexes[parent].refresh(name)
+            prefix = rel_name + '/'
+            for rel in [rel for rel in self.indexes if rel == rel_name or rel.startswith(prefix)]:
+                del self.indexes[rel]
+            if name in self.indexes[parent].dirs:
+                fresh = self.scan(rel_name)
+                self.indexes.update(fresh)
+                scanned.update(fresh)
+
+    def update(self, changed=RESCAN):
+        """
+        刷新变化过的路径并重建目录，目录内容变化时才重写JSON
+        :param changed: 变化的相对路径集合，RESCAN表示重新扫描整个课程文件夹
+        :return: 是否重写了JSON
+        """
+        if changed is RESCAN or self.indexes is None:
+            self.indexes = self.scan()
+        else:
+            self.refresh(changed)
+
+        course = self.course
+        entries = courseware.list_files_sorted(self.folder_name, course['md5_id'], courseware.data,
+                                               course['vip_index'], self.manifest, self.indexes)
+        courseware.save_manifest(self.folder_name, self.manifest)
+        catalogue = [entry.to_dict() for entry in entries]
+        if catalogue == self.catalogue:
+            return False
+
+        output_filename = f"{self.folder_name}.json"
+        header = dict(courseware.json_datas, title=course['project_name'])
+        with courseware.CatalogWriter(output_filename, header, self.compact, self.gzip_copy) as writer:
+            for entry in entries:
+                writer.write(entry)
+        self.catalogue = catalogue
+        print(f"JSON数据已保存到文件: {output_filename}")
+        return True
+
+
+def collect_changes(watcher, debounce=DEBOUNCE, max_delay=MAX_DELAY):
+    """阻塞到有变化为止，然后继续合并debounce秒内的后续变化（最多等max_delay秒）"""
+    changes = {}
+    while not changes:
+        changes = watcher.wait(None)
+
+    deadline = time.monotonic() + max_delay
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        more = watcher.wait(min(debounce, remaining))
+        if not more:
+            break
+        for folder, names in more.items():
+            if names is RESCAN or changes.get(folder) is RESCAN:
+                changes[folder] = RESCAN
+            else:
+                changes.setdefault(folder, set()).update(names)
+    return changes
+
+
+def watch_courses(courses, poll=False, compact=False, gzip_copy=False):
+    """先完整构建一次，之后持续监视，直到Ctrl+C"""
+    states = {course['folder_name']: CourseWatchState(course, compact, gzip_copy) for course in courses}
+    for state in states.values():
+        state.update()
+
+    watcher = make_watcher(list(states), poll)
+    print(f"\n正在监视 {len(states)} 个课程（{type(watcher).__name__}），按 Ctrl+C 退出")
+    try:
+        while True:
+            for folder, names in collect_changes(watcher).items():
+                if names is not RESCAN:
+                    names = {name for name in names if is_relevant(name)}
+                    if not names:
+                        continue
+                try:
+                    states[folder].update(names)
+                except Exception as e:
+                    # 作者正在保存的文件可能暂时读不出来，下次变化时再重建
+                    print(f"#### 更新 {folder} 失败: {e!r}")
+    except KeyboardInterrupt:
+        print("\n已停止监视")
+    finally:
+        watcher.close()
+    return 0
@@ -1,7 +1,21 @@
 import os, re
+import sys
 import json
-import shutil
-import copy
+import gzip
+import hashlib
+import argparse
+import io
+import contextlib
+import posixpath
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import List, Optional
+
+import course_vip
+
+
+MANIFEST_VERSION = 1 # 清单格式版本，格式变化时旧清单自动作废
+READ_AHEAD = 256 # 最多提前提交这么多个课件的读取任务，未取走的结果不会随课件数增长
 
 
 def extract_leading_number(filename):
@@ -10,57 +24,498 @@ def extract_leading_number(filename):
     return int(match.group(1)) if match else float('inf')
 
 
-def list_files_sorted(folder_name, md5_id, data, vip_index):
-    """列出目录下的所有文件，按前两位数排序"""
+def is_lesson_file(filename):
+    """课件文件名形如 '01.标题.md'，恰好两个点"""
+    return filename.count('.') == 2
+
+
+class CourseEntry:
+    """
+    课程目录（catalogue_list）中的一条记录
+
+    用__slots__代替每节课deepcopy一份data模板，
+    to_dict()输出的JSON结构和data模板完全一致，children是下级CourseEntry
+    """
+    __slots__ = ('course_name', 'is_vip', 'tutorial', 'video',
+                 'question_answer', 'product_detail', 'children')
+
+    def __init__(self, course_name: str, is_vip: bool = False, tutorial: str = '',
+                 video: str = '', question_answer: str = '', product_detail: str = '',
+                 children: Optional[List['CourseEntry']] = None):
+        self.course_name = course_name
+        self.is_vip = is_vip
+        self.tutorial = tutorial
+        self.video = video
+        self.question_answer = question_answer
+        self.product_detail = product_detail
+        self.children = children if children is not None else []
+
+    @classmethod
+    def from_template(cls, template: dict, course_name: str, is_vip: bool,
+                      tutorial: str) -> 'CourseEntry':
+        """用data模板里的video等默认值创建记录"""
+        return cls(course_name, is_vip, tutorial, template['video'],
+                   template['question_answer'], template['product_detail'])
+
+    def to_dict(self) -> dict:
+        return {
+            "course_name": self.course_name,
+            "is_vip": self.is_vip,
+            "tutorial": self.tutorial,
+            "video": self.video,
+            "question_answer": self.question_answer,
+            "product_detail": self.product_detail,
+            "children": [child.to_dict() for child in self.children]
+        }
+
+
+def json_default(obj):
+    """json.dump的default钩子，序列化CourseEntry"""
+    if isinstance(obj, CourseEntry):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class DirIndex:
+    """
+    课程目录的索引：一次 os.scandir 得到所有普通文件和子目录（章节），
+    供列文件、排序、读取第一行和判断备份是否存在共用，避免重复扫描目录
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.files = {} # 文件名 -> os.DirEntry 或 os.stat_result，修改过的文件为None（需要重新stat）
+        self.dirs = set() # 子目录名（不含隐藏目录）
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_file():
+                    self.files[entry.name] = entry
+                elif entry.is_dir() and not entry.name.startswith('.'):
+                    self.dirs.add(entry.name)
+
+    def __contains__(self, filename):
+        return filename in self.files
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def sorted_files(self):
+        """返回按开头数字排序的 [(num, filename)]"""
+        files = [(extract_leading_number(filename), filename) for filename in self.files]
+        files.sort(key=lambda x: x[0])
+        return files
+
+    def sorted_items(self):
+        """返回文件和子目录按开头数字排序的 [(num, name, is_dir)]"""
+        items = [(extract_leading_number(name), name, False) for name in self.files]
+        items += [(extract_leading_number(name), name, True) for name in sorted(self.dirs)]
+        items.sort(key=lambda x: x[0])
+        return items
+
+    def stat_key(self, filename):
+        """返回 [mtime_ns, size]，文件不存在时返回None"""
+        if filename not in self.files:
+            return None
+        entry = self.files[filename]
+        if entry is None:
+            entry = self.files[filename] = os.stat(self.path(filename))
+        st = entry.stat() if isinstance(entry, os.DirEntry) else entry
+        return [st.st_mtime_ns, st.st_size]
+
+    def mark_changed(self, filename):
+        """记录新建或被改写的文件，之后的stat_key会重新读取"""
+        self.files[filename] = None
+
+    def refresh(self, filename):
+        """文件可能被外部新建、修改或删除时，只更新这一项而不重新扫描整个目录"""
+        path = self.path(filename)
+        if os.path.isfile(path):
+            self.files[filename] = None
+        else:
+            self.files.pop(filename, None)
+        if os.path.isdir(path) and not filename.startswith('.'):
+            self.dirs.add(filename)
+        else:
+            self.dirs.discard(filename)
+
+
+def scan_course_tree(index, pool):
+    """
+    逐层并发扫描所有章节子目录
+    :return: {相对路径: DirIndex}，课程根目录的相对路径为''
+    """
+    indexes = {'': index}
+    level = ['']
+    while level:
+        children = [posixpath.join(rel, name) for rel in level for name in sorted(indexes[rel].dirs)]
+        scanned = pool.map(lambda rel: DirIndex(os.path.join(index.directory, *rel.split('/'))), children)
+        indexes.update(zip(children, scanned))
+        level = children
+    return indexes
+
+
+def chapter_title(num, dirname):
+    """章节目录名去掉开头的数字和分隔符作为标题，如 '02.进阶篇' -> '2.进阶篇'"""
+    if num == float('inf'):
+        return dirname
+    return '%s.%s' %(num, re.sub(r'^\d+[.\s_\-、]*', '', dirname))
+
+
+def list_files_sorted(folder_name, md5_id, data, vip_index, manifest=None, indexes=None,
+                      io_threads=None):
+    """列出目录下的所有文件，按前两位数排序，返回CourseEntry列表"""
+    return list(iter_course_entries(folder_name, md5_id, data, vip_index, manifest, indexes, io_threads))
+
+
+def iter_course_entries(folder_name, md5_id, data, vip_index, manifest=None, indexes=None,
+                        io_threads=None):
+    """
+    按前两位数排序，逐条生成课程目录的CourseEntry
+
+    编号开头或直接包含课件的子目录是章节，生成带children的CourseEntry，章节内同样按前两位数排序；
+    images等资源目录不算章节，没有课件的章节不出现在目录里；
+    顶层编号 >= vip_index 的课件和章节是VIP，VIP章节里的课件全部是VIP。
+    各章节的目录扫描和课件第一行读取都在线程池（io_threads个线程）里并发进行，
+    读取任务按目录顺序最多提前提交READ_AHEAD个，取走结果后再补上。
+
+    传入manifest（见load_manifest）时做增量构建：mtime和大小都没变、
+    或者内容哈希没变的课件直接复用清单里记录的标题，不再打开文件；
+    全部生成完后manifest['files']被替换为本次的文件状态。
+    传入indexes（scan_course_tree的结果）时复用已有的各章节目录索引，不再扫描目录
+    （监视模式下只刷新变化过的文件和目录）。
+    """
     directory = './%s' %folder_name
     print(f"\n目录 '{directory}' 中的文件（按前两位数排序）：")
 
-    # 获取所有文件并提取前两位数
-    files = []
-    for filename in os.listdir(directory):
-        if os.path.isfile(os.path.join(directory, filename)):
-            num = extract_leading_number(filename)
-            files.append((num, filename))
+    with ThreadPoolExecutor(io_threads) as pool:
+        build = CourseTreeBuild(folder_name, md5_id, data, vip_index, manifest, pool)
+        # 每个目录只扫描一次，获取所有文件并按前两位数排序
+        build.indexes = indexes if indexes is not None else scan_course_tree(DirIndex(directory), pool)
+        build.start_reads()
+        yield from build.entries('', None)
+        build.finish()
 
-    # 按前两位数排序
-    files.sort(key=lambda x: x[0])
 
-    data_list = []
-    
-    # 输出排序结果
-    for idx, (num, filename) in enumerate(files):
-        copy_data = copy.deepcopy(data)
-        if int(filename.count('.')) == 2:
-            # print (filename)
-            filepath = './%s/%s' %(directory, filename)
-            first_line = print_first_lines(filepath, md5_id).strip('#').strip()
+class CourseTreeBuild:
+    """
+    一次课程构建的状态：按目录顺序把课件的读取任务提交给线程池（最多提前read_ahead个），
+    再按同样的顺序取结果组装目录，最后统一备份加密VIP课件、更新清单
+    """
 
-            copy_data['course_name'] = '%s.%s' %(str(num), first_line)
+    def __init__(self, folder_name, md5_id, data, vip_index, manifest, pool, read_ahead=READ_AHEAD):
+        self.folder_name = folder_name
+        self.md5_id = md5_id
+        self.data = data
+        self.vip_index = vip_index
+        self.manifest = manifest
+        self.pool = pool
+        self.indexes = {}
+        self.old_records = manifest['files'] if manifest is not None else {}
+        self.new_records = {}
+        self.read_ahead = read_ahead
+        self.unsubmitted = iter(())
+        self.reads = {} # 已提交、结果还没取走的课件相对路径 -> Future[(标题, 清单记录, 是否重新读取, 备份是否被修改)]
+        self.pending_vip = {} # 章节相对路径 -> {需要备份加密的vip课件: 标题}
+        self.restub = {} # 章节相对路径 -> {备份被修改、要重新生成存根的vip课件}
+        self.rebuilt = 0
+
+    def is_vip(self, num, parent_vip):
+        return parent_vip if parent_vip is not None else num >= self.vip_index
+
+    def is_chapter(self, num, rel_name):
+        """编号开头、或者直接包含课件的子目录才是章节"""
+        return num != float('inf') or any(is_lesson_file(name) for name in self.indexes[rel_name].files)
+
+    def iter_lessons(self, rel_dir, parent_vip):
+        """按entries()的顺序逐个生成 (课件相对路径, 目录索引, 文件名, 是否VIP)"""
+        for num, name, is_dir in self.indexes[rel_dir].sorted_items():
+            rel_name = posixpath.join(rel_dir, name)
+            if is_dir:
+                if self.is_chapter(num, rel_name):
+                    yield from self.iter_lessons(rel_name, self.is_vip(num, parent_vip))
+            elif is_lesson_file(name):
+                yield rel_name, self.indexes[rel_dir], name, self.is_vip(num, parent_vip)
+
+    def start_reads(self):
+        self.unsubmitted = self.iter_lessons('', None)
+        self.submit_reads()
+
+    def submit_reads(self):
+        """把已提交未取走的读取任务补到read_ahead个"""
+        while len(self.reads) < self.read_ahead:
+            lesson = next(self.unsubmitted, None)
+            if lesson is None:
+                break
+            rel_name, index, name, is_vip = lesson
+            self.reads[rel_name] = self.pool.submit(self.read_lesson, index, name, rel_name, is_vip)
+
+    def read_result(self, rel_name):
+        """取走一个课件的读取结果（entries按提交的顺序调用），再补提交后面的课件"""
+        future = self.reads.pop(rel_name)
+        self.submit_reads()
+        return future.result()
+
+    def read_lesson(self, index, filename, rel_name, is_vip):
+        """在线程池里读取一个课件的标题，清单记录有效时不打开文件"""
+        old_record = self.old_records.get(rel_name)
+        record = lookup_manifest_record(old_record, index, filename, self.md5_id)
+        # 已加密的课件备份被修改：标题从备份重新读取，存根也要重新生成
+        restub = record is None and old_record is not None and old_record['encrypted'] \
+            and old_record['backup'] != index.stat_key(backup_file_name(filename, self.md5_id))
+        if record is None:
+            first_line = print_first_lines(index.path(filename), self.md5_id, index).strip('#').strip()
+        else:
+            first_line = record['first_line']
+        reread = record is None
+
+        if is_vip and (record is None or not record['encrypted']):
+            return first_line, None, reread, restub # 需要备份加密，记录在加密后生成
+        if record is None:
+            record = make_manifest_record(index, filename, self.md5_id, first_line, is_vip)
+        return first_line, record, reread, restub
+
+    def entries(self, rel_dir, parent_vip):
+        """按顺序生成rel_dir下的CourseEntry，章节递归生成children"""
+        for num, name, is_dir in self.indexes[rel_dir].sorted_items():
+            rel_name = posixpath.join(rel_dir, name)
+            is_vip = self.is_vip(num, parent_vip)
+            if is_dir:
+                if not self.is_chapter(num, rel_name):
+                    continue
+                children = list(self.entries(rel_name, is_vip))
+                if not children:
+                    continue # 没有课件的章节不列出
+                chapter = CourseEntry.from_template(self.data, chapter_title(num, name), is_vip, '')
+                chapter.children = children
+                yield chapter
+            elif is_lesson_file(name):
+                first_line, record, reread, restub = self.read_result(rel_name)
+                self.rebuilt += reread
+                if record is None:
+                    self.pending_vip.setdefault(rel_dir, {})[name] = first_line
+                    if restub:
+                        self.restub.setdefault(rel_dir, set()).add(name)
+                else:
+                    self.new_records[rel_name] = record
+
+                course_name = '%s.%s' %(str(num), first_line)
+                link = "https://doc.itprojects.cn/api/v1.1/course/%s/%s" %(self.folder_name, rel_name)
+                yield CourseEntry.from_template(self.data, course_name, is_vip, link)
+
+    def finish(self):
+        """各章节并发备份加密VIP课件，然后更新清单"""
+        def encrypt_dir(rel_dir):
+            index = self.indexes[rel_dir]
+            lessons = self.pending_vip[rel_dir]
+            encrypted = set(encrypt_and_backup_files(index.directory, list(lessons), self.md5_id, index,
+                                                     self.restub.get(rel_dir, ())))
+            # 只有确认已是加密存根的课件才记为已加密，其余下次构建时再处理
+            return [(posixpath.join(rel_dir, filename),
+                     make_manifest_record(index, filename, self.md5_id, first_line,
+                                          filename in encrypted or course_vip.is_stub(index.path(filename))))
+                    for filename, first_line in lessons.items()]
+
+        for records in self.pool.map(encrypt_dir, list(self.pending_vip)):
+            self.new_records.update(records)
+
+        if self.manifest is not None:
+            self.manifest['files'] = self.new_records
+            print(f"增量构建：重新读取 {self.rebuilt} 个课件，复用 {len(self.new_records) - self.rebuilt} 个")
+
+
+def file_content_hash(filepath):
+    """分块计算文件内容的md5，避免大文件一次读进内存"""
+    digest = hashlib.md5()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def backup_file_name(filename, md5_id):
+    """vip课件对应的备份副本文件名"""
+    base, ext = os.path.splitext(filename)
+    return f"{base}.{md5_id}{ext}"
 
-            link = "https://doc.itprojects.cn/api/v1.1/course/%s/%s" %(folder_name, filename)
 
-            copy_data['tutorial'] = link
-            # print (copy_data)
+def make_manifest_record(index, filename, md5_id, first_line, encrypted):
+    """为刚构建好的课件生成清单记录"""
+    record = {
+        'stat': index.stat_key(filename),
+        'hash': file_content_hash(index.path(filename)),
+        'first_line': first_line,
+        'encrypted': encrypted,
+        'backup': None,
+    }
+    if encrypted:
+        # 加密后的标题来自备份副本，备份被修改时也要重建
+        record['backup'] = index.stat_key(backup_file_name(filename, md5_id))
+    return record
 
-            if num >= vip_index:
-                copy_data['is_vip'] = True
-                original_file_path = os.path.join(directory, filename)
 
-                # 为vip课件创建副本并重命名
-                encrypt_and_backup_file(original_file_path, md5_id)
-            else:
-                copy_data['is_vip'] = False
+def lookup_manifest_record(record, index, filename, md5_id):
+    """
+    判断清单记录是否仍然有效
+    :return: 有效时返回（可能更新了mtime的）记录，需要重建时返回None
+    """
+    if record is None:
+        return None
+    if record['encrypted'] and record['backup'] != index.stat_key(backup_file_name(filename, md5_id)):
+        return None
+
+    current = index.stat_key(filename)
+    if current == record['stat']:
+        return record
+    # mtime变了但大小没变，可能只是touch过，比较内容哈希
+    if current is not None and current[1] == record['stat'][1] \
+            and file_content_hash(index.path(filename)) == record['hash']:
+        return dict(record, stat=current)
+    return None
+
+
+def manifest_path(folder_name):
+    """增量构建清单的文件名"""
+    return f".{folder_name}.manifest.json"
 
-            data_list.append(copy_data)
 
+def new_manifest(md5_id):
+    """空清单，相当于全量构建"""
+    return {'version': MANIFEST_VERSION, 'md5_id': md5_id, 'files': {}}
 
-    return data_list
 
+def load_manifest(folder_name, md5_id):
+    """读取上一次构建保存的清单，不存在、损坏或md5_id变化时返回空清单"""
+    try:
+        with open(manifest_path(folder_name), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return new_manifest(md5_id)
 
-def print_first_lines(filepath, md5_id):
+    if manifest.get('version') != MANIFEST_VERSION or manifest.get('md5_id') != md5_id:
+        return new_manifest(md5_id)
+    return manifest
+
+
+def save_manifest(folder_name, manifest):
+    """保存清单，供下一次增量构建使用"""
+    write_json_atomic(manifest_path(folder_name), manifest, indent=None)
+
+
+def write_json_atomic(output_filename, obj, indent=4):
+    """先写临时文件再重命名，中途崩溃不会留下写了一半的JSON"""
+    tmp_filename = f"{output_filename}.tmp"
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, ensure_ascii=False, indent=indent, default=json_default)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_filename, output_filename)
+
+
+class CatalogWriter:
+    """
+    流式写出课程目录JSON，catalogue_list 一边生成一边写，内存占用与课程数无关
+
+    pretty模式的输出与 json.dump(..., indent=4) 逐字节相同，compact模式去掉所有空白；
+    gzip_copy=True 时同时写一份 .json.gz。先写临时文件，全部成功后才重命名，
+    中途出错或崩溃不会留下写了一半的JSON。
+
+    用法：
+        with CatalogWriter('x.json', {'title': ..., 'product_list': []}) as writer:
+            for entry in entries:
+                writer.write(entry)
+    """
+
+    def __init__(self, output_filename, header, compact=False, gzip_copy=False):
+        self.output_filename = output_filename
+        self.header = header # catalogue_list 之前的字段，如 title、product_list
+        self.compact = compact
+        self.gzip_copy = gzip_copy
+        self.count = 0
+        self._raw_files = [] # 临时文件
+        self._outputs = [] # 实际写入的流（gzip副本包在临时文件外面）
+
+    def _targets(self):
+        targets = [self.output_filename]
+        if self.gzip_copy:
+            targets.append(f"{self.output_filename}.gz")
+        return targets
+
+    def _emit(self, text):
+        chunk = text.encode('utf-8')
+        for f in self._outputs:
+            f.write(chunk)
+
+    def _dumps(self, obj, level):
+        """序列化一个值，pretty模式下缩进到第level层"""
+        if self.compact:
+            return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=json_default)
+        text = json.dumps(obj, ensure_ascii=False, indent=4, default=json_default)
+        return text.replace('\n', '\n' + ' ' * 4 * level)
+
+    def _key(self, key):
+        return json.dumps(key, ensure_ascii=False) + (':' if self.compact else ': ')
+
+    def __enter__(self):
+        for target in self._targets():
+            raw = open(f"{target}.tmp", 'wb')
+            self._raw_files.append(raw)
+            if target.endswith('.gz'):
+                self._outputs.append(gzip.GzipFile(
+                    filename=os.path.basename(self.output_filename),
+                    fileobj=raw, mode='wb', compresslevel=6, mtime=0))
+            else:
+                self._outputs.append(raw)
+
+        parts = []
+        for key, value in self.header.items():
+            if key != 'catalogue_list':
+                parts.append(self._key(key) + self._dumps(value, 1))
+        if self.compact:
+            self._emit('{' + ','.join(parts) + (',' if parts else '') + '"catalogue_list":[')
+        else:
+            self._emit('{\n' + ''.join('    %s,\n' %part for part in parts) + '    "catalogue_list": [')
+        return self
+
+    def write(self, entry):
+        """写出一条目录记录（CourseEntry或dict）"""
+        if self.compact:
+            self._emit((',' if self.count else '') + self._dumps(entry, 2))
+        else:
+            self._emit((',\n' if self.count else '\n') + ' ' * 8 + self._dumps(entry, 2))
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        completed = False
+        try:
+            if exc_type is None:
+                if self.compact:
+                    self._emit(']}')
+                else:
+                    self._emit('\n    ]\n}' if self.count else ']\n}')
+            for f in self._outputs:
+                if isinstance(f, gzip.GzipFile):
+                    f.close()
+            if exc_type is None:
+                for raw in self._raw_files:
+                    raw.flush()
+                    os.fsync(raw.fileno())
+            completed = exc_type is None
+        finally:
+            for raw in self._raw_files:
+                raw.close()
+            for target in self._targets():
+                if completed:
+                    os.replace(f"{target}.tmp", target)
+                elif os.path.exists(f"{target}.tmp"):
+                    os.remove(f"{target}.tmp")
+        return False
+
+
+def print_first_lines(filepath, md5_id, index=None):
     """
     输出文件夹下每个文件的第一行内容
     :param directory: 文件夹路径
+    :param index: 所在目录的DirIndex，用来直接判断备份副本是否存在
     """
     with open(filepath, 'r', encoding='utf-8') as file:
         # 读取第一行
@@ -68,6 +523,8 @@ def print_first_lines(filepath, md5_id):
         # print (first_line)
         if first_line.strip() == 'encrypt':
             newfilepath = filepath.replace('.md','.%s.md') %md5_id
+            if index is not None and os.path.basename(newfilepath) not in index:
+                raise FileNotFoundError(f"加密课件缺少备份副本: {newfilepath}")
             first_line = print_first_lines2(newfilepath)
 
     return first_line
@@ -85,52 +542,43 @@ def print_first_lines2(filepath):
     return first_line
 
 
-def encrypt_and_backup_file(original_file_path, md5_id):
+def encrypt_and_backup_file(original_file_path, md5_id, index=None):
     """
     对指定文件进行加密备份处理：
-    1. 创建备份副本（添加'_backup'后缀）
-    2. 重命名副本（添加'secure_copy_'前缀）
-    3. 将原文件内容替换为'encrypt'
+    1. 创建备份副本（文件名加上 .<md5_id>）
+    2. 将原文件替换为以'encrypt'开头的加密存根
 
     参数:
         original_file_path (str): 原始文件的完整路径
+        index (DirIndex): 所在目录的索引，不传时重新扫描一次目录
     返回:
-        tuple: (success: bool, message: str, backup_path: str)
+        bool: 本次是否新加密了该文件
     """
     # 参数校验
     if not os.path.isfile(original_file_path):
-        print ("错误：文件不存在 '{original_file_path}'")
-
+        print (f"错误：文件不存在 '{original_file_path}'")
+        return False
 
-    # 1. 创建备份副本路径
     dirname, filename = os.path.split(original_file_path)
-    base, ext = os.path.splitext(filename)
-
-    file_list = os.listdir(dirname)
+    return bool(encrypt_and_backup_files(dirname, [filename], md5_id, index))
 
-    backup_filename = f"{base}.{md5_id}{ext}" # 副本文件名
-    backup_path = os.path.join(dirname, backup_filename)
 
-
-    if backup_filename in file_list:
-        print ('#### 备份已存在', backup_path, backup_filename)
-    else:
-        # 2. 创建文件副本
-        shutil.copy2(original_file_path, backup_path)
-
-        # 3. 加密原文件（替换内容）
-        with open(original_file_path, 'w', encoding='utf-8') as f:
-            f.write("encrypt")
-
-        print (filename, backup_filename)
+def encrypt_and_backup_files(dirname, filenames, md5_id, index=None, restub=()):
+    """
+    批量备份加密同一目录下的vip课件，带日志、可以在崩溃后恢复，详见course_vip.py
+    :param restub: 备份被修改过、要从备份重新生成存根的课件
+    :return: 本次新加密的文件名列表
+    """
+    if index is None:
+        index = DirIndex(dirname)
+    return course_vip.encrypt_and_backup_files(dirname, filenames, md5_id, index, restub)
 
 
-def save_json_data(json_datas):
-    # 保存到JSON文件
+def save_json_data(json_datas, course_folder=None):
+    # 保存到JSON文件，批量模式下由调用方传入课程文件夹名
     json_file_name = 'coursedetail.C0002.wuziqi'
-    output_filename = f"{folder_name}.json"
-    with open(output_filename, 'w', encoding='utf-8') as f:
-        json.dump(json_datas, f, ensure_ascii=False, indent=4)
+    output_filename = f"{course_folder or folder_name}.json"
+    write_json_atomic(output_filename, json_datas)
     print(f"JSON数据已保存到文件: {output_filename}")
 
 
@@ -160,20 +608,241 @@ data =  {
 
 
 
-def main():
+def build_course(project_name, folder_name, md5_id, vip_index, full=False,
+                 compact=False, gzip_copy=False, bundle=False, bundle_workers=None, io_threads=None):
+    """
+    构建单个课程：流式生成目录JSON、备份VIP课件并保存增量清单
+    :param compact: 输出不带缩进的紧凑JSON
+    :param gzip_copy: 同时输出一份 .json.gz
+    :param bundle: 同时打包上传用的课件zip（见course_bundle.py）
+    :param io_threads: 扫描章节目录和读取课件的线程数，默认由ThreadPoolExecutor决定
+    :return: dict，包含课程文件夹名和目录条数
+    """
+    if full:
+        manifest = new_manifest(md5_id)
+    else:
+        manifest = load_manifest(folder_name, md5_id)
+
+    output_filename = f"{folder_name}.json"
+    header = dict(json_datas, title=project_name)
+    with CatalogWriter(output_filename, header, compact, gzip_copy) as writer:
+        for entry in iter_course_entries(folder_name, md5_id, data, vip_index, manifest, io_threads=io_threads):
+            writer.write(entry)
+    print(f"JSON数据已保存到文件: {output_filename}")
+    save_manifest(folder_name, manifest)
+
+    if bundle:
+        import course_bundle # course_bundle 依赖本模块，用到时再导入
+        course_bundle.package_course(folder_name, workers=bundle_workers)
+    return {'folder_name': folder_name, 'lessons': writer.count}
 
-    catalogue_list = list_files_sorted(folder_name, md5_id, data, vip_index)
-    json_datas['catalogue_list'] = catalogue_list
 
+BACKUP_MD5_PATTERN = re.compile(r'\.([0-9a-f]{32})\.[^.]+$') # 备份副本文件名中的md5加密字符串
+COURSE_SETTINGS_NAME = 'course.json' # 课程文件夹里的构建参数（project_name / md5_id / vip_index）
+COURSE_FIELDS = ('project_name', 'folder_name', 'md5_id', 'vip_index')
 
-    # datas = json.dumps(json_datas, ensure_ascii=False, indent=4)
-    # print (datas)
-    save_json_data(json_datas)
-    
 
+def discover_courses(root='.'):
+    """查找root下所有 coursedetail.* 课程文件夹"""
+    return sorted(
+        entry.name for entry in os.scandir(root)
+        if entry.is_dir() and entry.name.startswith('coursedetail.')
+    )
 
-if __name__ == "__main__":
-    main()
 
+def check_course(course, source):
+    missing = set(COURSE_FIELDS) - set(course)
+    if missing:
+        raise ValueError(f"课程配置缺少字段 {sorted(missing)}（{source}）: {course}")
+    return course
 
 
+def course_from_folder(course_folder, configured=()):
+    """
+    取批量模式下课程文件夹的构建参数，依次查找：
+    --config列表里同名的课程、课程文件夹里的course.json、本模块的全局设置（只用于folder_name）。
+    都没有时抛出ValueError，不猜测项目名称和VIP起始编号，也不借用其他课程的md5加密字符串
+    """
+    for course in configured:
+        if course['folder_name'] == course_folder:
+            return course
+
+    settings_path = os.path.join(course_folder, COURSE_SETTINGS_NAME)
+    if os.path.isfile(settings_path):
+        with open(settings_path, 'r', encoding='utf-8') as f:
+            course = dict(json.load(f), folder_name=course_folder)
+        course = check_course(course, settings_path)
+    elif course_folder == folder_name:
+        course = {'project_name': project_name, 'folder_name': folder_name,
+                  'md5_id': md5_id, 'vip_index': vip_index}
+    else:
+        raise ValueError(f"课程文件夹没有构建参数，请添加 {settings_path} 或写进 --config: {course_folder}")
+
+    # 已有备份副本说明课程加密过，md5加密字符串对不上时用错了参数，不能再加密一遍
+    for filename in os.listdir(course_folder):
+        match = BACKUP_MD5_PATTERN.search(filename)
+        if match and match.group(1) != course['md5_id']:
+            raise ValueError(f"备份副本 {filename} 的md5加密字符串与课程配置不一致: {course_folder}")
+    return course
+
+
+def load_course_config(config_path):
+    """
+    读取批量构建的课程配置，JSON列表，每项包含
+    project_name / folder_name / md5_id / vip_index
+    """
+    with open(config_path, 'r', encoding='utf-8') as f:
+        courses = json.load(f)
+    return [check_course(course, config_path) for course in courses]
+
+
+def build_course_isolated(course, timings=False, profile=False, **build_options):
+    """
+    进程池里执行的单个课程构建，捕获输出和异常，
+    一个课程失败不会影响其他课程
+    :param timings: 记录各阶段耗时，随结果传回主进程
+    :param profile: 同时用cProfile生成 <课程文件夹>.prof
+    """
+    timings = timings or profile # --profile 同时统计各阶段耗时
+    if timings:
+        import course_profile # course_profile 依赖本模块，用到时再导入
+        course_profile.enable()
+        course_profile.reset()
+
+    log = io.StringIO()
+    result = {'folder_name': course['folder_name'], 'ok': False, 'lessons': 0, 'error': None}
+    course_args = (course['project_name'], course['folder_name'], course['md5_id'], course['vip_index'])
+    with contextlib.redirect_stdout(log):
+        try:
+            if profile:
+                summary, _ = course_profile.run_profiled(
+                    f"{course['folder_name']}.prof", build_course, *course_args, **build_options)
+            else:
+                summary = build_course(*course_args, **build_options)
+            result.update(summary)
+            result['ok'] = True
+        except Exception:
+            result['error'] = traceback.format_exc()
+    result['log'] = log.getvalue()
+    if timings:
+        result['timings'] = course_profile.snapshot()
+    return result
+
+
+def build_courses(courses, workers=None, timings=False, profile=False, **build_options):
+    """
+    用进程池并行构建多个课程，返回每个课程的结果（按完成顺序）
+    :param timings: 汇总各子进程的阶段耗时到 course_profile.stages
+    :param build_options: 传给build_course的full/compact/gzip_copy等
+    """
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(build_course_isolated, course, timings, profile, **build_options): course
+                   for course in courses}
+        for future in as_completed(futures):
+            course = futures[future]
+            try:
+                result = future.result()
+            except Exception:
+                # 工作进程本身崩溃（如被杀掉）时也只记为该课程失败
+                result = {'folder_name': course['folder_name'], 'ok': False, 'lessons': 0,
+                          'error': traceback.format_exc(), 'log': ''}
+            results.append(result)
+            if result.get('timings'):
+                import course_profile
+                course_profile.merge(result['timings'])
+            print(result['log'], end='')
+            status = '成功' if result['ok'] else '失败'
+            print(f"[{status}] {result['folder_name']}：{result['lessons']} 节课")
+            if result['error']:
+                print(result['error'])
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='生成课程目录JSON并备份VIP课件')
+    parser.add_argument('--full', action='store_true',
+                        help='忽略上次的构建清单，强制全量重建')
+    parser.add_argument('--compact', action='store_true',
+                        help='输出不带缩进和空格的紧凑JSON')
+    parser.add_argument('--gzip', action='store_true',
+                        help='同时输出一份 gzip 压缩的 .json.gz')
+    parser.add_argument('--bundle', action='store_true',
+                        help='同时打包上传用的课件zip')
+    parser.add_argument('--watch', action='store_true',
+                        help='持续监视课程文件夹，课件变化后自动更新目录JSON')
+    parser.add_argument('--poll', action='store_true',
+                        help='监视模式下强制使用轮询（默认Linux上使用inotify）')
+    parser.add_argument('--timings', action='store_true',
+                        help='统计各阶段的次数、字节数和耗时分位数')
+    parser.add_argument('--profile', action='store_true',
+                        help='同 --timings，并用cProfile生成 <课程文件夹>.prof')
+    parser.add_argument('--batch', action='store_true',
+                        help='批量构建当前目录下所有 coursedetail.* 文件夹，'
+                             '构建参数取自 --config 或各文件夹里的 course.json')
+    parser.add_argument('--config',
+                        help='课程配置文件（JSON列表）；不加 --batch 时只构建列表里的课程')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='批量构建的进程数，默认等于CPU核数')
+    parser.add_argument('--io-threads', type=int, default=None,
+                        help='每个课程扫描章节目录和读取课件的线程数')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    skipped = []
+    if args.batch:
+        # 自动发现的课程各自取构建参数，找不到参数的课程不构建，记为失败
+        configured = load_course_config(args.config) if args.config else ()
+        courses = []
+        for name in discover_courses():
+            try:
+                courses.append(course_from_folder(name, configured))
+            except ValueError as e:
+                print(f"[失败] {e}")
+                skipped.append(name)
+    elif args.config:
+        courses = load_course_config(args.config)
+    else:
+        courses = [{'project_name': project_name, 'folder_name': folder_name,
+                    'md5_id': md5_id, 'vip_index': vip_index}]
+
+    if args.watch:
+        import course_watch # course_watch 依赖本模块，用到时再导入
+        return course_watch.watch_courses(courses, args.poll, args.compact, args.gzip)
+
+    timings = args.timings or args.profile
+    if timings:
+        import course_profile # course_profile 依赖本模块，用到时再导入
+        course_profile.enable()
+
+    if args.batch or args.config:
+        results = build_courses(courses, args.workers, timings, args.profile, full=args.full,
+                                compact=args.compact, gzip_copy=args.gzip,
+                                bundle=args.bundle, bundle_workers=1, io_threads=args.io_threads)
+        failed = [r['folder_name'] for r in results if not r['ok']] + skipped
+        print(f"\n批量构建完成：{len(results) + len(skipped) - len(failed)} 个成功，{len(failed)} 个失败")
+        if timings:
+            print('\n' + course_profile.summary_table())
+        return 1 if failed else 0
+
+    # 增量构建：只重新读取清单里记录过之后发生变化的课件
+    build_args = (project_name, folder_name, md5_id, vip_index, args.full,
+                  args.compact, args.gzip, args.bundle, None, args.io_threads)
+    if args.profile:
+        prof_path = f"{folder_name}.prof"
+        _, top_functions = course_profile.run_profiled(prof_path, build_course, *build_args)
+        print(f"\ncProfile结果已保存到文件: {prof_path}\n{top_functions}")
+    else:
+        build_course(*build_args)
+    if timings:
+        print('\n' + course_profile.summary_table())
+    return 0
+
+
+if __name__ == "__main__":
+    # 通过模块名运行，course_profile、course_watch 等辅助模块和这里使用同一份函数
+    import courseware
+    sys.exit(courseware.main())
@@ -0,0 +1,399 @@
+"""
+五子棋AI：alpha-beta 搜索
+
+- 候选着法只取已有棋子周围两格内的空位，按攻防价值排序后只搜索前 BRANCH_LIMIT 个
+- 局面评估用“五元组”打分：棋盘上每个连续5格的窗口里只有一方棋子时，按棋子数给这一方加分；
+  落子和悔棋时只重新计算经过该格的窗口（最多20个），评估是增量的
+- Zobrist哈希 + 固定大小的置换表，按深度和搜索代数（age）决定是否替换
+- 迭代加深：在每步的时间预算内从1层开始逐层加深，超时就用上一层完整搜索的结果；
+  也可以改用节点数预算，结果与机器速度无关，便于复现
+
+评估函数可以换成gomoku_eval.PatternEvaluator（NumPy棋型评估，evaluator='pattern'）。
+可选的开局库和持久化搜索缓存见gomoku_book.py。
+AIPlayer 在单独的进程里搜索，pygame主循环不会被阻塞。
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from gomoku_engine import (BOARD_LEN, EMPTY, GomokuBoard, iter_bits, on_board, opponent,
+                           to_cell, to_index)
+
+
+TUPLE_SCORES = (0, 1, 20, 400, 8000, 1_000_000) # 窗口里只有一方的k个棋子时该方得分
+WIN_SCORE = 10_000_000
+INFINITY = WIN_SCORE * 2
+MATE_BOUND = WIN_SCORE - BOARD_LEN * BOARD_LEN # 绝对值不小于它的分数是必胜/必败，WIN_SCORE减去到连五的步数
+TIME_BUDGET = 1.0 # 每步默认思考时间（秒）
+MAX_DEPTH = 10
+BRANCH_LIMIT = 12 # 每个节点最多搜索的候选着法数
+CANDIDATE_DISTANCE = 2
+TT_SIZE = 1 << 20 # 置换表槽位数
+TIME_CHECK_NODES = 256 # 每搜索这么多节点检查一次时间
+
+EXACT, LOWER, UPPER = 0, 1, 2 # 置换表记录的分数类型：精确值、下界、上界
+
+
+def _build_windows():
+    """所有5格窗口（一维下标元组），以及每个格子所在的窗口编号"""
+    windows = []
+    cell_windows = {}
+    for row in range(BOARD_LEN):
+        for col in range(BOARD_LEN):
+            for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                if not on_board(row + 4 * dr, col + 4 * dc):
+                    continue
+                window = tuple(to_index(row + k * dr, col + k * dc) for k in range(5))
+                for index in window:
+                    cell_windows.setdefault(index, []).append(len(windows))
+                windows.append(window)
+    return windows, cell_windows
+
+
+WINDOWS, CELL_WINDOWS = _build_windows()
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class TupleEvaluator:
+    """增量维护每个窗口里双方的棋子数和双方总分"""
+
+    def __init__(self, board=None):
+        self.counts = [[0] * len(WINDOWS) for _ in range(3)] # counts[颜色][窗口]
+        self.score = [0, 0, 0] # score[颜色]
+        if board is not None:
+            replay = GomokuBoard()
+            for index in board.moves:
+                self.push(index, replay.player)
+                replay.play_index(index)
+
+    def push(self, index, color):
+        mine, theirs = self.counts[color], self.counts[opponent(color)]
+        score = self.score
+        other = opponent(color)
+        for w in CELL_WINDOWS[index]:
+            n = mine[w]
+            if theirs[w] == 0:
+                score[color] += TUPLE_SCORES[n + 1] - TUPLE_SCORES[n]
+            elif n == 0:
+                score[other] -= TUPLE_SCORES[theirs[w]] # 对方的窗口被堵死
+            mine[w] = n + 1
+
+    def pop(self, index, color):
+        mine, theirs = self.counts[color], self.counts[opponent(color)]
+        score = self.score
+        other = opponent(color)
+        for w in CELL_WINDOWS[index]:
+            n = mine[w] - 1
+            mine[w] = n
+            if theirs[w] == 0:
+                score[color] -= TUPLE_SCORES[n + 1] - TUPLE_SCORES[n]
+            elif n == 0:
+                score[other] += TUPLE_SCORES[theirs[w]]
+
+    def evaluate(self, color):
+        """轮到color走时的局面分"""
+        return self.score[color] - self.score[opponent(color)]
+
+    def move_value(self, index, color):
+        """在index落子的攻防价值：自己增加的分数加上堵掉对方的分数"""
+        mine, theirs = self.counts[color], self.counts[opponent(color)]
+        value = 0
+        for w in CELL_WINDOWS[index]:
+            if theirs[w] == 0:
+                value += TUPLE_SCORES[mine[w] + 1] - TUPLE_SCORES[mine[w]]
+            if mine[w] == 0:
+                value += TUPLE_SCORES[theirs[w] + 1] - TUPLE_SCORES[theirs[w]]
+        return value
+
+
+class TranspositionTable:
+    """
+    固定槽位数的置换表，槽位由哈希取模决定；
+    同一槽位上新的搜索代数或不浅于原记录的深度才会覆盖
+    """
+
+    def __init__(self, size=TT_SIZE):
+        self.size = size
+        self.slots = [None] * size # (hash, depth, flag, score, move, age)
+        self.age = 0
+
+    def new_search(self):
+        self.age += 1
+
+    def get(self, key):
+        entry = self.slots[key % self.size]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        slot = key % self.size
+        old = self.slots[slot]
+        if old is None or old[5] != self.age or depth >= old[1]:
+            self.slots[slot] = (key, depth, flag, score, move, self.age)
+
+
+def score_to_table(score, ply):
+    """
+    存进置换表/搜索缓存的分数：必胜/必败分数从“距根局面的步数”换成“距本局面的步数”，
+    同一局面在不同深度遇到时取出的分数才正确
+    """
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_table(score, ply):
+    """score_to_table的逆变换"""
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+
+def evaluator_class(name):
+    """按名称取评估函数类：'tuple' 五元组（纯Python），'pattern' 棋型（需要NumPy）"""
+    if name == 'pattern':
+        from gomoku_eval import PatternEvaluator # 依赖NumPy，用到时再导入
+        return PatternEvaluator
+    if name == 'tuple':
+        return TupleEvaluator
+    raise ValueError(f"未知的评估函数: {name}")
+
+
+class Searcher:
+    """迭代加深的 negamax alpha-beta 搜索，置换表在多次搜索之间保留"""
+
+    def __init__(self, tt_size=TT_SIZE, branch_limit=BRANCH_LIMIT, evaluator='tuple', book=None, cache=None):
+        """
+        :param book: gomoku_book.OpeningBook，开局库里有的局面直接走库里的着法
+        :param cache: gomoku_book.PersistentCache，内存置换表查不到时回落到它，可写时保存每步的结果
+        """
+        self.tt = TranspositionTable(tt_size)
+        self.book = book
+        self.cache = cache
+        self.branch_limit = branch_limit
+        self.evaluator_class = evaluator_class(evaluator)
+        self.board = None
+        self.evaluator = None
+        self.nodes = 0
+        self.deadline = 0.0
+        self.node_limit = float('inf')
+
+    def close(self):
+        """关闭开局库和搜索缓存文件"""
+        for f in (self.book, self.cache):
+            if f is not None:
+                f.close()
+
+    def play(self, index):
+        color = self.board.player
+        self.board.play_index(index)
+        self.evaluator.push(index, color)
+
+    def undo(self):
+        index = self.board.moves[-1]
+        self.board.undo()
+        self.evaluator.pop(index, self.board.player)
+
+    def candidates(self, board):
+        """board当前一方的候选着法（一维下标，按攻防价值排序），不搜索"""
+        if not board.moves:
+            return [to_index(BOARD_LEN // 2, BOARD_LEN // 2)]
+        self.board = board.copy()
+        self.evaluator = self.evaluator_class(self.board)
+        return self.ordered_moves()
+
+    def ordered_moves(self, first=None):
+        """候选着法按攻防价值从高到低排序，置换表里的最佳着法排最前"""
+        board = self.board
+        color = board.player
+        value = self.evaluator.move_value
+        candidates = sorted(iter_bits(board.neighbours(CANDIDATE_DISTANCE)),
+                            key=lambda index: value(index, color), reverse=True)
+        candidates = candidates[:self.branch_limit]
+        if first is not None and first in candidates:
+            candidates.remove(first)
+            candidates.insert(0, first)
+        elif first is not None and board.cells[first] == EMPTY:
+            candidates.insert(0, first)
+        return candidates
+
+    def search(self, depth, alpha, beta, ply):
+        board = self.board
+        self.nodes += 1
+        if self.nodes >= self.node_limit or \
+                (self.nodes % TIME_CHECK_NODES == 0 and time.perf_counter() > self.deadline):
+            raise SearchTimeout
+        if board.winner != EMPTY:
+            return -WIN_SCORE + ply # 上一手（对方）已经连成五子
+        if depth == 0 or board.is_full():
+            return self.evaluator.evaluate(board.player)
+
+        alpha_orig = alpha
+        tt_move = None
+        entry = self.tt.get(board.hash)
+        if entry is None and self.cache is not None:
+            entry = self.cache.get(board.hash)
+        if entry is not None:
+            _, tt_depth, flag, score, tt_move, _ = entry
+            score = score_from_table(score, ply)
+            if tt_depth >= depth:
+                if flag == EXACT:
+                    return score
+                if flag == LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        best_score, best_move = -INFINITY, None
+        for index in self.ordered_moves(tt_move):
+            self.play(index)
+            try:
+                score = -self.search(depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                self.undo()
+            if score > best_score:
+                best_score, best_move = score, index
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best_score <= alpha_orig:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(board.hash, depth, flag, score_to_table(best_score, ply), best_move)
+        return best_score
+
+    def search_root(self, depth, first):
+        best_score, best_move = -INFINITY, None
+        alpha = -INFINITY
+        for index in self.ordered_moves(first):
+            self.play(index)
+            try:
+                score = -self.search(depth - 1, -INFINITY, -alpha, 1)
+            finally:
+                self.undo()
+            if score > best_score:
+                best_score, best_move = score, index
+                alpha = max(alpha, score)
+        self.tt.store(self.board.hash, depth, EXACT, best_score, best_move)
+        return best_score, best_move
+
+    def best_move(self, board, time_budget=TIME_BUDGET, max_depth=MAX_DEPTH, node_limit=None):
+        """
+        在time_budget秒内为board当前一方选一步
+        :param time_budget: 为None时不限时间，只受max_depth和node_limit限制
+        :param node_limit: 搜索节点数上限，超过时同超时处理
+        :return: ((row, col), 统计信息dict)
+        """
+        start = time.perf_counter()
+        self.deadline = float('inf') if time_budget is None else start + time_budget
+        self.node_limit = float('inf') if node_limit is None else node_limit
+        self.board = board.copy()
+        self.evaluator = self.evaluator_class(self.board)
+        self.tt.new_search()
+        self.nodes = 0
+        info = {'depth': 0, 'score': 0, 'nodes': 0, 'seconds': 0.0, 'source': 'search'}
+
+        book_move = self.book.lookup(board) if self.book is not None else None
+        if book_move is not None:
+            move = to_index(*book_move)
+            info['source'] = 'book'
+        elif not board.moves:
+            move = to_index(BOARD_LEN // 2, BOARD_LEN // 2) # 第一手下天元
+        else:
+            move = self.ordered_moves()[0]
+            start_depth = 1
+            cached = self.cache.get(board.hash) if self.cache is not None else None
+            if cached is not None and cached[2] == EXACT and board.cells[cached[4]] == EMPTY:
+                # 以前算过这个局面：先采用缓存的结果，从更深一层继续
+                _, cached_depth, _, score, move, _ = cached
+                info.update(depth=cached_depth, score=score, source='cache')
+                start_depth = cached_depth + 1
+            for depth in range(start_depth, max_depth + 1):
+                if abs(info['score']) >= MATE_BOUND:
+                    break # 已经算出必胜或必败
+                try:
+                    score, move = self.search_root(depth, move)
+                except SearchTimeout:
+                    break
+                info.update(depth=depth, score=score)
+            if self.cache is not None and info['depth'] > 0:
+                self.cache.store(board.hash, info['depth'], EXACT, info['score'], move)
+
+        info['nodes'] = self.nodes
+        info['seconds'] = time.perf_counter() - start
+        return to_cell(move), info
+
+
+_searcher = None # AI进程里的搜索器，置换表在各步之间复用
+_searcher_key = None # 创建_searcher时的 (评估函数, 开局库, 搜索缓存)
+
+
+def think(moves, time_budget=TIME_BUDGET, max_depth=MAX_DEPTH, evaluator='tuple',
+          book_path=None, cache_path=None):
+    """在AI进程里执行：根据落子记录重建棋局并搜索；评估函数、开局库或搜索缓存变了就换新的搜索器"""
+    global _searcher, _searcher_key
+    key = (evaluator, book_path, cache_path)
+    if _searcher is None or _searcher_key != key:
+        import gomoku_book
+        if _searcher is not None:
+            _searcher.close()
+            _searcher = None
+        _searcher = Searcher(evaluator=evaluator, book=gomoku_book.OpeningBook.open_if_exists(book_path),
+                             cache=gomoku_book.PersistentCache.open_if_exists(cache_path, writable=True))
+        _searcher_key = key
+    return _searcher.best_move(GomokuBoard.from_moves(moves), time_budget, max_depth)
+
+
+def _finish(future, callback):
+    """Future完成后调用callback，取消或出错时把异常放进info"""
+    try:
+        cell, info = future.result()
+    except Exception as e:
+        cell, info = None, {'error': e}
+    callback(cell, info)
+
+
+class AIPlayer:
+    """在单独的进程里思考，request_move立即返回Future"""
+
+    def __init__(self, time_budget=TIME_BUDGET, max_depth=MAX_DEPTH, evaluator='tuple',
+                 book_path=None, cache_path=None):
+        """
+        :param book_path: 开局库文件，不存在时不用开局库
+        :param cache_path: 持久化搜索缓存文件，不存在时新建
+        """
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.evaluator = evaluator
+        self.book_path = book_path
+        self.cache_path = cache_path
+        self.executor = ProcessPoolExecutor(max_workers=1)
+
+    def request_move(self, board, callback=None):
+        """
+        :param callback: 思考完成后以 ((row, col), info) 调用（在后台线程里）；
+            AI进程出错时以 (None, {'error': 异常}) 调用，调用方据此结束等待
+        """
+        future = self.executor.submit(think, list(board.moves), self.time_budget,
+                                      self.max_depth, self.evaluator, self.book_path, self.cache_path)
+        if callback is not None:
+            future.add_done_callback(lambda f: _finish(f, callback))
+        return future
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
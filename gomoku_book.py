@@ -0,0 +1,277 @@
+"""
+五子棋开局库和持久化搜索缓存
+
+两者都是定长记录的二进制文件，用mmap打开：不需要把文件读进内存就能查询，启动时间与文件大小无关；
+多个自我对弈进程以只读方式打开同一个文件时，操作系统只在页缓存里保留一份。
+
+开局库（OpeningBook）：
+    文件头 'GMOB' + 版本 + 记录数，之后是按哈希排序的 (Zobrist哈希, 着法) 记录，二分查找。
+    局面按棋盘的8种对称变换取最小哈希归一，同一开局旋转、翻转后都能查到。
+    用 python gomoku_book.py build 离线生成：从空棋盘开始，每个局面用较长时间搜索最佳着法，
+    再沿着攻防价值最高的几个着法展开下一层。
+
+搜索缓存（PersistentCache）：
+    文件头 'GMTT' + 版本 + 槽位数 + 代数（age），之后是固定数量的槽位，槽位由哈希取模决定，
+    文件大小固定不会增长。每次以可写方式打开算一代；写入同一槽位时，新记录的深度
+    不低于旧记录按代数衰减后的深度才会替换（旧代的浅层记录最先被淘汰）。
+    Searcher 在内存置换表查不到时回落到这个缓存；每步搜索完成后把根局面的结果写回，
+    下次遇到同一局面时从缓存的深度继续加深，而不是从1层重新算。
+
+开局库默认放在本模块旁边（随程序分发），搜索缓存默认放在用户缓存目录里，
+在哪个目录下运行游戏都不会往当前目录写文件。
+"""
+
+import os
+import sys
+import mmap
+import struct
+import argparse
+
+from gomoku_ai import Searcher
+from gomoku_engine import BOARD_LEN, EMPTY, ZOBRIST, GomokuBoard, to_cell, to_index
+
+
+def user_cache_dir():
+    """用户缓存目录：Windows上是 %LOCALAPPDATA%，其他系统是 $XDG_CACHE_HOME 或 ~/.cache"""
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser(os.path.join('~', '.cache'))
+    return os.path.join(base, 'itprojects-gomoku')
+
+
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gomoku_book.bin')
+CACHE_PATH = os.path.join(user_cache_dir(), 'gomoku_cache.bin')
+CACHE_SLOTS = 1 << 18
+
+BOOK_MAGIC = b'GMOB'
+BOOK_HEADER = struct.Struct('<4sHI') # 标识、版本、记录数
+BOOK_RECORD = struct.Struct('<QH') # 归一后的哈希、归一后的着法下标
+CACHE_MAGIC = b'GMTT'
+CACHE_HEADER = struct.Struct('<4sHIH') # 标识、版本、槽位数、当前代数
+CACHE_RECORD = struct.Struct('<QiHBBH') # 哈希、分数、着法、深度、分数类型、写入时的代数
+FILE_VERSION = 1
+CACHE_VERSION = 2 # 2: 必胜/必败分数按距本局面的步数保存（见gomoku_ai.score_to_table）
+AGE_PENALTY = 1 # 每旧一代，记录的深度按少这么多层比较
+
+
+def _symmetries():
+    """8种对称变换，每种是 一维下标 -> 变换后一维下标 的映射（只含棋盘内的格子）"""
+    n = BOARD_LEN - 1
+    transforms = (
+        lambda r, c: (r, c), lambda r, c: (c, n - r), lambda r, c: (n - r, n - c), lambda r, c: (n - c, r),
+        lambda r, c: (r, n - c), lambda r, c: (c, r), lambda r, c: (n - r, c), lambda r, c: (n - c, n - r),
+    )
+    perms = []
+    for transform in transforms:
+        perms.append({to_index(r, c): to_index(*transform(r, c))
+                      for r in range(BOARD_LEN) for c in range(BOARD_LEN)})
+    return perms
+
+
+SYMMETRIES = _symmetries()
+INVERSE_SYMMETRIES = [{v: k for k, v in perm.items()} for perm in SYMMETRIES]
+
+
+def canonical(board):
+    """
+    局面在8种对称变换下的最小哈希
+    :return: (哈希, 变换编号)
+    """
+    best = None
+    for t, perm in enumerate(SYMMETRIES):
+        key = 0
+        for index in board.moves:
+            key ^= ZOBRIST[board.cells[index]][perm[index]]
+        if best is None or key < best[0]:
+            best = (key, t)
+    return best
+
+
+class OpeningBook:
+
+    def __init__(self, path=BOOK_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count = BOOK_HEADER.unpack_from(self.mm)
+        if magic != BOOK_MAGIC or version != FILE_VERSION:
+            raise ValueError(f"不是开局库文件或版本不对: {path}")
+
+    @classmethod
+    def open_if_exists(cls, path=BOOK_PATH):
+        return cls(path) if path and os.path.exists(path) else None
+
+    def _find(self, key):
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            record_key, move = BOOK_RECORD.unpack_from(self.mm, BOOK_HEADER.size + mid * BOOK_RECORD.size)
+            if record_key < key:
+                low = mid + 1
+            elif record_key > key:
+                high = mid
+            else:
+                return move
+        return None
+
+    def lookup(self, board):
+        """开局库里这个局面的着法 (row, col)，没有时返回None"""
+        if len(board.moves) > 8:
+            return None # 开局库只收录前几手
+        key, t = canonical(board)
+        move = self._find(key)
+        if move is None:
+            return None
+        index = INVERSE_SYMMETRIES[t][move]
+        return to_cell(index) if board.cells[index] == EMPTY else None
+
+    def close(self):
+        self.mm.close()
+
+
+def write_book(path, entries):
+    """entries: {归一后的哈希: 归一后的着法下标}"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(BOOK_HEADER.pack(BOOK_MAGIC, FILE_VERSION, len(entries)))
+        for key in sorted(entries):
+            f.write(BOOK_RECORD.pack(key, entries[key]))
+    os.replace(tmp_path, path)
+
+
+def build_opening_book(path=BOOK_PATH, plies=4, replies=3, time_budget=2.0, evaluator='tuple'):
+    """从空棋盘开始逐层展开：每个局面搜索最佳着法，再沿价值最高的replies个着法进入下一层"""
+    searcher = Searcher(evaluator=evaluator)
+    entries = {}
+    frontier = [GomokuBoard()]
+    for ply in range(plies):
+        next_frontier = []
+        for board in frontier:
+            key, t = canonical(board)
+            if key in entries or board.is_over():
+                continue
+            (row, col), info = searcher.best_move(board, time_budget)
+            entries[key] = SYMMETRIES[t][to_index(row, col)]
+            print(f"第{ply + 1}手 {len(entries):>5} 个局面  {(row, col)}  深度{info['depth']}")
+
+            for index in searcher.candidates(board)[:replies]:
+                child = board.copy()
+                child.play_index(index)
+                next_frontier.append(child)
+        frontier = next_frontier
+    write_book(path, entries)
+    print(f"开局库已保存到文件: {path}（{len(entries)} 个局面）")
+    return len(entries)
+
+
+class PersistentCache:
+    """mmap的定长槽位搜索缓存，get/store接口与gomoku_ai.TranspositionTable相同"""
+
+    def __init__(self, path=CACHE_PATH, slots=CACHE_SLOTS, writable=False):
+        self.path = path
+        self.writable = writable
+        if writable and not os.path.exists(path):
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, slots, 0))
+                f.truncate(CACHE_HEADER.size + slots * CACHE_RECORD.size)
+        with open(path, 'r+b' if writable else 'rb') as f:
+            if os.fstat(f.fileno()).st_size < CACHE_HEADER.size:
+                raise ValueError(f"搜索缓存文件不完整: {path}")
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        magic, version, self.slots, self.age = CACHE_HEADER.unpack_from(self.mm)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION:
+            self.mm.close()
+            raise ValueError(f"不是搜索缓存文件或版本不对: {path}")
+        if not self.slots or len(self.mm) != CACHE_HEADER.size + self.slots * CACHE_RECORD.size:
+            self.mm.close()
+            raise ValueError(f"搜索缓存文件不完整: {path}")
+        if writable:
+            # 每次以可写方式打开算新的一代
+            self.age = (self.age + 1) & 0xFFFF
+            CACHE_HEADER.pack_into(self.mm, 0, CACHE_MAGIC, CACHE_VERSION, self.slots, self.age)
+
+    @classmethod
+    def open_if_exists(cls, path=CACHE_PATH, writable=False):
+        """
+        只读打开时文件不存在返回None；可写打开时文件不存在就新建
+        文件无效（空文件、不完整、旧版本）时：只读打开返回None，可写打开删掉重建
+        """
+        if not path or not writable and not os.path.exists(path):
+            return None
+        try:
+            return cls(path, writable=writable)
+        except ValueError as e:
+            if not writable:
+                print(f"{e}，不使用搜索缓存", file=sys.stderr)
+                return None
+            print(f"{e}，重新创建", file=sys.stderr)
+        os.remove(path)
+        return cls(path, writable=True)
+
+    def _offset(self, key):
+        return CACHE_HEADER.size + (key % self.slots) * CACHE_RECORD.size
+
+    def get(self, key):
+        """:return: (哈希, 深度, 分数类型, 分数, 着法, 代数)，没有时返回None"""
+        if not key:
+            return None
+        record_key, score, move, depth, flag, age = CACHE_RECORD.unpack_from(self.mm, self._offset(key))
+        if record_key != key:
+            return None
+        return record_key, depth, flag, score, move, age
+
+    def store(self, key, depth, flag, score, move):
+        if not key or not self.writable:
+            return False
+        offset = self._offset(key)
+        old_key, _, _, old_depth, _, old_age = CACHE_RECORD.unpack_from(self.mm, offset)
+        stale = (self.age - old_age) & 0xFFFF
+        if old_key and old_key != key and depth < old_depth - stale * AGE_PENALTY:
+            return False
+        if old_key == key and depth < old_depth:
+            return False
+        CACHE_RECORD.pack_into(self.mm, offset, key, score, move, min(depth, 255), flag, self.age)
+        return True
+
+    def flush(self):
+        if self.writable:
+            self.mm.flush()
+
+    def close(self):
+        self.flush()
+        self.mm.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='五子棋开局库和搜索缓存')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='生成开局库')
+    build.add_argument('--out', default=BOOK_PATH)
+    build.add_argument('--plies', type=int, default=4, help='收录前几手')
+    build.add_argument('--replies', type=int, default=3, help='每个局面展开几个着法')
+    build.add_argument('--time', type=float, default=2.0, help='每个局面的搜索时间（秒）')
+    build.add_argument('--eval', default='tuple', choices=('tuple', 'pattern'))
+    stats = sub.add_parser('stats', help='统计搜索缓存的使用情况')
+    stats.add_argument('path', nargs='?', default=CACHE_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        build_opening_book(args.out, args.plies, args.replies, args.time, args.eval)
+    else:
+        cache = PersistentCache(args.path)
+        used, depths = 0, {}
+        for slot in range(cache.slots):
+            key, _, _, depth, _, _ = CACHE_RECORD.unpack_from(cache.mm, CACHE_HEADER.size + slot * CACHE_RECORD.size)
+            if key:
+                used += 1
+                depths[depth] = depths.get(depth, 0) + 1
+        print(f"{args.path}: {used}/{cache.slots} 个槽位已使用，当前第 {cache.age} 代")
+        print('深度分布：' + '，'.join(f"{depth}层 {count}" for depth, count in sorted(depths.items())))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+五子棋棋盘状态（不依赖pygame，可以单独测试和压测）
+
+19x19 棋盘按行展开成一维下标：每行后面多留一列、上下各多留一行作为边界，
+    index = (row + 1) * STRIDE + col，STRIDE = BOARD_LEN + 1
+这样沿四个方向走一步都是下标加减一个常数（1、STRIDE、STRIDE±1），走出棋盘就会碰到边界格，
+不需要判断行列越界。
+
+每方的棋子同时记在一个Python整数位棋盘（bits）和一个bytearray（cells）里：
+位棋盘方便整体移位求邻域等批量运算，cells用于O(1)查询单个格子。
+落子和悔棋都是O(1)；判断五连只检查经过最后一手的四条线。
+另外增量维护局面的Zobrist哈希（hash），供搜索的置换表使用。
+"""
+
+import random
+
+BOARD_LEN = 19
+STRIDE = BOARD_LEN + 1
+CELL_COUNT = STRIDE * (BOARD_LEN + 2) + 1 # 含边界格的一维数组长度
+
+EMPTY, BLACK, WHITE, BORDER = 0, 1, 2, 3
+DIRECTIONS = (1, STRIDE, STRIDE + 1, STRIDE - 1) # 横、竖、主对角线、副对角线
+WIN_LENGTH = 5
+
+
+def to_index(row, col):
+    return (row + 1) * STRIDE + col
+
+
+def to_cell(index):
+    row, col = divmod(index, STRIDE)
+    return row - 1, col
+
+
+def opponent(color):
+    return BLACK + WHITE - color
+
+
+def on_board(row, col):
+    return 0 <= row < BOARD_LEN and 0 <= col < BOARD_LEN
+
+
+def _empty_cells():
+    cells = bytearray([BORDER]) * CELL_COUNT
+    for row in range(BOARD_LEN):
+        start = to_index(row, 0)
+        cells[start:start + BOARD_LEN] = bytes(BOARD_LEN)
+    return cells
+
+
+def _zobrist_keys(seed=19):
+    """每种颜色、每个格子一个64位随机数；种子固定，同一局面在任何进程里哈希都相同"""
+    rng = random.Random(seed)
+    return [[rng.getrandbits(64) for _ in range(CELL_COUNT)] for _ in range(3)]
+
+
+ZOBRIST = _zobrist_keys()
+BOARD_MASK = sum(1 << to_index(row, col) for row in range(BOARD_LEN) for col in range(BOARD_LEN))
+_EMPTY_CELLS = _empty_cells()
+
+
+class GomokuBoard:
+    """一局棋的状态：棋子、轮到谁、落子记录和胜负"""
+    __slots__ = ('cells', 'bits', 'moves', 'player', 'winner', 'hash')
+
+    def __init__(self):
+        self.cells = bytearray(_EMPTY_CELLS)
+        self.bits = [0, 0, 0] # 按颜色下标：bits[BLACK]、bits[WHITE]
+        self.moves = [] # 落子的一维下标
+        self.player = BLACK # 黑方先行
+        self.winner = EMPTY
+        self.hash = 0
+
+    @classmethod
+    def from_moves(cls, moves):
+        """按一维下标的落子记录重建棋局（传给其他进程时只需传moves）"""
+        board = cls()
+        for index in moves:
+            board.play_index(index)
+        return board
+
+    def copy(self):
+        board = GomokuBoard.__new__(GomokuBoard)
+        board.cells = bytearray(self.cells)
+        board.bits = list(self.bits)
+        board.moves = list(self.moves)
+        board.player = self.player
+        board.winner = self.winner
+        board.hash = self.hash
+        return board
+
+    def __getitem__(self, cell):
+        return self.cells[to_index(*cell)]
+
+    @property
+    def last_move(self):
+        """最后一手的 (row, col)，还没有落子时为None"""
+        return to_cell(self.moves[-1]) if self.moves else None
+
+    @property
+    def occupied(self):
+        """所有棋子的位棋盘"""
+        return self.bits[BLACK] | self.bits[WHITE]
+
+    def is_full(self):
+        return len(self.moves) == BOARD_LEN * BOARD_LEN
+
+    def is_over(self):
+        return self.winner != EMPTY or self.is_full()
+
+    def is_legal(self, row, col):
+        return on_board(row, col) and self.cells[to_index(row, col)] == EMPTY and self.winner == EMPTY
+
+    def play(self, row, col):
+        """
+        当前一方在 (row, col) 落子
+        :return: 这一手之后的胜方（BLACK/WHITE），没有分出胜负时为EMPTY
+        """
+        if not on_board(row, col):
+            raise ValueError(f"不在棋盘上: {(row, col)}")
+        return self.play_index(to_index(row, col))
+
+    def play_index(self, index):
+        """按一维下标落子（搜索时使用，省去坐标换算）"""
+        if self.cells[index] != EMPTY:
+            raise ValueError(f"该位置已有棋子: {to_cell(index)}")
+        if self.winner != EMPTY:
+            raise ValueError("对局已经结束")
+        color = self.player
+        self.cells[index] = color
+        self.bits[color] |= 1 << index
+        self.hash ^= ZOBRIST[color][index]
+        self.moves.append(index)
+        self.player = opponent(color)
+        if self.is_five(index, color):
+            self.winner = color
+        return self.winner
+
+    def undo(self):
+        """悔一步棋，返回被撤销的 (row, col)"""
+        index = self.moves.pop()
+        color = self.cells[index]
+        self.cells[index] = EMPTY
+        self.bits[color] ^= 1 << index
+        self.hash ^= ZOBRIST[color][index]
+        self.player = color
+        self.winner = EMPTY
+        return to_cell(index)
+
+    def count_line(self, index, direction, color):
+        """经过index、沿direction方向连续的color棋子数（包括index本身）"""
+        cells = self.cells
+        count = 1
+        step = index + direction
+        while cells[step] == color:
+            count += 1
+            step += direction
+        step = index - direction
+        while cells[step] == color:
+            count += 1
+            step -= direction
+        return count
+
+    def is_five(self, index, color):
+        """index上的color棋子是否连成五子（或更多）"""
+        return any(self.count_line(index, direction, color) >= WIN_LENGTH for direction in DIRECTIONS)
+
+    def neighbours(self, distance=1):
+        """所有棋子周围distance格以内的空位（位棋盘）"""
+        occupied = self.occupied
+        near = occupied
+        for _ in range(distance):
+            spread = near
+            for direction in DIRECTIONS:
+                spread |= (near << direction) | (near >> direction)
+            near = spread & BOARD_MASK # 去掉边界格，下一轮扩散不会绕到相邻行
+        return near & ~occupied
+
+    def __str__(self):
+        symbols = '.XO'
+        return '\n'.join(
+            ''.join(symbols[self.cells[to_index(row, col)]] for col in range(BOARD_LEN))
+            for row in range(BOARD_LEN))
+
+
+def iter_bits(bits):
+    """位棋盘中所有为1的下标（从低到高）"""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
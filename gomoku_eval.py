@@ -0,0 +1,183 @@
+"""
+五子棋棋型评估（NumPy向量化）
+
+把棋盘上所有长度不小于5的行、列和两个方向的对角线（共96条线）排成一个二维数组，
+每条线两端补边界格、统一成 BOARD_LEN + 2 格。每种颜色把格子编码成
+0=空、1=己方、2=被挡（对方棋子或边界），再用6格滑动窗口算出base-3编码（卷积式的6次移位相加），
+查表得到窗口的棋型分数：连五、活四、冲四、活三（含跳活三）、眠三、活二、眠二。
+
+整盘评估一次算完所有线的所有窗口编码；落子或悔棋后只需更新经过该格的最多4条线上
+包含该格的窗口（每方最多24个），窗口编码加上该格编码的变化乘以它在窗口里的位权即可（update）。
+reference_line_scores 是逐格的纯Python实现，用于对照结果和性能。
+"""
+
+import itertools
+
+import numpy as np
+
+from gomoku_ai import TupleEvaluator
+from gomoku_engine import (BLACK, BOARD_LEN, BORDER, CELL_COUNT, EMPTY, WHITE, GomokuBoard, on_board,
+                           opponent, to_index)
+
+
+WINDOW = 6
+LINE_LEN = BOARD_LEN + 2 # 每条线两端各补一个边界格
+WINDOW_COUNT = LINE_LEN - WINDOW + 1
+
+FIVE = 1_000_000
+OPEN_FOUR = 100_000
+FOUR = 10_000
+OPEN_THREE = 5_000
+THREE = 500
+OPEN_TWO = 200
+TWO = 20
+
+
+def classify(window):
+    """
+    6格窗口的棋型分数，窗口用字符串表示：'x'己方、'_'空、'#'被挡
+    """
+    if 'xxxxx' in window:
+        return FIVE
+    if window == '_xxxx_':
+        return OPEN_FOUR
+    fives = (window[:5], window[1:])
+    if any(five.count('x') == 4 and five.count('_') == 1 for five in fives):
+        return FOUR
+    if window in ('_xxx__', '__xxx_', '_xx_x_', '_x_xx_'):
+        return OPEN_THREE
+    if any(five.count('x') == 3 and five.count('_') == 2 for five in fives):
+        return THREE
+    if window[0] == window[-1] == '_' and window.count('x') == 2 and window.count('_') == 4:
+        return OPEN_TWO
+    if any(five.count('x') == 2 and five.count('_') == 3 for five in fives):
+        return TWO
+    return 0
+
+
+def _build_pattern_table():
+    """所有3**6种窗口编码的分数，编码的最高位是窗口的第一格（product正好按编码从小到大生成）"""
+    return np.array([classify(''.join('_x#'[digit] for digit in digits))
+                     for digits in itertools.product(range(3), repeat=WINDOW)], dtype=np.int64)
+
+
+def _build_lines():
+    """每条线上各格的一维下标（不足LINE_LEN的部分填边界格下标0），以及每个格子所在的线"""
+    lines = []
+    for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        for row in range(BOARD_LEN):
+            for col in range(BOARD_LEN):
+                if on_board(row - dr, col - dc):
+                    continue # 不是这个方向上一条线的起点
+                cells = []
+                r, c = row, col
+                while on_board(r, c):
+                    cells.append(to_index(r, c))
+                    r, c = r + dr, c + dc
+                if len(cells) >= 5:
+                    lines.append([0] + cells + [0] * (LINE_LEN - 1 - len(cells)))
+    return np.array(lines, dtype=np.intp)
+
+
+def _build_cell_windows(line_index):
+    """
+    每个格子所在的窗口：在 (线数 * WINDOW_COUNT) 展平数组里的位置，以及该格在窗口里的位权
+    """
+    positions = [[] for _ in range(CELL_COUNT)]
+    weights = [[] for _ in range(CELL_COUNT)]
+    for line, cells in enumerate(line_index.tolist()):
+        for offset, index in enumerate(cells):
+            if not index:
+                continue # 边界格
+            for start in range(max(offset - WINDOW + 1, 0), min(offset, WINDOW_COUNT - 1) + 1):
+                positions[index].append(line * WINDOW_COUNT + start)
+                weights[index].append(3 ** (WINDOW - 1 - (offset - start)))
+    return ([np.array(p, dtype=np.intp) for p in positions],
+            [np.array(w, dtype=np.int64) for w in weights])
+
+
+PATTERN_TABLE = _build_pattern_table()
+LINE_INDEX = _build_lines()
+CELL_WINDOW_POSITIONS, CELL_WINDOW_WEIGHTS = _build_cell_windows(LINE_INDEX)
+LINE_COUNT = len(LINE_INDEX)
+# 格子的值（空、黑、白、边界）在某一方看来的编码：0=空、1=己方、2=被挡
+CELL_CODES = np.array([
+    [0, 0, 0, 0],
+    [0, 1, 2, 2],
+    [0, 2, 1, 2],
+], dtype=np.int64)
+assert BORDER == 3 and EMPTY == 0
+
+
+def window_codes(lines):
+    """
+    lines: (n, LINE_LEN) 的格子值
+    :return: (2, n, WINDOW_COUNT)，黑、白双方看来每个6格窗口的base-3编码
+    """
+    coded = CELL_CODES[[BLACK, WHITE]][:, lines]
+    codes = coded[..., :WINDOW_COUNT] * 3 ** (WINDOW - 1)
+    for k in range(1, WINDOW):
+        codes += coded[..., k:k + WINDOW_COUNT] * 3 ** (WINDOW - 1 - k)
+    return codes
+
+
+class PatternEvaluator:
+    """
+    棋型评估，接口和gomoku_ai.TupleEvaluator相同，可以传给Searcher；
+    候选着法排序仍然使用五元组的攻防价值（计算量小）
+    """
+
+    def __init__(self, board=None):
+        if board is None:
+            board = GomokuBoard()
+        self.cells = np.frombuffer(board.cells, dtype=np.uint8).copy()
+        self.ordering = TupleEvaluator(board)
+        self.rescore_all()
+
+    def rescore_all(self):
+        """整盘重新计算所有窗口"""
+        self.codes = window_codes(self.cells[LINE_INDEX]).reshape(2, -1)
+        self.totals = np.zeros(3, dtype=np.int64)
+        self.totals[[BLACK, WHITE]] = PATTERN_TABLE[self.codes].sum(axis=1)
+
+    def line_scores(self):
+        """(2, 线数)：黑、白双方在每条线上的棋型分"""
+        return PATTERN_TABLE[self.codes].reshape(2, LINE_COUNT, WINDOW_COUNT).sum(axis=2)
+
+    def update(self, index, value):
+        """index上的格子变成value，只更新包含它的窗口"""
+        positions = CELL_WINDOW_POSITIONS[index]
+        delta = CELL_CODES[[BLACK, WHITE], value] - CELL_CODES[[BLACK, WHITE], self.cells[index]]
+        old = self.codes[:, positions]
+        new = old + delta[:, None] * CELL_WINDOW_WEIGHTS[index]
+        self.totals[[BLACK, WHITE]] += (PATTERN_TABLE[new] - PATTERN_TABLE[old]).sum(axis=1)
+        self.codes[:, positions] = new
+        self.cells[index] = value
+
+    def push(self, index, color):
+        self.update(index, color)
+        self.ordering.push(index, color)
+
+    def pop(self, index, color):
+        self.update(index, EMPTY)
+        self.ordering.pop(index, color)
+
+    def evaluate(self, color):
+        return int(self.totals[color] - self.totals[opponent(color)])
+
+    def move_value(self, index, color):
+        return self.ordering.move_value(index, color)
+
+
+def reference_line_scores(board):
+    """纯Python逐格实现：对每条线、每种颜色逐个6格窗口分类，返回 {颜色: 每条线的分数列表}"""
+    symbols = {BLACK: {EMPTY: '_', BLACK: 'x', WHITE: '#', BORDER: '#'},
+               WHITE: {EMPTY: '_', BLACK: '#', WHITE: 'x', BORDER: '#'}}
+    result = {}
+    for color in (BLACK, WHITE):
+        line_scores = []
+        for line in LINE_INDEX.tolist():
+            text = ''.join(symbols[color][board.cells[index]] for index in line)
+            line_scores.append(sum(classify(text[i:i + WINDOW]) for i in range(WINDOW_COUNT)))
+        result[color] = line_scores
+    return result
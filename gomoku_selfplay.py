@@ -0,0 +1,229 @@
+"""
+五子棋AI自我对弈（不需要pygame）
+
+在进程池里并行下很多盘引擎对引擎的棋，用于离线调参：
+    对局汇总 <前缀>.games.csv：胜负、手数、双方的搜索节点数和每秒节点数
+    每一手   <前缀>.moves.csv 或紧凑的二进制 <前缀>.moves.bin（--binary）：深度、节点数、耗时、分数
+
+每盘棋的随机开局由 种子 + 对局编号 决定；默认按节点数而不是时间限制每步的搜索，
+同样的参数无论用几个进程、在什么机器上跑，棋谱都完全相同。
+--book / --cache 指定的开局库和搜索缓存由各进程以只读方式mmap共享（对局中不写入，保证可复现）。
+
+用法：python gomoku_selfplay.py --games 1000 [--workers N] [--seed 0] [--nodes 2000 | --time 0.2]
+          [--black-eval tuple] [--white-eval pattern] [--swap] [--out selfplay]
+          [--book gomoku_book.bin] [--cache gomoku_cache.bin]
+"""
+
+import csv
+import sys
+import time
+import random
+import struct
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import gomoku_book
+from gomoku_ai import MAX_DEPTH, Searcher
+from gomoku_engine import BLACK, BOARD_LEN, EMPTY, WHITE, GomokuBoard, to_cell
+
+
+OPENING_MOVES = 2 # 每盘开局随机下几手
+OPENING_RADIUS = 3 # 随机开局的范围：天元周围几格以内
+NODE_LIMIT = 2000 # 默认每步的搜索节点数
+TT_SIZE = 1 << 16 # 每盘棋新建置换表，不让上一盘的结果影响下一盘
+
+MOVE_LOG_MAGIC = b'GMSP'
+MOVE_LOG_VERSION = 1
+# 对局编号、手数、颜色、行、列、深度、节点数、耗时（秒）、分数
+MOVE_RECORD = struct.Struct('<IHBBBBIfq')
+GAME_FIELDS = ('game', 'seed', 'black_eval', 'white_eval', 'winner', 'moves',
+               'black_nodes', 'white_nodes', 'black_nps', 'white_nps', 'seconds')
+MOVE_FIELDS = ('game', 'ply', 'player', 'row', 'col', 'depth', 'nodes', 'seconds', 'score')
+COLOR_NAMES = {EMPTY: 'draw', BLACK: 'black', WHITE: 'white'}
+
+
+_shared = {'book': None, 'cache': None} # 工作进程里只读打开的开局库和搜索缓存
+
+
+def init_worker(book_path, cache_path):
+    _shared['book'] = gomoku_book.OpeningBook.open_if_exists(book_path)
+    _shared['cache'] = gomoku_book.PersistentCache.open_if_exists(cache_path)
+
+
+def random_opening(board, rng, moves=OPENING_MOVES, radius=OPENING_RADIUS):
+    """在天元附近随机落moves手"""
+    center = BOARD_LEN // 2
+    cells = [(center + dr, center + dc)
+             for dr in range(-radius, radius + 1) for dc in range(-radius, radius + 1)]
+    for cell in rng.sample(cells, moves):
+        board.play(*cell)
+
+
+def play_game(game_id, seed, settings):
+    """
+    下一盘自我对弈（在工作进程里执行）
+    :param settings: black_eval、white_eval、opening、time_budget、max_depth、node_limit
+    :return: (对局汇总dict, 每一手的元组列表)，随机开局的几手记为深度0、节点数0
+    """
+    rng = random.Random(seed * 1_000_003 + game_id)
+    evaluators = {BLACK: settings['black_eval'], WHITE: settings['white_eval']}
+    searchers = {color: Searcher(TT_SIZE, evaluator=name, book=_shared['book'], cache=_shared['cache'])
+                 for color, name in evaluators.items()}
+    board = GomokuBoard()
+    random_opening(board, rng, settings['opening'])
+    moves = [(game_id, ply, board.cells[index], *to_cell(index), 0, 0, 0.0, 0)
+             for ply, index in enumerate(board.moves)]
+
+    nodes = {BLACK: 0, WHITE: 0}
+    seconds = {BLACK: 0.0, WHITE: 0.0}
+    start = time.perf_counter()
+    while not board.is_over():
+        color = board.player
+        (row, col), info = searchers[color].best_move(
+            board, settings['time_budget'], settings['max_depth'], settings['node_limit'])
+        board.play(row, col)
+        nodes[color] += info['nodes']
+        seconds[color] += info['seconds']
+        moves.append((game_id, len(board.moves) - 1, color, row, col, info['depth'],
+                      info['nodes'], info['seconds'], info['score']))
+
+    game = {
+        'game': game_id, 'seed': seed,
+        'black_eval': evaluators[BLACK], 'white_eval': evaluators[WHITE],
+        'winner': COLOR_NAMES[board.winner], 'moves': len(board.moves),
+        'black_nodes': nodes[BLACK], 'white_nodes': nodes[WHITE],
+        'black_nps': round(nodes[BLACK] / seconds[BLACK]) if seconds[BLACK] else 0,
+        'white_nps': round(nodes[WHITE] / seconds[WHITE]) if seconds[WHITE] else 0,
+        'seconds': round(time.perf_counter() - start, 4),
+    }
+    return game, moves
+
+
+def game_settings(args, game_id):
+    """--swap 时奇数盘交换双方的评估函数"""
+    black_eval, white_eval = args.black_eval, args.white_eval
+    if args.swap and game_id % 2:
+        black_eval, white_eval = white_eval, black_eval
+    return {
+        'black_eval': black_eval, 'white_eval': white_eval, 'opening': args.opening,
+        'time_budget': args.time, 'max_depth': args.depth,
+        # 只给了--time时按时间限制，否则按节点数（默认NODE_LIMIT）
+        'node_limit': args.nodes if args.nodes is not None or args.time is not None else NODE_LIMIT,
+    }
+
+
+class CsvMoveLog:
+
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(MOVE_FIELDS)
+
+    def write(self, moves):
+        self.writer.writerows((*move[:7], f"{move[7]:.6f}", move[8]) for move in moves)
+
+    def close(self):
+        self.file.close()
+
+
+class BinaryMoveLog:
+    """文件头 'GMSP' + 版本号，之后每一手一条定长记录（MOVE_RECORD）"""
+
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.file.write(MOVE_LOG_MAGIC + struct.pack('<H', MOVE_LOG_VERSION))
+
+    def write(self, moves):
+        self.file.write(b''.join(MOVE_RECORD.pack(*move) for move in moves))
+
+    def close(self):
+        self.file.close()
+
+
+def read_move_log(path):
+    """逐条读出二进制走子记录，字段同MOVE_FIELDS"""
+    with open(path, 'rb') as f:
+        header = f.read(len(MOVE_LOG_MAGIC) + 2)
+        if header[:len(MOVE_LOG_MAGIC)] != MOVE_LOG_MAGIC:
+            raise ValueError(f"不是自我对弈走子记录: {path}")
+        version, = struct.unpack('<H', header[len(MOVE_LOG_MAGIC):])
+        if version != MOVE_LOG_VERSION:
+            raise ValueError(f"不支持的走子记录版本 {version}: {path}")
+        data = f.read()
+    yield from MOVE_RECORD.iter_unpack(data)
+
+
+def run_selfplay(args):
+    """按对局编号顺序写日志（executor.map保持顺序），返回对局汇总列表"""
+    games = []
+    game_ids = range(args.first_game, args.first_game + args.games)
+    settings = [game_settings(args, game_id) for game_id in game_ids]
+    move_log = (BinaryMoveLog(f"{args.out}.moves.bin") if args.binary
+                else CsvMoveLog(f"{args.out}.moves.csv"))
+    start = time.perf_counter()
+    with open(f"{args.out}.games.csv", 'w', newline='', encoding='utf-8') as games_file, \
+            ProcessPoolExecutor(args.workers, initializer=init_worker,
+                                initargs=(args.book, args.cache)) as executor:
+        writer = csv.DictWriter(games_file, GAME_FIELDS)
+        writer.writeheader()
+        try:
+            results = executor.map(play_game, game_ids, [args.seed] * len(settings), settings)
+            for game, moves in results:
+                writer.writerow(game)
+                move_log.write(moves)
+                games.append(game)
+                if len(games) % 10 == 0 or len(games) == args.games:
+                    print(f"已完成 {len(games)}/{args.games} 盘，{time.perf_counter() - start:.1f}s")
+        finally:
+            move_log.close()
+    return games, time.perf_counter() - start
+
+
+def print_summary(games, elapsed):
+    wins = {}
+    for game in games:
+        if game['winner'] == 'draw':
+            key = 'draw'
+        else:
+            key = game[f"{game['winner']}_eval"] + f"({game['winner']})"
+        wins[key] = wins.get(key, 0) + 1
+    moves = sum(game['moves'] for game in games)
+    nodes = sum(game['black_nodes'] + game['white_nodes'] for game in games)
+    search_seconds = sum(game['seconds'] for game in games)
+    print(f"\n共 {len(games)} 盘，耗时 {elapsed:.1f}s（{len(games) / elapsed:.2f} 盘/秒）")
+    print('胜负：' + '，'.join(f"{key} {count}" for key, count in sorted(wins.items())))
+    print(f"平均 {moves / len(games):.1f} 手/盘，每手 {search_seconds / moves * 1e3:.1f} ms，"
+          f"{nodes / search_seconds:.0f} 节点/秒（单进程）")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='五子棋AI自我对弈')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--first-game', type=int, default=0, help='起始对局编号（分批跑时接着编号）')
+    parser.add_argument('--workers', type=int, default=None, help='进程数，默认等于CPU核数')
+    parser.add_argument('--seed', type=int, default=0, help='随机开局的种子')
+    parser.add_argument('--opening', type=int, default=OPENING_MOVES, help='随机开局的手数')
+    parser.add_argument('--nodes', type=int, default=None,
+                        help=f'每步的搜索节点数上限，默认{NODE_LIMIT}')
+    parser.add_argument('--time', type=float, default=None,
+                        help='每步的思考时间（秒）；只给--time时不限节点数，结果不可复现')
+    parser.add_argument('--depth', type=int, default=MAX_DEPTH, help='最大搜索深度')
+    parser.add_argument('--black-eval', default='tuple', choices=('tuple', 'pattern'))
+    parser.add_argument('--white-eval', default='tuple', choices=('tuple', 'pattern'))
+    parser.add_argument('--swap', action='store_true', help='奇数盘交换双方的评估函数')
+    parser.add_argument('--binary', action='store_true', help='走子记录写成二进制 .moves.bin')
+    parser.add_argument('--out', default='selfplay', help='输出文件名前缀')
+    parser.add_argument('--book', help='开局库文件（见gomoku_book.py）')
+    parser.add_argument('--cache', help='只读的持久化搜索缓存文件')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    games, elapsed = run_selfplay(args)
+    print_summary(games, elapsed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+密码生成器启动时间测试
+
+每次测量都启动一个新的Python进程（冷启动），取多次运行的中位数：
+    import   导入main模块的耗时，并列出tkinter本身的导入耗时作对比
+    first    从进程启动到生成第一个密码的总时间（不创建窗口）
+    ui       从进程启动到窗口创建完成的总时间（需要图形界面，没有DISPLAY时跳过）
+
+用法：python bench_startup.py [import|first|ui|all] [--runs 20]
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# 在子进程里执行的代码；IMPORT_*打印导入语句本身的秒数
+IMPORT_MAIN = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+IMPORT_TK = ("import time; t = time.perf_counter(); import tkinter, tkinter.messagebox; "
+             "print(time.perf_counter() - t)")
+FIRST_PASSWORD = "import main; main.password_core.generate_password()"
+UI_READY = ("import tkinter as tk, main; root = tk.Tk(); main.PasswordApp(root); "
+            "root.update(); root.destroy()")
+
+
+def run_python(code):
+    """在项目目录下用新进程执行code，返回(标准输出, 墙钟时间)"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', code], cwd=HERE, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    return result.stdout, elapsed
+
+
+def median_ms(values):
+    return statistics.median(values) * 1e3
+
+
+def bench_import(runs):
+    main_times = [float(run_python(IMPORT_MAIN)[0]) for _ in range(runs)]
+    tk_times = [float(run_python(IMPORT_TK)[0]) for _ in range(runs)]
+    print(f"import main:    {median_ms(main_times):7.2f} ms")
+    print(f"import tkinter: {median_ms(tk_times):7.2f} ms（main导入时不再需要）")
+
+    # -X importtime 列出main导入的所有模块，确认没有tkinter和pyperclip
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                            cwd=HERE, capture_output=True, text=True).stderr
+    modules = {line.rsplit('|', 1)[-1].strip() for line in stderr.splitlines()[1:]}
+    heavy = sorted(name for name in modules if name.split('.')[0] in ('tkinter', '_tkinter', 'pyperclip'))
+    print(f"导入main时加载的模块：{len(modules)} 个，界面相关：{', '.join(heavy) or '无'}")
+
+
+def bench_first(runs):
+    baseline = [run_python('pass')[1] for _ in range(runs)]
+    first = [run_python(FIRST_PASSWORD)[1] for _ in range(runs)]
+    print(f"空解释器启动:    {median_ms(baseline):7.2f} ms")
+    print(f"到第一个密码:    {median_ms(first):7.2f} ms"
+          f"（比空解释器多 {median_ms(first) - median_ms(baseline):.2f} ms）")
+
+
+def bench_ui(runs):
+    if os.name != 'nt' and sys.platform != 'darwin' and not os.environ.get('DISPLAY'):
+        print("没有DISPLAY，跳过窗口启动测试")
+        return
+    times = [run_python(UI_READY)[1] for _ in range(runs)]
+    print(f"到窗口显示:      {median_ms(times):7.2f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='密码生成器启动时间测试')
+    parser.add_argument('mode', nargs='?', default='all', choices=('import', 'first', 'ui', 'all'))
+    parser.add_argument('--runs', type=int, default=20, help='每项测量的次数（取中位数）')
+    args = parser.parse_args(argv)
+
+    if args.mode in ('import', 'all'):
+        bench_import(args.runs)
+    if args.mode in ('first', 'all'):
+        bench_first(args.runs)
+    if args.mode in ('ui', 'all'):
+        bench_ui(args.runs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""
+离线泄露密码筛查（布隆过滤器，mmap）
+
+从本地的泄露密码列表生成一个布隆过滤器文件，生成密码时检查是否在列表里，不需要联网。
+文件用mmap只读打开：打开时间与文件大小无关，只有查询时碰到的页才会读进内存，
+默认误判率0.1%时每条记录约14.4位（5亿条约860MB），查询时也只占很少的常驻内存。
+
+文件格式：文件头 'PWBF' + 版本 + 哈希函数个数 + 位数 + 记录数，之后是位数组。
+每条记录取密码（UTF-8）的SHA-1，前16字节拆成两个64位整数h1、h2，
+第i个位置为 (h1 + i*h2) % 位数。泄露列表既可以是每行一个明文密码，
+也可以是每行一个SHA-1十六进制（如 Have I Been Pwned 的 "哈希:次数" 格式，用 --sha1）。
+
+布隆过滤器没有漏判，只有少量误判：误判的密码会被多换一次，对生成结果没有影响。
+
+用法：
+    python breach_filter.py build 泄露列表.txt [--sha1] [--out breached.bloom] [--error-rate 0.001]
+    python breach_filter.py check 密码 [...]
+    python breach_filter.py bench [--count 100000]
+"""
+
+import os
+import sys
+import math
+import mmap
+import time
+import struct
+import hashlib
+import argparse
+
+
+FILTER_PATH = 'breached.bloom'
+ERROR_RATE = 0.001
+
+FILTER_MAGIC = b'PWBF'
+FILTER_HEADER = struct.Struct('<4sHHQQ') # 标识、版本、哈希函数个数、位数、记录数
+FILTER_VERSION = 1
+KEY = struct.Struct('<QQ') # SHA-1的前16字节
+LN2 = 0.6931471805599453
+
+
+def filter_size(count, error_rate=ERROR_RATE):
+    """count条记录、误判率error_rate时的 (位数, 哈希函数个数)"""
+    count = max(count, 1)
+    bits = max(64, math.ceil(-count * math.log(error_rate) / (LN2 * LN2)))
+    hashes = max(1, round(bits / count * LN2))
+    return bits, hashes
+
+
+def entry_digest(line, sha1=False):
+    """泄露列表里一行对应的SHA-1摘要，空行返回None"""
+    line = line.rstrip(b'\r\n')
+    if not line:
+        return None
+    if sha1:
+        return bytes.fromhex(line.split(b':', 1)[0].strip().decode('ascii'))
+    return hashlib.sha1(line).digest()
+
+
+def count_lines(path, block=1 << 20):
+    count = 0
+    with open(path, 'rb') as f:
+        while chunk := f.read(block):
+            count += chunk.count(b'\n')
+    return count
+
+
+def build_filter(source, path=FILTER_PATH, expected=None, error_rate=ERROR_RATE, sha1=False):
+    """
+    从泄露列表source生成过滤器文件path
+    位数组直接写在mmap里，构建时不需要把整个位数组放进进程内存
+    :param expected: 预计的记录数，默认先数一遍行数
+    :return: 写入的记录数
+    """
+    if expected is None:
+        expected = count_lines(source)
+    bits, hashes = filter_size(expected, error_rate)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(FILTER_HEADER.pack(FILTER_MAGIC, FILTER_VERSION, hashes, bits, 0))
+        f.truncate(FILTER_HEADER.size + (bits + 7) // 8)
+
+    count = 0
+    start = time.perf_counter()
+    offset = FILTER_HEADER.size
+    with open(tmp_path, 'r+b') as f, mmap.mmap(f.fileno(), 0) as mm, open(source, 'rb') as src:
+        for line in src:
+            digest = entry_digest(line, sha1)
+            if digest is None:
+                continue
+            h1, h2 = KEY.unpack_from(digest)
+            h2 |= 1
+            for i in range(hashes):
+                bit = (h1 + i * h2) % bits
+                mm[offset + (bit >> 3)] |= 1 << (bit & 7)
+            count += 1
+            if count % 10_000_000 == 0:
+                print(f"已写入 {count:,}/{expected:,} 条，{time.perf_counter() - start:.0f}s")
+        FILTER_HEADER.pack_into(mm, 0, FILTER_MAGIC, FILTER_VERSION, hashes, bits, count)
+        mm.flush()
+    os.replace(tmp_path, path)
+    return count
+
+
+class BreachFilter:
+    """只读的布隆过滤器，password in filter 判断密码是否（可能）泄露过"""
+
+    def __init__(self, path=FILTER_PATH):
+        """文件头或大小不对时抛出ValueError"""
+        self.path = path
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < FILTER_HEADER.size:
+                raise ValueError(f"过滤器文件不完整: {path}")
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.hashes, self.bits, self.count = FILTER_HEADER.unpack_from(self.mm)
+        if magic != FILTER_MAGIC or version != FILTER_VERSION:
+            self.mm.close()
+            raise ValueError(f"不是泄露密码过滤器文件或版本不对: {path}")
+        if not self.hashes or not self.bits or len(self.mm) < FILTER_HEADER.size + (self.bits + 7) // 8:
+            self.mm.close()
+            raise ValueError(f"过滤器文件不完整: {path}")
+
+    @classmethod
+    def open_if_exists(cls, path=FILTER_PATH):
+        return cls(path) if path and os.path.exists(path) else None
+
+    def contains_digest(self, digest):
+        h1, h2 = KEY.unpack_from(digest)
+        h2 |= 1
+        mm, bits, offset = self.mm, self.bits, FILTER_HEADER.size
+        for i in range(self.hashes):
+            bit = (h1 + i * h2) % bits
+            if not mm[offset + (bit >> 3)] >> (bit & 7) & 1:
+                return False
+        return True
+
+    def __contains__(self, password):
+        return self.contains_digest(hashlib.sha1(password.encode('utf-8')).digest())
+
+    def close(self):
+        self.mm.close()
+
+
+def bench(path, count):
+    """随机密码的查询延迟和进程常驻内存"""
+    import password_core
+    breach = BreachFilter(path)
+    passwords = password_core.PasswordGenerator(password_core.build_charset()).batch(count)
+    start = time.perf_counter()
+    hits = sum(password in breach for password in passwords)
+    elapsed = time.perf_counter() - start
+    print(f"{path}: {breach.count:,} 条记录，{breach.bits / 8 / 2**20:.1f} MB，{breach.hashes} 个哈希函数")
+    print(f"查询 {count:,} 次，每次 {elapsed / count * 1e6:.2f} µs，命中 {hits}")
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"进程最大常驻内存 {rss / 1024:.1f} MB")
+    except ImportError:
+        pass # Windows没有resource模块
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='离线泄露密码筛查')
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build', help='从泄露列表生成过滤器')
+    build.add_argument('source', help='泄露列表，每行一个密码（或SHA-1，见--sha1）')
+    build.add_argument('--out', default=FILTER_PATH)
+    build.add_argument('--sha1', action='store_true', help='每行是SHA-1十六进制，可带 ":次数"')
+    build.add_argument('--expected', type=int, default=None, help='预计记录数，默认先数一遍行数')
+    build.add_argument('--error-rate', type=float, default=ERROR_RATE, help='误判率')
+    check = sub.add_parser('check', help='检查密码是否在泄露列表里')
+    check.add_argument('passwords', nargs='+')
+    check.add_argument('--filter', default=FILTER_PATH)
+    bench_parser = sub.add_parser('bench', help='测量查询延迟')
+    bench_parser.add_argument('--filter', default=FILTER_PATH)
+    bench_parser.add_argument('--count', type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        count = build_filter(args.source, args.out, args.expected, args.error_rate, args.sha1)
+        print(f"过滤器已保存到文件: {args.out}（{count:,} 条，{time.perf_counter() - start:.1f}s）")
+    elif args.command == 'check':
+        breach = BreachFilter(args.filter)
+        for password in args.passwords:
+            print(f"{password}: {'已泄露' if password in breach else '未发现'}")
+    else:
+        bench(args.filter, args.count)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
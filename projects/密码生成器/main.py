@@ -1,77 +1,142 @@
-import tkinter as tk
-from tkinter import messagebox
-import random
-import string
-import pyperclip  # 需要安装 pip install pyperclip
-
-def generate_password():
-    """生成密码并显示到界面"""
-    try:
-        length = int(length_var.get())
-    except ValueError:
-        messagebox.showerror("输入错误", "密码长度必须是整数！")
-        return
-
-    # 构造字符集
-    char_set = ''
-    if var_digits.get():
-        char_set += string.digits
-    if var_upper.get():
-        char_set += string.ascii_uppercase
-    if var_lower.get():
-        char_set += string.ascii_lowercase
-    if var_symbols.get():
-        char_set += string.punctuation
-
-    if not char_set:
-        messagebox.showwarning("未选择字符类型", "请至少勾选一种字符类型！")
-        return
-
-    # 生成密码
-    password = ''.join(random.choice(char_set) for _ in range(length))
-    password_var.set(password)
-
-def copy_to_clipboard():
-    """复制密码到剪贴板"""
-    pwd = password_var.get()
-    if pwd:
-        pyperclip.copy(pwd)
-        messagebox.showinfo("已复制", "密码已复制到剪贴板。")
+"""
+密码生成器界面
+
+导入本模块不会创建窗口：tkinter在创建PasswordApp时才导入，
+pyperclip在第一次复制时才导入（没有安装时使用Tk自带的剪贴板）。
+生成逻辑在password_core里，可以单独使用。
+当前目录下有泄露密码过滤器 breached.bloom（见breach_filter.py）时，命中的密码自动重新生成。
+"""
+
+import password_core
+
+_pyperclip = None  # 第一次复制时导入，导入失败时为False
+_screen = None  # 第一次生成时打开泄露密码过滤器，文件不存在时为False
+
+
+def breach_screen():
+    """
+    泄露密码过滤器，没有过滤器文件时返回None
+    过滤器文件损坏时抛出ValueError（只在第一次），之后不再筛查
+    """
+    global _screen
+    if _screen is None:
+        import breach_filter
+        _screen = False  # 打开失败时不再重试
+        _screen = breach_filter.BreachFilter.open_if_exists() or False
+    return _screen or None
+
+
+def copy_text(text, root=None):
+    """复制到剪贴板"""
+    global _pyperclip
+    if _pyperclip is None:
+        try:
+            import pyperclip  # 需要安装 pip install pyperclip
+            _pyperclip = pyperclip
+        except ImportError:
+            _pyperclip = False
+    if _pyperclip:
+        _pyperclip.copy(text)
+    elif root is not None:
+        root.clipboard_clear()
+        root.clipboard_append(text)
     else:
-        messagebox.showwarning("无密码", "请先生成密码。")
-
-# 创建主窗口
-root = tk.Tk()
-root.title("密码生成器")
-root.geometry("800x600")
-root.resizable(False, False)
-root.configure(bg="#e6f3ff")  # 设置窗口背景色为浅灰色
-
-# 密码长度
-tk.Label(root, text="密码长度：").pack(pady=5)
-length_var = tk.StringVar(value="12")
-tk.Entry(root, textvariable=length_var, width=10, justify='center').pack()
-
-# 字符类型勾选
-var_digits = tk.BooleanVar(value=True)
-var_upper = tk.BooleanVar(value=True)
-var_lower = tk.BooleanVar(value=True)
-var_symbols = tk.BooleanVar(value=False)
-
-tk.Checkbutton(root, text="包含数字", variable=var_digits).pack(anchor='w', padx=80)
-tk.Checkbutton(root, text="包含大写字母", variable=var_upper).pack(anchor='w', padx=80)
-tk.Checkbutton(root, text="包含小写字母", variable=var_lower).pack(anchor='w', padx=80)
-tk.Checkbutton(root, text="包含特殊符号", variable=var_symbols).pack(anchor='w', padx=80)
-
-# 生成按钮
-tk.Button(root, text="生成密码", command=generate_password).pack(pady=5)
-
-# 显示密码
-password_var = tk.StringVar()
-tk.Entry(root, textvariable=password_var, font=("Consolas", 12), justify='center', state='readonly').pack(pady=5)
-
-# 复制按钮
-tk.Button(root, text="复制到剪贴板", command=copy_to_clipboard).pack(pady=5)
-
-# 启动主循环
-root.mainloop()
+        raise RuntimeError("没有可用的剪贴板（请安装 pyperclip）")
+
+
+class PasswordApp:
+
+    def __init__(self, root):
+        import tkinter as tk
+        from tkinter import messagebox
+        self.messagebox = messagebox
+        self.root = root
+
+        # 主窗口
+        root.title("密码生成器")
+        root.geometry("800x600")
+        root.resizable(False, False)
+        root.configure(bg="#e6f3ff")  # 设置窗口背景色为浅灰色
+
+        # 密码长度
+        tk.Label(root, text="密码长度：").pack(pady=5)
+        self.length_var = tk.StringVar(value=str(password_core.DEFAULT_LENGTH))
+        tk.Entry(root, textvariable=self.length_var, width=10, justify='center').pack()
+
+        # 字符类型勾选
+        self.var_digits = tk.BooleanVar(value=True)
+        self.var_upper = tk.BooleanVar(value=True)
+        self.var_lower = tk.BooleanVar(value=True)
+        self.var_symbols = tk.BooleanVar(value=False)
+
+        tk.Checkbutton(root, text="包含数字", variable=self.var_digits).pack(anchor='w', padx=80)
+        tk.Checkbutton(root, text="包含大写字母", variable=self.var_upper).pack(anchor='w', padx=80)
+        tk.Checkbutton(root, text="包含小写字母", variable=self.var_lower).pack(anchor='w', padx=80)
+        tk.Checkbutton(root, text="包含特殊符号", variable=self.var_symbols).pack(anchor='w', padx=80)
+
+        # 生成按钮
+        tk.Button(root, text="生成密码", command=self.generate_password).pack(pady=5)
+
+        # 显示密码
+        self.password_var = tk.StringVar()
+        tk.Entry(root, textvariable=self.password_var, font=("Consolas", 12), justify='center',
+                 state='readonly').pack(pady=5)
+
+        # 复制按钮
+        tk.Button(root, text="复制到剪贴板", command=self.copy_to_clipboard).pack(pady=5)
+
+    def generate_password(self):
+        """生成密码并显示到界面"""
+        messagebox = self.messagebox
+        try:
+            length = int(self.length_var.get())
+        except ValueError:
+            messagebox.showerror("输入错误", "密码长度必须是整数！")
+            return
+
+        # 构造字符集
+        try:
+            char_set = password_core.build_charset(self.var_digits.get(), self.var_upper.get(),
+                                                   self.var_lower.get(), self.var_symbols.get())
+        except ValueError:
+            messagebox.showwarning("未选择字符类型", "请至少勾选一种字符类型！")
+            return
+
+        # 过滤器文件损坏时提示一次，之后生成的密码不做泄露筛查
+        try:
+            screen = breach_screen()
+        except (OSError, ValueError) as e:
+            messagebox.showwarning("泄露密码过滤器无效", f"{e}\n生成的密码将不做泄露筛查。")
+            screen = None
+
+        # 生成密码（系统安全随机数，无偏差；命中泄露列表的自动重新生成）
+        try:
+            password = password_core.generate_password(length, char_set, screen)
+        except ValueError:
+            messagebox.showerror("输入错误", "密码长度必须大于0！")
+            return
+        except password_core.BreachedError as e:
+            messagebox.showerror("密码太弱", str(e))
+            return
+        self.password_var.set(password)
+
+    def copy_to_clipboard(self):
+        """复制密码到剪贴板"""
+        pwd = self.password_var.get()
+        if pwd:
+            copy_text(pwd, self.root)
+            self.messagebox.showinfo("已复制", "密码已复制到剪贴板。")
+        else:
+            self.messagebox.showwarning("无密码", "请先生成密码。")
+
+
+def main():
+    import tkinter as tk
+    root = tk.Tk()
+    PasswordApp(root)
+    # 启动主循环
+    root.mainloop()
+
+
+if __name__ == '__main__':
+    main()
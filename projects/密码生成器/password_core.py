@@ -0,0 +1,179 @@
+"""
+密码生成核心（不依赖tkinter，可以单独导入和批量调用）
+
+随机字节按块从 os.urandom（与 secrets 相同的系统CSPRNG）取得，再用拒绝采样映射到字符集：
+字符集有n个字符时，只接受小于 256 - 256 % n 的字节，取 字节 % n，每个字符出现的概率完全相同。
+映射和拒绝都由一次 bytes.translate(table, delete) 在C里完成，不需要逐字节的Python循环。
+
+给了泄露密码过滤器（breach_filter.py）时，落在泄露列表里的密码自动重新生成。
+
+用法：
+    python password_core.py -n 1000000 -l 16 [--no-digits] [--no-upper] [--no-lower] [--symbols]
+        [-o passwords.txt] [--breach-filter breached.bloom]
+密码按行写到文件或标准输出，生成速度（个/秒）打印到标准错误。
+"""
+
+import os
+import sys
+import time
+
+
+DEFAULT_LENGTH = 12
+BUFFER_PASSWORDS = 4096 # 批量生成时每块的密码数
+MAX_REGENERATE = 1000 # 连续这么多次都命中泄露列表时放弃
+
+# 与string模块里的常量相同；string会导入re，界面启动时不需要
+DIGITS = '0123456789'
+ASCII_UPPERCASE = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+ASCII_LOWERCASE = 'abcdefghijklmnopqrstuvwxyz'
+PUNCTUATION = r"""!"#$%&'()*+,-./:;<=>?@[\]^_`{|}~"""
+
+
+def build_charset(digits=True, upper=True, lower=True, symbols=False):
+    """按勾选的字符类型拼出字符集，一种都没选时抛出ValueError"""
+    char_set = ''
+    if digits:
+        char_set += DIGITS
+    if upper:
+        char_set += ASCII_UPPERCASE
+    if lower:
+        char_set += ASCII_LOWERCASE
+    if symbols:
+        char_set += PUNCTUATION
+    if not char_set:
+        raise ValueError("请至少选择一种字符类型")
+    return char_set
+
+
+class BreachedError(RuntimeError):
+    """连续生成的密码都在泄露列表里（长度太短或字符集太小）"""
+
+
+class PasswordGenerator:
+    """
+    按固定的字符集和长度批量生成密码
+    :param screen: 泄露密码过滤器，支持 password in screen；None表示不筛查
+    """
+
+    def __init__(self, char_set, length=DEFAULT_LENGTH, screen=None):
+        if length < 1:
+            raise ValueError("密码长度必须大于0")
+        if not char_set or len(char_set) > 256 or not char_set.isascii():
+            raise ValueError("字符集必须是1到256个ASCII字符")
+        self.char_set = char_set
+        self.length = length
+        n = len(char_set)
+        self.limit = 256 - 256 % n # 不小于limit的字节被拒绝，保证没有偏差
+        encoded = char_set.encode('ascii')
+        self.table = bytes(encoded[b % n] for b in range(256))
+        self.rejected = bytes(range(self.limit, 256))
+        self.screen = screen
+        self.regenerated = 0 # 因命中泄露列表而重新生成的次数
+
+    def random_chars(self, count):
+        """count个字符集里的字符（bytes）"""
+        chunks = []
+        have = 0
+        while have < count:
+            # 按接受率多取一些字节，通常一次就够
+            want = (count - have) * 256 // self.limit + 64
+            chunk = os.urandom(want).translate(self.table, self.rejected)
+            chunks.append(chunk)
+            have += len(chunk)
+        return b''.join(chunks)[:count]
+
+    def generate(self):
+        """一个密码"""
+        password = self.random_chars(self.length).decode('ascii')
+        if self.screen is not None:
+            password = self._regenerate(password)
+        return password
+
+    def _regenerate(self, password):
+        """password命中泄露列表时换一个，直到不命中"""
+        for _ in range(MAX_REGENERATE):
+            if password not in self.screen:
+                return password
+            self.regenerated += 1
+            password = self.random_chars(self.length).decode('ascii')
+        raise BreachedError(f"连续{MAX_REGENERATE}个密码都在泄露列表里，请增加长度或字符类型")
+
+    def batch(self, count):
+        """count个密码的列表"""
+        data = self.random_chars(count * self.length).decode('ascii')
+        length = self.length
+        passwords = [data[i:i + length] for i in range(0, len(data), length)]
+        screen = self.screen
+        if screen is not None:
+            for i, password in enumerate(passwords):
+                if password in screen:
+                    passwords[i] = self._regenerate(password)
+        return passwords
+
+    def iter_batches(self, count, batch_size=BUFFER_PASSWORDS):
+        """分块生成共count个密码，每次产出一个列表，内存占用与count无关"""
+        while count > 0:
+            size = min(batch_size, count)
+            yield self.batch(size)
+            count -= size
+
+    def write(self, count, out, batch_size=BUFFER_PASSWORDS):
+        """把count个密码逐行写到文本流out"""
+        for passwords in self.iter_batches(count, batch_size):
+            out.write('\n'.join(passwords))
+            out.write('\n')
+
+
+def generate_password(length=DEFAULT_LENGTH, char_set=None, screen=None):
+    """生成一个密码，char_set默认为数字和大小写字母"""
+    return PasswordGenerator(char_set or build_charset(), length, screen).generate()
+
+
+def parse_args(argv=None):
+    import argparse # 只有命令行用到
+    parser = argparse.ArgumentParser(description='批量生成密码')
+    parser.add_argument('-n', '--count', type=int, default=1, help='生成的密码个数')
+    parser.add_argument('-l', '--length', type=int, default=DEFAULT_LENGTH, help='密码长度')
+    parser.add_argument('--no-digits', action='store_true', help='不包含数字')
+    parser.add_argument('--no-upper', action='store_true', help='不包含大写字母')
+    parser.add_argument('--no-lower', action='store_true', help='不包含小写字母')
+    parser.add_argument('--symbols', action='store_true', help='包含特殊符号')
+    parser.add_argument('-o', '--output', help='输出文件，默认标准输出')
+    parser.add_argument('--breach-filter', help='泄露密码过滤器文件（见breach_filter.py），命中的密码重新生成')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        char_set = build_charset(not args.no_digits, not args.no_upper, not args.no_lower, args.symbols)
+        screen = None
+        if args.breach_filter:
+            import breach_filter
+            screen = breach_filter.BreachFilter(args.breach_filter)
+        generator = PasswordGenerator(char_set, args.length, screen)
+    except (ValueError, OSError) as e:
+        print(f"参数错误: {e}", file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    try:
+        if args.output:
+            with open(args.output, 'w', encoding='ascii', newline='\n') as f:
+                generator.write(args.count, f)
+        else:
+            generator.write(args.count, sys.stdout)
+            sys.stdout.flush()
+    except BreachedError as e:
+        print(e, file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    print(f"生成 {args.count} 个密码，耗时 {elapsed:.3f}s，{args.count / elapsed:,.0f} 个/秒",
+          file=sys.stderr)
+    if screen is not None:
+        print(f"命中泄露列表重新生成 {generator.regenerated} 个", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+"""
+画图工具性能测试：回放鼠标事件流
+
+    record  打开画图工具，把画布上的鼠标按下/拖动/松开事件记录到文件
+    replay  把事件流回放给SimpleDrawingApp，统计画布对象数和每个事件的耗时；
+            --segments 按旧的方式（每次拖动一条两点线段）回放作对比
+    memory  把事件流里的笔画（简化后）存进文档模型，测量每个点占用的内存和撤销/重做的耗时
+            （不需要图形界面）
+    file    把笔画存成.sdraw文件再读回，测量保存、解析、打开的速度并检查内容一致（不需要图形界面）
+    export  把笔画按块导出成放大的PNG，测量速度和进程峰值内存（不需要图形界面，需要Pillow）
+
+事件文件每行一个事件："press|motion|release x y"。没有给文件时回放随机生成的笔画（固定种子）。
+record和replay需要图形界面（Tk不能在没有DISPLAY的环境下创建窗口），tkinter只在这两个子命令里导入。
+
+用法：
+    python bench_drawing.py record events.txt
+    python bench_drawing.py replay [events.txt] [--strokes 200] [--points 300] [--segments]
+        [--tool pen|line|rectangle|oval]
+    python bench_drawing.py memory [events.txt] [--strokes 2000] [--points 300]
+    python bench_drawing.py file [events.txt] [--strokes 20000] [--out bench.sdraw]
+    python bench_drawing.py export [events.txt] [--scale 10] [--tile-height 256] [--out bench.png]
+"""
+
+import os
+import sys
+import math
+import time
+import random
+import tracemalloc
+import argparse
+from types import SimpleNamespace
+
+import drawing_file
+from drawing_document import Document, simplify
+
+
+FRAME_EVENTS = 16  # 每回放这么多个事件刷新一次画面，相当于一帧里处理的鼠标事件
+
+
+def read_events(path):
+    events = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            kind, x, y = line.split()
+            events.append((kind, int(x), int(y)))
+    return events
+
+
+def random_events(strokes, points, seed=0, width=800, height=600):
+    """strokes笔平滑的随机曲线，每笔points个拖动事件"""
+    rng = random.Random(seed)
+    events = []
+    for _ in range(strokes):
+        x, y = rng.uniform(0, width), rng.uniform(0, height)
+        heading = rng.uniform(0, 2 * math.pi)
+        events.append(('press', round(x), round(y)))
+        for _ in range(points):
+            heading += rng.gauss(0, 0.2)
+            x = min(max(x + 3 * math.cos(heading), 0), width)
+            y = min(max(y + 3 * math.sin(heading), 0), height)
+            events.append(('motion', round(x), round(y)))
+        events.append(('release', round(x), round(y)))
+    return events
+
+
+def record(path):
+    import tkinter as tk
+    from main import SimpleDrawingApp
+    root = tk.Tk()
+    app = SimpleDrawingApp(root)
+    out = open(path, 'w', encoding='utf-8')
+    for sequence, kind in (("<Button-1>", 'press'), ("<B1-Motion>", 'motion'),
+                           ("<ButtonRelease-1>", 'release')):
+        app.canvas.bind(sequence, lambda e, k=kind: out.write(f"{k} {e.x} {e.y}\n"), add='+')
+    root.mainloop()
+    out.close()
+    print(f"事件已保存到文件: {path}")
+
+
+def replay_app(app, events):
+    handlers = {'press': app.start_drawing, 'motion': app.draw, 'release': app.stop_drawing}
+    for n, (kind, x, y) in enumerate(events, 1):
+        handlers[kind](SimpleNamespace(x=x, y=y))
+        if n % FRAME_EVENTS == 0:
+            app.root.update()
+
+
+def replay_segments(app, events):
+    """旧的画笔：每次拖动创建一条两点线段"""
+    canvas = app.canvas
+    prev = None
+    for n, (kind, x, y) in enumerate(events, 1):
+        if kind == 'motion' and prev:
+            canvas.create_line(*prev, x, y, fill=app.current_color, width=app.line_width,
+                               capstyle='round', joinstyle='round')
+        prev = (x, y) if kind != 'release' else None
+        if n % FRAME_EVENTS == 0:
+            app.root.update()
+
+
+def replay(events, segments=False, tool="pen"):
+    import tkinter as tk
+    from main import SimpleDrawingApp
+    root = tk.Tk()
+    app = SimpleDrawingApp(root)
+    app.select_tool(tool)
+    root.update()
+
+    start = time.perf_counter()
+    (replay_segments if segments else replay_app)(app, events)
+    root.update()
+    elapsed = time.perf_counter() - start
+
+    items = app.canvas.find_all()
+    points = sum(len(app.canvas.coords(item)) // 2 for item in items)
+    start = time.perf_counter()
+    app.canvas.event_generate('<Expose>')
+    root.update()
+    redraw = time.perf_counter() - start
+    start = time.perf_counter()
+    if segments:
+        # 旧方式的线段直接画在画布上，不在文档里，按旧的清空方式删除
+        app.canvas.delete("all")
+    else:
+        app.clear_canvas()
+    root.update()
+    clear = time.perf_counter() - start
+    root.destroy()
+
+    strokes = sum(kind == 'press' for kind, _, _ in events)
+    print(f"{'旧方式（逐段）' if segments else tool}：{len(events)} 个事件，{strokes} 笔")
+    print(f"  每个事件 {elapsed / len(events) * 1e6:.1f} µs，共 {elapsed:.3f}s")
+    print(f"  画布对象 {len(items)} 个，共 {points} 个点")
+    print(f"  重绘 {redraw * 1e3:.1f} ms，清空 {clear * 1e3:.1f} ms")
+
+
+def event_strokes(events):
+    """事件流里每一笔简化后的扁平坐标列表（和画笔工具松开鼠标时得到的相同）"""
+    strokes = []
+    points = []
+    for kind, x, y in events:
+        if kind == 'press':
+            points = [x, y]
+        elif kind == 'motion' and (x, y) != tuple(points[-2:]):
+            points += (x, y)
+        elif kind == 'release' and len(points) >= 4:
+            strokes.append(simplify(points))
+    return strokes
+
+
+def traced_bytes(build):
+    """build()返回的对象新分配的内存（字节）"""
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def build_document(strokes):
+    document = Document()
+    for points in strokes:
+        document.add("pen", points, "black", 2)
+    return document
+
+
+def bench_memory(events):
+    strokes = event_strokes(events)
+    raw_points = sum(kind == 'motion' for kind, _, _ in events)
+    document, document_bytes = traced_bytes(lambda: build_document(strokes))
+    _, tuple_bytes = traced_bytes(
+        lambda: [[(points[i], points[i + 1]) for i in range(0, len(points), 2)] for points in strokes])
+    points = document.point_count
+    print(f"{len(strokes)} 笔，拖动事件 {raw_points} 个，简化后 {points} 个点")
+    print(f"  文档模型：{document_bytes / points:.1f} 字节/点（数组 {document.nbytes() / points:.1f} 字节/点），"
+          f"共 {document_bytes / 2**20:.2f} MB")
+    print(f"  对比 每笔一个元组列表：{tuple_bytes / points:.1f} 字节/点")
+
+    steps = document.cursor
+    start = time.perf_counter()
+    while document.undo():
+        pass
+    while document.redo():
+        pass
+    elapsed = time.perf_counter() - start
+    print(f"  撤销+重做 {steps} 步，每步 {elapsed / (2 * steps) * 1e6:.2f} µs")
+
+
+def timed(function, repeat):
+    """function()的最短耗时（秒）和最后一次的返回值"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_file(events, path, repeat=5):
+    document = build_document(event_strokes(events))
+    save_time, _ = timed(lambda: drawing_file.save(document, path), repeat)
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    parse_time, parsed = timed(lambda: drawing_file.DrawingFile(data), repeat)
+    load_time, loaded = timed(lambda: drawing_file.load(path), repeat)
+
+    same = (loaded.coords == document.coords and loaded.starts == document.starts
+            and loaded.kinds == document.kinds and loaded.styles == document.styles
+            and loaded.style_table == document.style_table and len(parsed) == len(document))
+    mb = size / 2**20
+    print(f"{len(document)} 个图形，{document.point_count} 个点，文件 {mb:.2f} MB"
+          f"（{size / document.point_count:.1f} 字节/点）")
+    print(f"  保存 {save_time * 1e3:.2f} ms（{mb / save_time:.0f} MB/s）")
+    print(f"  解析 {parse_time * 1e3:.2f} ms（memoryview，不复制坐标；逐个图形检查种类、样式和坐标个数）")
+    print(f"  打开 {load_time * 1e3:.2f} ms（读文件+复制成Document，{mb / load_time:.0f} MB/s）")
+    print(f"  读回内容{'一致' if same else '不一致！'}")
+    os.remove(path)
+    return same
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None # Windows没有resource模块
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_export(events, path, scale, tile_height):
+    import drawing_export
+    document = build_document(event_strokes(events))
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    width, height = drawing_export.export_png(document, path, 800, 600, scale, tile_height)
+    elapsed = time.perf_counter() - start
+    after = peak_rss_mb()
+
+    megapixels = width * height / 1e6
+    print(f"{len(document)} 个图形导出 {width}x{height}（{megapixels:.1f} MP），每块 {tile_height} 行")
+    print(f"  耗时 {elapsed:.2f}s（{megapixels / elapsed:.1f} MP/s），PNG {os.path.getsize(path) / 2**20:.2f} MB")
+    print(f"  整张图在内存里要 {width * height * 3 / 2**20:.0f} MB，每块 {width * tile_height * 3 / 2**20:.1f} MB")
+    if after is not None:
+        print(f"  进程峰值常驻内存 {after:.0f} MB（导出前 {before:.0f} MB）")
+
+
+def add_event_arguments(parser, strokes):
+    """回放类子命令共用的事件来源参数"""
+    parser.add_argument('path', nargs='?', help='事件文件，默认随机生成')
+    parser.add_argument('--strokes', type=int, default=strokes, help='随机生成的笔画数')
+    parser.add_argument('--points', type=int, default=300, help='每笔的拖动事件数')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def load_events(args):
+    return read_events(args.path) if args.path else random_events(args.strokes, args.points, args.seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='画图工具事件回放测试')
+    sub = parser.add_subparsers(dest='command', required=True)
+    record_parser = sub.add_parser('record', help='记录鼠标事件')
+    record_parser.add_argument('path')
+    replay_parser = sub.add_parser('replay', help='回放事件并计时')
+    add_event_arguments(replay_parser, strokes=200)
+    replay_parser.add_argument('--segments', action='store_true', help='按旧的逐段方式回放作对比')
+    replay_parser.add_argument('--tool', default='pen', choices=('pen', 'line', 'rectangle', 'oval'))
+    memory_parser = sub.add_parser('memory', help='文档模型每个点的内存（不需要图形界面）')
+    add_event_arguments(memory_parser, strokes=2000)
+    file_parser = sub.add_parser('file', help='.sdraw保存/打开的速度（不需要图形界面）')
+    add_event_arguments(file_parser, strokes=20000)
+    file_parser.add_argument('--out', default='bench.sdraw', help='临时文件，测完删除')
+    export_parser = sub.add_parser('export', help='按块导出PNG（不需要图形界面）')
+    add_event_arguments(export_parser, strokes=200)
+    export_parser.add_argument('--scale', type=float, default=10, help='放大倍数（画布800x600）')
+    export_parser.add_argument('--tile-height', type=int, default=256, help='每块的行数')
+    export_parser.add_argument('--out', default='bench.png')
+    args = parser.parse_args(argv)
+
+    if args.command in ('record', 'replay'):
+        import tkinter as tk
+        try:
+            if args.command == 'record':
+                record(args.path)
+            else:
+                replay(load_events(args), args.segments, args.tool)
+        except tk.TclError as e:
+            print(f"无法创建窗口（需要图形界面）: {e}", file=sys.stderr)
+            return 1
+    elif args.command == 'memory':
+        bench_memory(load_events(args))
+    elif args.command == 'file':
+        return 0 if bench_file(load_events(args), args.out) else 1
+    else:
+        bench_export(load_events(args), args.out, args.scale, args.tile_height)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
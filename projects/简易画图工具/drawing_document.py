@@ -0,0 +1,174 @@
+"""
+画图文档模型（不依赖tkinter）
+
+所有图形按添加顺序编号，数据放在几个array里，不为每个图形或每个点建Python对象：
+    coords  所有图形的坐标首尾相接的扁平数组（每个坐标4字节）
+    starts  第i个图形的坐标是 coords[starts[i]:starts[i+1]]
+    kinds   图形种类（画笔/直线/矩形/椭圆）
+    styles  样式表下标，样式表里每种 (颜色, 粗细) 只存一份
+
+可见的图形总是编号连续的一段 [floor, end)：添加图形 end+1，清空 floor=end。
+命令记录只需保存每一步之后的 (end, floor)，撤销/重做就是把指针前后移动一格，O(1)。
+撤销掉的图形数据留在数组末尾供重做；撤销后再添加新图形时，它们才从数组末尾删掉。
+
+画笔松开后的折线简化simplify也放在这里，不需要图形界面的脚本可以直接使用。
+"""
+
+from array import array
+
+
+KINDS = ("pen", "line", "rectangle", "oval")
+KIND_CODES = {name: code for code, name in enumerate(KINDS)}
+SIMPLIFY_TOLERANCE = 1.0  # 简化笔画时允许的最大偏差(像素)
+
+
+def simplify(points, tolerance=SIMPLIFY_TOLERANCE):
+    """
+    Ramer–Douglas–Peucker折线简化
+
+    参数:
+        points: 扁平的坐标列表 [x0, y0, x1, y1, ...]
+        tolerance: 去掉的点到保留折线的最大距离
+
+    返回:
+        简化后的扁平坐标列表(首尾两点总是保留)
+    """
+    n = len(points) // 2
+    if n < 3:
+        return list(points)
+    keep = bytearray(n)
+    keep[0] = keep[n - 1] = 1
+    tolerance2 = tolerance * tolerance
+    stack = [(0, n - 1)]  # 用栈代替递归，长笔画不会超过递归深度
+    while stack:
+        first, last = stack.pop()
+        x1, y1 = points[2 * first], points[2 * first + 1]
+        dx, dy = points[2 * last] - x1, points[2 * last + 1] - y1
+        length2 = dx * dx + dy * dy
+        # 比较 距离² * length2，省掉除法和开方；首尾重合时直接比较到首点的距离
+        threshold = tolerance2 * length2 if length2 else tolerance2
+        farthest, index = threshold, 0
+        for i in range(first + 1, last):
+            px, py = points[2 * i] - x1, points[2 * i + 1] - y1
+            if length2:
+                cross = dx * py - dy * px
+                distance = cross * cross
+            else:
+                distance = px * px + py * py
+            if distance > farthest:
+                farthest, index = distance, i
+        if index:
+            keep[index] = 1
+            stack.append((first, index))
+            stack.append((index, last))
+    return [c for i in range(n) if keep[i] for c in (points[2 * i], points[2 * i + 1])]
+
+
+class Document:
+
+    def __init__(self):
+        self.coords = array('i')
+        self.starts = array('I', [0])
+        self.kinds = array('B')
+        self.styles = array('H')
+        self.style_table = []  # [(颜色, 粗细)]
+        self.style_index = {}  # (颜色, 粗细) -> 样式表下标
+        # 命令记录：第k步之后的可见范围，第0项是空文档
+        self.log_end = array('I', [0])
+        self.log_floor = array('I', [0])
+        self.cursor = 0
+
+    @property
+    def end(self):
+        return self.log_end[self.cursor]
+
+    @property
+    def floor(self):
+        return self.log_floor[self.cursor]
+
+    def visible(self):
+        """可见图形的编号(range)"""
+        return range(self.floor, self.end)
+
+    def __len__(self):
+        return self.end - self.floor
+
+    def shape(self, i):
+        """:return: (种类名, 坐标列表, 颜色, 粗细)"""
+        color, width = self.style_table[self.styles[i]]
+        return KINDS[self.kinds[i]], self.coords[self.starts[i]:self.starts[i + 1]].tolist(), color, width
+
+    def style(self, color, width):
+        """(颜色, 粗细) 在样式表里的下标，没有时添加"""
+        key = (color, width)
+        index = self.style_index.get(key)
+        if index is None:
+            index = self.style_index[key] = len(self.style_table)
+            self.style_table.append(key)
+        return index
+
+    def _push(self, end, floor):
+        # 新命令丢掉可以重做的步骤，以及只有那些步骤用到的图形数据
+        if self.cursor + 1 < len(self.log_end):
+            del self.log_end[self.cursor + 1:]
+            del self.log_floor[self.cursor + 1:]
+            keep = self.end
+            del self.coords[self.starts[keep]:]
+            del self.starts[keep + 1:]
+            del self.kinds[keep:]
+            del self.styles[keep:]
+        self.log_end.append(end)
+        self.log_floor.append(floor)
+        self.cursor += 1
+
+    def add(self, kind, coords, color, width):
+        """
+        添加一个图形
+        :param kind: KINDS里的种类名
+        :param coords: 扁平坐标序列 [x0, y0, x1, y1, ...]
+        :return: 图形编号
+        """
+        self._push(self.end + 1, self.floor)
+        shape_id = self.end - 1
+        self.coords.extend(coords)
+        self.starts.append(len(self.coords))
+        self.kinds.append(KIND_CODES[kind])
+        self.styles.append(self.style(color, width))
+        return shape_id
+
+    def clear(self):
+        """清空（可以撤销），已经是空的时返回False"""
+        if not len(self):
+            return False
+        self._push(self.end, self.end)
+        return True
+
+    @property
+    def can_undo(self):
+        return self.cursor > 0
+
+    @property
+    def can_redo(self):
+        return self.cursor + 1 < len(self.log_end)
+
+    def undo(self):
+        if not self.can_undo:
+            return False
+        self.cursor -= 1
+        return True
+
+    def redo(self):
+        if not self.can_redo:
+            return False
+        self.cursor += 1
+        return True
+
+    @property
+    def point_count(self):
+        """数组里的点数（包括可以重做的图形）"""
+        return len(self.coords) // 2
+
+    def nbytes(self):
+        """各个数组占用的字节数（不含样式表）"""
+        buffers = (self.coords, self.starts, self.kinds, self.styles, self.log_end, self.log_floor)
+        return sum(len(buffer) * buffer.itemsize for buffer in buffers)
@@ -0,0 +1,141 @@
+"""
+把画图文档导出成PNG（离屏用PIL绘制，不需要tkinter和图形界面）
+
+大画布（例如放大很多倍导出）不在内存里建整张图：
+按 TILE_HEIGHT 行一条分块，每块只画和它相交的图形（折线只画经过这一块的那几段），
+画好就压缩写进PNG的IDAT数据，内存占用只有一块的大小（宽 × TILE_HEIGHT × 3字节），与图片高度无关。
+PNG每行都横跨整张图，所以块是整行宽的横条，不再按列切分。
+PNG文件按块直接写出（filter 0 + zlib流），不经过PIL的整图编码。
+
+文档可以是Document，也可以是drawing_file.DrawingFile（只用到 visible() 和 shape()）。
+"""
+
+import zlib
+import struct
+
+from PIL import Image, ImageDraw
+
+
+TILE_HEIGHT = 256
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def shape_bounds(coords, width):
+    """图形的外框(含线宽)"""
+    xs, ys = coords[0::2], coords[1::2]
+    pad = width / 2 + 1
+    return min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad
+
+
+def document_size(document, margin=10):
+    """能放下所有可见图形的画布大小"""
+    width = height = 1
+    for i in document.visible():
+        _, coords, _, line_width = document.shape(i)
+        _, _, x1, y1 = shape_bounds(coords, line_width)
+        width, height = max(width, x1), max(height, y1)
+    return int(width) + margin, int(height) + margin
+
+
+def tile_buckets(document, scale, tiles, tile_height):
+    """每块要画的图形编号（按编号顺序，保持叠放次序）"""
+    buckets = [[] for _ in range(tiles)]
+    for i in document.visible():
+        _, coords, _, width = document.shape(i)
+        _, y0, _, y1 = shape_bounds(coords, width)
+        first = max(0, int(y0 * scale) // tile_height)
+        last = min(tiles - 1, int(y1 * scale) // tile_height)
+        for tile in range(first, last + 1):
+            buckets[tile].append(i)
+    return buckets
+
+
+def clip_runs(xy, low, high):
+    """折线里和 low..high 行相交的每一段连续的点"""
+    run = []
+    for a, b in zip(xy, xy[1:]):
+        if min(a[1], b[1]) <= high and max(a[1], b[1]) >= low:
+            if not run:
+                run.append(a)
+            run.append(b)
+        elif run:
+            yield run
+            run = []
+    if run:
+        yield run
+
+
+def draw_shape(draw, kind, coords, color, width, scale, top, height):
+    """在块上画一个图形，top是块在整张图里的起始行，height是块的行数"""
+    xy = [(coords[j] * scale, coords[j + 1] * scale - top) for j in range(0, len(coords), 2)]
+    width = max(1, round(width * scale))
+    if kind == "pen":
+        # 跳过的线段离这一块至少一个线宽，它们的拐角圆弧也画不到这一块里
+        for run in clip_runs(xy, -width, height + width):
+            draw.line(run, fill=color, width=width, joint="curve")
+        if width > 2:
+            # 和画布上一样的圆头
+            r = width / 2
+            for x, y in (xy[0], xy[-1]):
+                draw.ellipse((x - r, y - r, x + r, y + r), fill=color)
+    elif kind == "line":
+        draw.line(xy, fill=color, width=width)
+    else:
+        (x0, y0), (x1, y1) = xy
+        box = (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+        if kind == "rectangle":
+            draw.rectangle(box, outline=color, width=width)
+        else:
+            draw.ellipse(box, outline=color, width=width)
+
+
+def iter_tiles(document, width, height, scale=1, tile_height=TILE_HEIGHT, background="white"):
+    """从上到下逐块绘制，每次产出一块RGB图像（最后一块可能矮一些）"""
+    tiles = (height + tile_height - 1) // tile_height
+    buckets = tile_buckets(document, scale, tiles, tile_height)
+    for tile, shape_ids in enumerate(buckets):
+        top = tile * tile_height
+        image = Image.new("RGB", (width, min(tile_height, height - top)), background)
+        draw = ImageDraw.Draw(image)
+        for i in shape_ids:
+            draw_shape(draw, *document.shape(i), scale, top, image.height)
+        yield image
+
+
+def _write_chunk(f, kind, data):
+    f.write(struct.pack('>I', len(data)))
+    f.write(kind)
+    f.write(data)
+    f.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind))))
+
+
+def write_png(path, width, height, tiles, level=6):
+    """把逐块产出的RGB图像写成一个PNG文件，每块压缩后立即写出"""
+    row_bytes = width * 3
+    compressor = zlib.compressobj(level)
+    with open(path, 'wb') as f:
+        f.write(PNG_SIGNATURE)
+        _write_chunk(f, b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        for image in tiles:
+            raw = image.tobytes()
+            # 每行前面加filter类型0
+            rows = b''.join(b'\0' + raw[i:i + row_bytes] for i in range(0, len(raw), row_bytes))
+            data = compressor.compress(rows)
+            if data:
+                _write_chunk(f, b'IDAT', data)
+        _write_chunk(f, b'IDAT', compressor.flush())
+        _write_chunk(f, b'IEND', b'')
+
+
+def export_png(document, path, width=None, height=None, scale=1, tile_height=TILE_HEIGHT):
+    """
+    把文档导出成PNG
+    :param width, height: 画布大小（文档坐标），默认刚好放下所有图形
+    :param scale: 放大倍数，导出的图片大小是 画布大小 × scale
+    :return: 图片的 (宽, 高)
+    """
+    if width is None or height is None:
+        width, height = document_size(document)
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    write_png(path, *size, iter_tiles(document, *size, scale, tile_height))
+    return size
@@ -0,0 +1,167 @@
+"""
+画图文档的二进制文件格式（.sdraw，不依赖tkinter）
+
+    文件头   'SDRW' + 版本 + 样式数 + 图形数 + 坐标数
+    样式表   每种样式：粗细(uint16) + 颜色长度(uint8) + 颜色(ASCII)，之后补0到4字节对齐
+    starts   uint32 × (图形数+1)，第i个图形的坐标是 coords[starts[i]:starts[i+1]]
+    coords   int32 × 坐标数
+    styles   uint16 × 图形数
+    kinds    uint8 × 图形数
+全部是小端，和Document里的数组布局相同，保存时整块写出，不逐个图形打包。
+
+DrawingFile 用memoryview按偏移切片再cast成对应类型来解析，不复制数据、不为每个数建Python对象，
+并提供和Document相同的 visible()/shape()，只读的用途（导出PNG、统计）可以直接用；
+解析时逐个图形检查种类、样式下标和坐标个数，损坏的文件在这里就报ValueError，不会到绘制时才出错；
+load() 再把这几块各用一次frombytes复制进可编辑的Document。
+只保存可见的图形，不保存撤销记录。
+"""
+
+import os
+import sys
+import struct
+import operator
+from array import array
+from itertools import compress
+
+from drawing_document import KIND_CODES, KINDS, Document
+
+
+FILE_MAGIC = b'SDRW'
+FILE_HEADER = struct.Struct('<4sHHII') # 标识、版本、样式数、图形数、坐标数
+STYLE_HEADER = struct.Struct('<HB') # 粗细、颜色长度
+FILE_VERSION = 1
+LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+def _pad(size):
+    return -size % 4
+
+
+def _le(buffer):
+    """数组在文件里的字节（大端机器上先换成小端）"""
+    if LITTLE_ENDIAN:
+        return memoryview(buffer).cast('B')
+    swapped = array(buffer.typecode, buffer)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+def _copy(typecode, buffer):
+    """把buffer整块复制成array（array(typecode, memoryview)会逐个元素转换）"""
+    copied = array(typecode)
+    copied.frombytes(memoryview(buffer).cast('B'))
+    return copied
+
+
+def save(document, path):
+    """把文档里可见的图形保存到path（先写临时文件再替换，写到一半中断不会损坏原文件）"""
+    first, end = document.floor, document.end
+    base = document.starts[first]
+    starts = document.starts[first:end + 1]
+    if base:
+        starts = array('I', (start - base for start in starts))
+    coords = document.coords[base:document.starts[end]]
+
+    style_bytes = bytearray()
+    for color, width in document.style_table:
+        encoded = color.encode('ascii')
+        style_bytes += STYLE_HEADER.pack(width, len(encoded)) + encoded
+    style_bytes += bytes(_pad(FILE_HEADER.size + len(style_bytes)))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, len(document.style_table), end - first, len(coords)))
+        f.write(style_bytes)
+        for buffer in (starts, coords, document.styles[first:end], document.kinds[first:end]):
+            f.write(_le(buffer))
+    os.replace(tmp_path, path)
+
+
+class DrawingFile:
+    """
+    只读解析.sdraw文件的内容
+    :param data: bytes / bytearray / mmap，解析出的数组都是它的memoryview
+    """
+
+    def __init__(self, data):
+        view = memoryview(data)
+        if len(view) < FILE_HEADER.size:
+            raise ValueError("不是画图文件")
+        magic, version, style_count, shape_count, coord_count = FILE_HEADER.unpack_from(view)
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            raise ValueError("不是画图文件或版本不对")
+
+        offset = FILE_HEADER.size
+        self.style_table = []
+        for _ in range(style_count):
+            if offset + STYLE_HEADER.size > len(view):
+                raise ValueError("画图文件不完整")
+            width, length = STYLE_HEADER.unpack_from(view, offset)
+            offset += STYLE_HEADER.size
+            self.style_table.append((bytes(view[offset:offset + length]).decode('ascii'), width))
+            offset += length
+        offset += _pad(offset)
+
+        sections = []
+        for typecode, count in (('I', shape_count + 1), ('i', coord_count), ('H', shape_count), ('B', shape_count)):
+            size = count * struct.calcsize(typecode)
+            if offset + size > len(view):
+                raise ValueError("画图文件不完整")
+            raw = view[offset:offset + size]
+            if LITTLE_ENDIAN:
+                sections.append(raw.cast(typecode))
+            else:
+                section = _copy(typecode, raw)
+                section.byteswap()
+                sections.append(section)
+            offset += size
+        self.starts, self.coords, self.styles, self.kinds = sections
+        self._check(style_count)
+
+    def _check(self, style_count):
+        """检查各图形的种类、样式下标和坐标范围，保证shape()不会越界"""
+        starts, kinds = self.starts, self.kinds
+        if starts[0] != 0 or starts[len(kinds)] != len(self.coords):
+            raise ValueError("画图文件已损坏")
+        if kinds and (max(kinds) >= len(KINDS) or max(self.styles) >= style_count):
+            raise ValueError("画图文件已损坏：图形种类或样式不存在")
+        # 画笔至少两个点，其他图形正好两个点（起点和终点）；用map/compress在C里逐个比较，不写Python循环
+        counts = list(map(operator.sub, starts[1:], starts))
+        if kinds and (min(counts) < 4 or any(map((1).__and__, starts))
+                      or set(compress(counts, map(KIND_CODES["pen"].__ne__, kinds))) - {4}):
+            raise ValueError("画图文件已损坏：图形的坐标个数不对")
+
+    def visible(self):
+        return range(len(self.kinds))
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def shape(self, i):
+        """:return: (种类名, 坐标列表, 颜色, 粗细)，和Document.shape相同"""
+        color, width = self.style_table[self.styles[i]]
+        return KINDS[self.kinds[i]], self.coords[self.starts[i]:self.starts[i + 1]].tolist(), color, width
+
+    def to_document(self):
+        """复制成可编辑的Document（每个数组一次整块复制）"""
+        document = Document()
+        document.starts = _copy('I', self.starts)
+        document.coords = _copy('i', self.coords)
+        document.styles = _copy('H', self.styles)
+        document.kinds = _copy('B', self.kinds)
+        document.style_table = list(self.style_table)
+        document.style_index = {style: index for index, style in enumerate(self.style_table)}
+        # 打开的文件是撤销的起点
+        document.log_end = array('I', [len(self)])
+        return document
+
+
+def read(path):
+    """把整个文件读进内存并解析（不再复制）"""
+    with open(path, 'rb') as f:
+        return DrawingFile(f.read())
+
+
+def load(path):
+    """打开.sdraw文件，返回可编辑的Document"""
+    return read(path).to_document()
@@ -5,6 +5,8 @@
 2. 可自定义绘图颜色和线条粗细
 3. 支持清空画布
 4. 实时预览绘图效果
+5. 支持撤销/重做(Ctrl+Z / Ctrl+Y)
+6. 保存/打开画图文件(.sdraw)，导出PNG图片
 
 使用说明：
 1. 点击工具栏按钮选择绘图工具
@@ -12,10 +14,108 @@
 3. 使用"颜色"按钮更改绘图颜色
 4. 使用滑块调整线条粗细
 5. 点击"清除"按钮清空画布
+6. 点击"撤销"/"重做"按钮或按Ctrl+Z/Ctrl+Y撤销、重做
+7. 在"文件"菜单里保存、打开、导出PNG
+
+画笔的每一笔是画布上的一条折线（而不是每次鼠标移动一段线段），拖动时用coords()延长；
+松开鼠标后用Ramer–Douglas–Peucker算法去掉几乎共线的点。
+直线/矩形/椭圆拖动时只有一个预览图形，松开后去掉虚线就是最终图形。
+拖动时画布按屏幕刷新率更新，鼠标事件再多也不会堆积。
+
+画好的图形保存在文档模型里(drawing_document.Document)，画布只是它的视图(CanvasView)：
+撤销、重做、清空只改文档，视图再增删变化的那部分画布对象。
 """
 
 import tkinter as tk
-from tkinter import colorchooser
+from tkinter import colorchooser, filedialog, messagebox
+
+import drawing_file
+from drawing_document import Document, simplify
+
+
+STROKE_CHUNK = 128  # 拖动中的折线最多这么多个点，满了另起一条，避免每次coords()都传整笔的坐标
+FRAME_MS = 16  # 拖动时画布最多这么多毫秒更新一次(约60Hz的屏幕刷新率)
+
+
+def create_shape_item(canvas, kind, coords, color, width, **options):
+    """
+    在画布上创建一个图形
+
+    参数:
+        kind: 图形种类(pen/line/rectangle/oval)
+        coords: 扁平坐标列表
+        options: 其他画布选项(如预览用的dash)
+    """
+    if kind == "pen":
+        return canvas.create_line(
+            coords,
+            fill=color,  # 颜色
+            width=width,  # 宽度
+            capstyle=tk.ROUND,  # 线条端点样式
+            joinstyle=tk.ROUND,  # 线条连接样式
+            **options
+        )
+    if kind == "line":
+        return canvas.create_line(coords, fill=color, width=width, **options)
+    if kind == "rectangle":
+        return canvas.create_rectangle(coords, outline=color, width=width, **options)
+    if kind == "oval":
+        return canvas.create_oval(coords, outline=color, width=width, **options)
+    raise ValueError(f"未知的图形种类: {kind}")
+
+
+class CanvasView:
+    """
+    文档的画布视图
+
+    文档的可见图形总是编号连续的一段，sync()比较上次显示的范围和现在的范围，
+    只删除移出的、创建移入的图形，花的时间与变化的图形数成正比。
+    """
+
+    def __init__(self, canvas, document):
+        self.canvas = canvas
+        self.document = document
+        self.items = {}  # 图形编号 -> 画布对象
+        self.shown = range(0)
+
+    def sync(self, adopt=None):
+        """
+        让画布和文档一致
+
+        参数:
+            adopt: {图形编号: 画布对象}，已经画在画布上的新图形(拖动时画出的)，直接沿用不再重新创建
+        """
+        old, new = self.shown, self.document.visible()
+        for i in range_difference(old, new):
+            self.canvas.delete(self.items.pop(i))
+        below = []  # 比已显示的图形编号小的新图形要放到它们下面
+        for i in range_difference(new, old):
+            if adopt and i in adopt:
+                item = adopt[i]
+            else:
+                item = create_shape_item(self.canvas, *self.document.shape(i))
+            self.items[i] = item
+            if old and i < old.start:
+                below.append(item)
+        for item in reversed(below):
+            self.canvas.tag_lower(item)
+        self.shown = new
+
+    def reset(self, document):
+        """换成另一个文档(打开文件时)，重新画出所有图形"""
+        for item in self.items.values():
+            self.canvas.delete(item)
+        self.items = {}
+        self.shown = range(0)
+        self.document = document
+        self.sync()
+
+
+def range_difference(a, b):
+    """在连续范围a里但不在b里的编号(两端最多各一段)"""
+    if not b:
+        return a
+    return [*range(a.start, min(a.stop, b.start)), *range(max(a.start, b.stop), a.stop)]
 
 
 class SimpleDrawingApp:
@@ -37,12 +137,19 @@ class SimpleDrawingApp:
         self.line_width = 2  # 当前线条宽度
         self.start_x = None  # 绘图起始点x坐标
         self.start_y = None  # 绘图起始点y坐标
-        self.prev_x = None  # 画笔工具前一个点的x坐标
-        self.prev_y = None  # 画笔工具前一个点的y坐标
+        self.stroke_points = []  # 当前笔画的所有点(扁平坐标列表)
+        self.stroke_items = []  # 当前笔画的折线对象，最后一个是正在延长的
+        self.live_start = 0  # 正在延长的折线从stroke_points的哪个下标开始
         self.temp_item = None  # 临时图形对象(用于预览)
+        self.motion_event = None  # 这一帧里还没画的最后一个拖动事件
+        self.frame_job = None  # 帧结束的after回调
+
+        # 文档模型(画好的图形和撤销记录)
+        self.document = Document()
 
         # 创建界面组件
         self.create_widgets()
+        self.view = CanvasView(self.canvas, self.document)
 
         # 绑定鼠标事件
         self.bind_events()
@@ -50,6 +157,15 @@ class SimpleDrawingApp:
     def create_widgets(self):
         """创建所有界面组件"""
 
+        # 菜单栏 - 文件菜单
+        menubar = tk.Menu(self.root)
+        file_menu = tk.Menu(menubar, tearoff=False)
+        file_menu.add_command(label="打开...", command=self.open_file)
+        file_menu.add_command(label="保存...", command=self.save_file)
+        file_menu.add_command(label="导出PNG...", command=self.export_png)
+        menubar.add_cascade(label="文件", menu=file_menu)
+        self.root.config(menu=menubar)
+
         # 主画布 - 用于绘图
         self.canvas = tk.Canvas(
             self.root,
@@ -128,6 +244,19 @@ class SimpleDrawingApp:
             pady=2
         )
 
+        # 撤销/重做按钮
+        for text, command in (("撤销", self.undo), ("重做", self.redo)):
+            tk.Button(
+                self.toolbar,
+                text=text,
+                width=8,
+                command=command
+            ).pack(
+                side=tk.LEFT,
+                padx=2,
+                pady=2
+            )
+
         # 画笔大小调节组件
         self.size_frame = tk.Frame(self.toolbar)
         self.size_frame.pack(
@@ -173,6 +302,9 @@ class SimpleDrawingApp:
         self.canvas.bind("<B1-Motion>", self.draw)
         # 鼠标左键释放 - 结束绘图
         self.canvas.bind("<ButtonRelease-1>", self.stop_drawing)
+        # Ctrl+Z / Ctrl+Y - 撤销/重做
+        self.root.bind("<Control-z>", lambda event: self.undo())
+        self.root.bind("<Control-y>", lambda event: self.redo())
 
     def select_tool(self, tool):
         """
@@ -236,8 +368,60 @@ class SimpleDrawingApp:
         )
 
     def clear_canvas(self):
-        """清空画布"""
-        self.canvas.delete("all")  # 删除所有图形
+        """清空画布(可以撤销)"""
+        if self.document.clear():
+            self.view.sync()
+
+    def undo(self):
+        """撤销上一步"""
+        if self.document.undo():
+            self.view.sync()
+
+    def redo(self):
+        """重做撤销的一步"""
+        if self.document.redo():
+            self.view.sync()
+
+    def open_file(self):
+        """打开画图文件，替换当前的画"""
+        path = filedialog.askopenfilename(filetypes=[("画图文件", "*.sdraw")])
+        if not path:
+            return
+        try:
+            document = drawing_file.load(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("打开失败", str(e))
+            return
+        try:
+            self.view.reset(document)
+        except tk.TclError as e:
+            # 例如颜色名Tk不认识：画回原来的文档，当前的画不变
+            self.view.reset(self.document)
+            messagebox.showerror("打开失败", str(e))
+            return
+        self.document = document
+
+    def save_file(self):
+        """把当前的画保存成画图文件"""
+        path = filedialog.asksaveasfilename(defaultextension=".sdraw", filetypes=[("画图文件", "*.sdraw")])
+        if not path:
+            return
+        try:
+            drawing_file.save(self.document, path)
+        except OSError as e:
+            messagebox.showerror("保存失败", str(e))
+
+    def export_png(self):
+        """按画布当前的大小导出PNG图片"""
+        path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[("PNG图片", "*.png")])
+        if not path:
+            return
+        try:
+            import drawing_export  # 需要安装 pip install pillow
+            drawing_export.export_png(self.document, path,
+                                      self.canvas.winfo_width(), self.canvas.winfo_height())
+        except (ImportError, OSError) as e:
+            messagebox.showerror("导出失败", str(e))
 
     def start_drawing(self, event):
         """
@@ -249,72 +433,127 @@ class SimpleDrawingApp:
         self.start_x = event.x  # 记录起始x坐标
         self.start_y = event.y  # 记录起始y坐标
 
-        # 如果是画笔工具，记录前一个点的位置
+        # 如果是画笔工具，开始一条新的折线
         if self.current_tool == "pen":
-            self.prev_x = event.x
-            self.prev_y = event.y
+            self.stroke_points = [event.x, event.y]
+            self.live_start = 0
+            self.stroke_items = [self.create_stroke_item(self.stroke_points * 2)]
 
     def draw(self, event):
         """
         绘图过程(鼠标左键按下并移动时调用)
 
+        鼠标事件可能比屏幕刷新快得多，画布每帧(FRAME_MS)最多更新一次：
+        一帧里的第一个事件立即画出，之后的事件只记下，帧结束时再画最后的状态。
+
         参数:
             event: 鼠标事件对象，包含坐标等信息
         """
         if self.current_tool == "pen":
-            # 画笔工具 - 绘制连续线条
-            if self.prev_x and self.prev_y:
-                self.canvas.create_line(
-                    self.prev_x, self.prev_y,  # 起点
-                    event.x, event.y,  # 终点
-                    fill=self.current_color,  # 颜色
-                    width=self.line_width,  # 宽度
-                    capstyle=tk.ROUND,  # 线条端点样式
-                    joinstyle=tk.ROUND  # 线条连接样式
-                )
-            # 更新前一点坐标
-            self.prev_x = event.x
-            self.prev_y = event.y
+            # 画笔工具 - 每个点都记下，折线按帧延长
+            self.extend_stroke(event.x, event.y)
+        self.motion_event = event
+        if self.frame_job is None:
+            self.render_motion()
+            self.frame_job = self.root.after(FRAME_MS, self.end_frame)
+
+    def render_motion(self):
+        """把记下的拖动画到画布上"""
+        event, self.motion_event = self.motion_event, None
+        if event is None:
+            return
+        if self.current_tool == "pen":
+            self.update_stroke()
         else:
             # 其他工具(直线/矩形/椭圆) - 显示预览效果
             self.draw_preview(event)
 
+    def end_frame(self):
+        """一帧结束：这一帧里有没画的拖动就画出来，并开始下一帧"""
+        self.frame_job = None
+        if self.motion_event is not None:
+            self.render_motion()
+            self.frame_job = self.root.after(FRAME_MS, self.end_frame)
+
+    def cancel_frame(self):
+        """取消还没画的拖动(鼠标松开时由最终图形代替)"""
+        if self.frame_job is not None:
+            self.root.after_cancel(self.frame_job)
+            self.frame_job = None
+        self.motion_event = None
+
+    def create_stroke_item(self, coords):
+        """
+        创建画笔折线对象
+
+        参数:
+            coords: 扁平坐标列表(至少两个点)
+        """
+        return create_shape_item(self.canvas, "pen", coords, self.current_color, self.line_width)
+
+    def extend_stroke(self, x, y):
+        """
+        把一个点加到当前笔画(只记下，由update_stroke画出)
+
+        参数:
+            x, y: 新的点
+        """
+        points = self.stroke_points
+        if self.stroke_items and (x != points[-2] or y != points[-1]):
+            points += (x, y)
+
+    def update_stroke(self):
+        """把当前笔画新加的点画到正在延长的折线上"""
+        points = self.stroke_points
+        items = self.stroke_items
+        if not items:
+            return
+        end = self.live_start + STROKE_CHUNK * 2
+        while len(points) > end:
+            # 正在延长的折线满了，定下它的坐标，从它的最后一个点起另起一条
+            self.canvas.coords(items[-1], points[self.live_start:end])
+            self.live_start = end - 2
+            items.append(self.create_stroke_item(points[self.live_start:self.live_start + 4]))
+            end = self.live_start + STROKE_CHUNK * 2
+        self.canvas.coords(items[-1], points[self.live_start:])
+
+    def finish_stroke(self):
+        """结束当前笔画：所有分段合并成一条简化后的折线，加到文档里"""
+        items = self.stroke_items
+        if items:
+            for item in items[1:]:
+                self.canvas.delete(item)
+            if len(self.stroke_points) < 4:
+                # 只点了一下没有移动，和以前一样不留下图形
+                self.canvas.delete(items[0])
+            else:
+                points = simplify(self.stroke_points)
+                self.canvas.coords(items[0], points)
+                shape_id = self.document.add("pen", points, self.current_color, self.line_width)
+                self.view.sync(adopt={shape_id: items[0]})
+        self.stroke_points = []
+        self.stroke_items = []
+        self.live_start = 0
+
     def draw_preview(self, event):
         """
         绘制预览图形(用于直线/矩形/椭圆工具)
+        每次拖动只创建一个预览图形，之后的移动只更新它的坐标
 
         参数:
             event: 鼠标事件对象
         """
-        # 删除之前的临时图形
         if self.temp_item:
-            self.canvas.delete(self.temp_item)
-
-        # 根据当前工具创建新的预览图形
-        if self.current_tool == "line":
-            self.temp_item = self.canvas.create_line(
-                self.start_x, self.start_y,
-                event.x, event.y,
-                fill=self.current_color,
-                width=self.line_width,
-                dash=(4, 2)  # 虚线样式(预览效果)
-            )
-        elif self.current_tool == "rectangle":
-            self.temp_item = self.canvas.create_rectangle(
-                self.start_x, self.start_y,
-                event.x, event.y,
-                outline=self.current_color,
-                width=self.line_width,
-                dash=(4, 2)  # 虚线样式
-            )
-        elif self.current_tool == "oval":
-            self.temp_item = self.canvas.create_oval(
-                self.start_x, self.start_y,
-                event.x, event.y,
-                outline=self.current_color,
-                width=self.line_width,
-                dash=(4, 2)  # 虚线样式
-            )
+            self.canvas.coords(self.temp_item, self.start_x, self.start_y, event.x, event.y)
+            return
+
+        # 根据当前工具创建预览图形
+        self.temp_item = create_shape_item(
+            self.canvas, self.current_tool,
+            (self.start_x, self.start_y, event.x, event.y),
+            self.current_color, self.line_width,
+            dash=(4, 2)  # 虚线样式(预览效果)
+        )
 
     def stop_drawing(self, event):
         """
@@ -323,13 +562,12 @@ class SimpleDrawingApp:
         参数:
             event: 鼠标事件对象
         """
+        self.cancel_frame()
         if self.current_tool == "pen":
-            # 画笔工具 - 重置前一点坐标
-            self.prev_x = None
-            self.prev_y = None
+            # 画笔工具 - 合并并简化这一笔
+            self.finish_stroke()
         elif self.temp_item:
-            # 其他工具 - 删除预览图形并创建最终图形
-            self.canvas.delete(self.temp_item)
+            # 其他工具 - 预览图形直接变成最终图形
             self.create_final_shape(event)
 
         # 重置起始点
@@ -338,32 +576,17 @@ class SimpleDrawingApp:
 
     def create_final_shape(self, event):
         """
-        创建最终图形(鼠标释放时)
+        把预览图形变成最终图形(鼠标释放时)：移到释放位置并去掉虚线，加到文档里
 
         参数:
             event: 鼠标事件对象
         """
-        if self.current_tool == "line":
-            self.canvas.create_line(
-                self.start_x, self.start_y,
-                event.x, event.y,
-                fill=self.current_color,
-                width=self.line_width
-            )
-        elif self.current_tool == "rectangle":
-            self.canvas.create_rectangle(
-                self.start_x, self.start_y,
-                event.x, event.y,
-                outline=self.current_color,
-                width=self.line_width
-            )
-        elif self.current_tool == "oval":
-            self.canvas.create_oval(
-                self.start_x, self.start_y,
-                event.x, event.y,
-                outline=self.current_color,
-                width=self.line_width
-            )
+        coords = (self.start_x, self.start_y, event.x, event.y)
+        self.canvas.coords(self.temp_item, coords)
+        self.canvas.itemconfigure(self.temp_item, dash="")
+        shape_id = self.document.add(self.current_tool, coords, self.current_color, self.line_width)
+        self.view.sync(adopt={shape_id: self.temp_item})
+        self.temp_item = None
 
 
 # 程序入口
@@ -2,11 +2,26 @@ import sys
 import pygame
 from pygame.locals import *
 
+import gomoku_ai
+import gomoku_book
+import gomoku_engine
+
 # 棋盘参数
 GRID_SIZE = 30       # 每格宽度（像素）
-BOARD_LEN = 19       # 棋盘行列数
+BOARD_LEN = gomoku_engine.BOARD_LEN  # 棋盘行列数
 MARGIN = 40          # 棋盘边距
 BOARD_SIZE = GRID_SIZE * (BOARD_LEN - 1)  # 实际网格线区域大小
+WINDOW_SIZE = (800, 600)
+FPS = 60             # 帧率上限
+STONE_RADIUS = GRID_SIZE // 2 - 2  # 棋子半径
+
+BG_COLOR = (255, 255, 255)
+LINE_COLOR = (0, 0, 0)
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+STONE_COLORS = {gomoku_engine.BLACK: BLACK, gomoku_engine.WHITE: WHITE}
+HUMAN = gomoku_engine.BLACK  # 玩家执黑先行，AI执白
+AI_MOVE = pygame.USEREVENT + 1  # AI进程思考完成后投递的事件
 
 def draw_board(screen):
     """绘制棋盘网格"""
@@ -14,26 +29,146 @@ def draw_board(screen):
         # 横线
         start_pos = (MARGIN, MARGIN + i * GRID_SIZE)
         end_pos = (MARGIN + BOARD_SIZE, MARGIN + i * GRID_SIZE)
-        pygame.draw.line(screen, (0, 0, 0), start_pos, end_pos, 1)
+        pygame.draw.line(screen, LINE_COLOR, start_pos, end_pos, 1)
 
         # 竖线
         start_pos = (MARGIN + i * GRID_SIZE, MARGIN)
         end_pos = (MARGIN + i * GRID_SIZE, MARGIN + BOARD_SIZE)
-        pygame.draw.line(screen, (0, 0, 0), start_pos, end_pos, 1)
+        pygame.draw.line(screen, LINE_COLOR, start_pos, end_pos, 1)
+
+def create_board_surface(size):
+    """把背景和网格预先画到一张离屏surface上，之后每次只需blit"""
+    surface = pygame.Surface(size)
+    surface.fill(BG_COLOR)  # 白色背景
+    draw_board(surface)
+    return surface
+
+def cell_center(row, col):
+    """交叉点的像素坐标"""
+    return MARGIN + col * GRID_SIZE, MARGIN + row * GRID_SIZE
+
+def cell_at(pos):
+    """离鼠标位置最近的交叉点 (row, col)，在棋盘外时返回None"""
+    col = round((pos[0] - MARGIN) / GRID_SIZE)
+    row = round((pos[1] - MARGIN) / GRID_SIZE)
+    if 0 <= row < BOARD_LEN and 0 <= col < BOARD_LEN:
+        return row, col
+    return None
+
+
+class BoardView:
+    """
+    棋盘的绘制：网格是静态背景，只在落子时重画棋子所在的小块区域，
+    flush() 只把这些脏矩形提交到屏幕
+    """
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.background = create_board_surface(screen.get_size()).convert()
+        self.stones = {}  # (row, col) -> 颜色
+        self.dirty = []
+        self.redraw_all()
+
+    def redraw_all(self):
+        """窗口被遮挡后恢复等情况，整屏重画"""
+        self.screen.blit(self.background, (0, 0))
+        for (row, col), color in self.stones.items():
+            self._draw_stone(row, col, color)
+        self.dirty = [self.screen.get_rect()]
+
+    def _draw_stone(self, row, col, color):
+        center = cell_center(row, col)
+        rect = pygame.draw.circle(self.screen, color, center, STONE_RADIUS)
+        if color == WHITE:
+            pygame.draw.circle(self.screen, BLACK, center, STONE_RADIUS, 1)
+        return rect
+
+    def place_stone(self, row, col, color):
+        """落子并记录脏矩形，该位置已有棋子时返回False"""
+        if (row, col) in self.stones:
+            return False
+        self.stones[(row, col)] = color
+        self.dirty.append(self._draw_stone(row, col, color))
+        return True
+
+    def remove_stone(self, row, col):
+        """悔棋：用背景上对应的区域盖住棋子"""
+        if self.stones.pop((row, col), None) is None:
+            return
+        x, y = cell_center(row, col)
+        rect = pygame.Rect(x - STONE_RADIUS, y - STONE_RADIUS, 2 * STONE_RADIUS + 1, 2 * STONE_RADIUS + 1)
+        self.screen.blit(self.background, rect, rect)
+        self.dirty.append(rect)
+
+    def flush(self):
+        """只刷新变化过的区域"""
+        if self.dirty:
+            pygame.display.update(self.dirty)
+            self.dirty = []
+
+
+def wait_events():
+    """阻塞到有事件为止（空闲时不占CPU），再取出队列里其余的事件"""
+    return [pygame.event.wait()] + pygame.event.get()
+
+def play_move(board, view, cell):
+    """落子并画出棋子，分出胜负或下满时在标题栏显示结果"""
+    color = STONE_COLORS[board.player]
+    board.play(*cell)
+    view.place_stone(*cell, color)
+    if board.winner:
+        pygame.display.set_caption('五子棋 - %s胜' % ('黑' if color == BLACK else '白'))
+    elif board.is_full():
+        pygame.display.set_caption('五子棋 - 和棋')
+
+def post_ai_move(cell, info):
+    """在AI的回调线程里执行，只投递事件，由主循环落子"""
+    pygame.event.post(pygame.event.Event(AI_MOVE, cell=cell, info=info))
 
 def main():
     """运行游戏主循环"""
     pygame.init()
-    screen = pygame.display.set_mode((800, 600))
+    screen = pygame.display.set_mode(WINDOW_SIZE)
     pygame.display.set_caption('五子棋')
+    clock = pygame.time.Clock()
+    view = BoardView(screen)
+    board = gomoku_engine.GomokuBoard()
+    ai = gomoku_ai.AIPlayer(book_path=gomoku_book.BOOK_PATH, cache_path=gomoku_book.CACHE_PATH)
+    thinking = False  # AI思考期间不接受落子和悔棋，但窗口照常响应
 
     while True:
-        for event in pygame.event.get():
+        for event in wait_events():
             if event.type == QUIT:
+                ai.close()
                 sys.exit()
-        screen.fill((255, 255, 255))  # 白色背景
-        draw_board(screen)           # 绘制棋盘
-        pygame.display.flip()        # 刷新屏幕
+            elif event.type == MOUSEBUTTONDOWN and event.button == 1 and not thinking:  # 左键落子
+                cell = cell_at(event.pos)
+                if cell is not None and board.is_legal(*cell) and board.player == HUMAN:
+                    play_move(board, view, cell)
+                    if not board.is_over():
+                        thinking = True
+                        pygame.display.set_caption('五子棋 - AI思考中')
+                        ai.request_move(board, post_ai_move)
+            elif event.type == AI_MOVE:
+                thinking = False
+                if event.cell is None:
+                    # AI进程出错：不再等待，玩家可以右键悔棋后重新落子
+                    print(f"AI思考出错: {event.info['error']!r}", file=sys.stderr)
+                    pygame.display.set_caption('五子棋 - AI出错，右键悔棋后重试')
+                else:
+                    pygame.display.set_caption('五子棋')
+                    play_move(board, view, event.cell)
+            elif event.type == MOUSEBUTTONDOWN and event.button == 3 and not thinking:  # 右键悔棋
+                # 连同AI的应手一起撤销，回到玩家落子前
+                while board.moves:
+                    view.remove_stone(*board.undo())
+                    if board.player == HUMAN:
+                        break
+                pygame.display.set_caption('五子棋')
+            elif event.type in (VIDEOEXPOSE, WINDOWEXPOSED):
+                view.redraw_all()
+        view.flush()         # 刷新屏幕
+        clock.tick(FPS)      # 限制帧率
 
 if __name__ == '__main__':
     main()